@@ -0,0 +1,132 @@
+"""
+Content-addressed index (SQLite) of every ebook the librarian has delivered.
+
+Each file is keyed by its SHA-256 and also carries its MD5 — Anna's Archive
+identifies files by the MD5 of their content (/md5/{hash}), so an AA search
+hit can be matched against books we already own whichever source they came
+from. The URL a file was fetched from is stored too, so re-requesting the same
+Gutenberg/Archive.org link is answered without downloading it again.
+
+Rows whose file has since been deleted from the library are dropped the next
+time they are looked up for a download (see BookIndex.forget).
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    sha256      TEXT PRIMARY KEY,
+    md5         TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    title       TEXT,
+    author      TEXT,
+    format      TEXT,
+    size_bytes  INTEGER NOT NULL,
+    source      TEXT,
+    source_url  TEXT,
+    added_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS books_md5 ON books (md5);
+CREATE INDEX IF NOT EXISTS books_source_url ON books (source_url);
+"""
+
+_MD5_RE = re.compile(r"([0-9a-f]{32})", re.IGNORECASE)
+
+
+def md5_from_source_id(source_id: Optional[str]) -> Optional[str]:
+    """'/md5/ABC…' (or a bare hash) → 'abc…', else None."""
+    if not source_id:
+        return None
+    m = _MD5_RE.search(source_id)
+    return m.group(1).lower() if m else None
+
+
+class BookIndex:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _one(self, where: str, value: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM books WHERE {where} = ? ORDER BY added_at DESC LIMIT 1", (value,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def by_sha256(self, sha256: str) -> Optional[dict]:
+        return self._one("sha256", sha256.lower())
+
+    def by_md5(self, md5: str) -> Optional[dict]:
+        return self._one("md5", md5.lower())
+
+    def by_url(self, url: str) -> Optional[dict]:
+        return self._one("source_url", url)
+
+    def add(
+        self,
+        *,
+        sha256: str,
+        md5: str,
+        path: str,
+        size_bytes: int,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        fmt: Optional[str] = None,
+        source: Optional[str] = None,
+        source_url: Optional[str] = None,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO books (sha256, md5, path, title, author, format, size_bytes, source, source_url, added_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET
+                    path = excluded.path,
+                    title = excluded.title,
+                    author = excluded.author,
+                    format = excluded.format,
+                    source = excluded.source,
+                    source_url = excluded.source_url,
+                    added_at = excluded.added_at
+                """,
+                (sha256.lower(), md5.lower(), path, title, author, fmt, size_bytes, source, source_url, time.time()),
+            )
+
+    def forget(self, sha256: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM books WHERE sha256 = ?", (sha256.lower(),))
+
+    def owned(self, *, md5s: Iterable[str] = (), urls: Iterable[str] = ()) -> dict[str, str]:
+        """
+        Batch lookup for search results. Returns {md5 or url: library path}
+        for every key that matches a delivered file (existence on disk is not checked).
+        """
+        md5s = [m.lower() for m in md5s if m]
+        urls = [u for u in urls if u]
+        found: dict[str, str] = {}
+        with self._lock:
+            if md5s:
+                marks = ",".join("?" * len(md5s))
+                for row in self._conn.execute(f"SELECT md5, path FROM books WHERE md5 IN ({marks})", md5s):
+                    found[row["md5"]] = row["path"]
+            if urls:
+                marks = ",".join("?" * len(urls))
+                for row in self._conn.execute(
+                    f"SELECT source_url, path FROM books WHERE source_url IN ({marks})", urls
+                ):
+                    found[row["source_url"]] = row["path"]
+        return found
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
@@ -0,0 +1,487 @@
+"""
+Ranking and fuzzy de-duplication of ebook search results across sources.
+
+Sources spell the same book differently: "The Count of Monte Cristo",
+"Count of Monte Cristo, The", "The Count Of Monte-Cristo: A Novel",
+"Le Comte de Monte-Cristo"... Each result gets a normalized title key
+(diacritics, case, punctuation, leading/trailing articles and subtitles
+stripped) and an author key (surname-ish tokens, life dates dropped), then:
+
+  1. results with the same title key and compatible authors form a cluster;
+  2. clusters with different keys are merged when their character-trigram
+     Jaccard clears a length-scaled threshold (fuzzy_threshold: about one
+     typo for titles of 8+ characters, catching "Monte Christo" and "Dune
+     Messah"), never across different numbers ("Book 2" vs "Book 3") or
+     authors;
+  3. each cluster keeps its best edition — EPUB over PDF over comics, then
+     source priority, then the larger known file — and records how many
+     editions were merged;
+  4. clusters are ordered by the best source that found them, then by that
+     source's own relevance order.
+
+A few hundred candidates rank in under a millisecond once their titles have
+been seen; a cold first search, which normalizes every title, takes roughly
+twice that (scripts/bench_book_ranking.py). Titles and authors not seen
+before are normalized in batches — a couple of whole-batch string passes
+rather than a regex call per result — and an author is only normalized when
+its result shares a key with another or its cluster is compared. Step 2 only
+runs inside groups of titles with the same numbers that hold more than one
+cluster, through a trigram prefix-filter index with cached per-key prefixes,
+so it never compares every pair. Title, author and trigram keys are
+memoized, since titles repeat across searches through the search cache.
+"""
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional, Sequence
+
+from app.ttl_cache import register_stats
+
+FUZZY_TITLE_THRESHOLD = 0.72
+# Keys with at least this many trigrams (8+ characters) may differ by a typo
+FUZZY_MIN_TRIGRAMS = 10
+FORMAT_PREFERENCE = ("epub", "pdf", "cbz", "cbr")
+_FORMAT_RANK = {fmt: i for i, fmt in enumerate(FORMAT_PREFERENCE)}
+
+_ARTICLES = {"the", "a", "an", "le", "la", "les", "l", "el", "los", "las", "der", "die", "das", "il", "lo"}
+_TRAILING_ARTICLES = {"the", "a", "an"}
+# One pass over many lowercased titles, one per line: words, '&', commas,
+# subtitle delimiters (':', ';', '(', '[', spaced dash) and line ends
+_TITLE_TOKEN_RE = re.compile(r"\w+|[&,:;(\[\n]|[^\S\n][-–—][^\S\n]")
+# Title bytes -> lowercase words, ' ' for whitespace, '|' for a subtitle delimiter
+# and '#' for other punctuation; '-' and '#' become spaces once ' - ' is marked.
+_ASCII_TITLE_TABLE = bytes.maketrans(
+    bytes(range(128)),
+    bytes(
+        c if chr(c).isalnum() or chr(c) in "_-&,\n"
+        else ord(" ") if chr(c).isspace()
+        else ord("|") if chr(c) in ":;(["
+        else ord("#")
+        for c in range(128)
+    ).lower(),
+)
+_ASCII_SEPARATOR_TABLE = bytes.maketrans(b"-#", b"  ")
+_WORD_RE = re.compile(r"\w+|&")
+_DIGITS_RE = re.compile(r"\d+")
+_MAYBE_DATES_RE = re.compile(r"[\d?(]")
+# Never crosses a line: authors are normalized one per line, like titles
+_AUTHOR_DATES_RE = re.compile(r"[\d?]{3,4}[^\S\n]*[-–][^\S\n]*[\d?]{0,4}|\(.*?\)|\b\d{3,4}\b")
+_UNKNOWN_AUTHORS = {"", "unknown", "unknown author", "anonymous", "various"}
+# Author bytes -> lowercase words and '&', everything else a space
+_ASCII_AUTHOR_TABLE = bytes.maketrans(
+    bytes(range(128)),
+    bytes(c if chr(c).isalnum() or chr(c) in "_&\n" else ord(" ") for c in range(128)).lower(),
+)
+
+_CACHE_MAX = 8192
+# title -> (key, numbers in the key)
+_title_cache: dict[str, tuple[str, tuple]] = {}
+_title_stats = {"hits": 0, "misses": 0}
+_author_cache: dict[str, frozenset] = {}
+_author_stats = {"hits": 0, "misses": 0}
+_TRIGRAM_SLICES = [slice(i, i + 3) for i in range(128)]
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+
+def _words(text: str) -> list[str]:
+    """Lowercase words with diacritics stripped and '&' spelled 'and'; punctuation dropped."""
+    if not text.isascii():
+        text = _strip_accents(text)
+    words = _WORD_RE.findall(text.lower())
+    if "&" in words:
+        words = ["and" if w == "&" else w for w in words]
+    return words
+
+
+def fuzzy_threshold(trigrams: int) -> float:
+    """
+    Trigram Jaccard two keys need to merge; trigrams is the shorter key's
+    count. A typo changes about three trigrams, so a fixed threshold would
+    reject one-typo variants of short titles ('dune essiah' vs 'dune messiah'
+    is 0.67): from FUZZY_MIN_TRIGRAMS up, one typo's worth is allowed.
+    """
+    if trigrams < FUZZY_MIN_TRIGRAMS:
+        return FUZZY_TITLE_THRESHOLD
+    return min(FUZZY_TITLE_THRESHOLD, (trigrams - 3) / (trigrams + 3))
+
+
+@lru_cache(maxsize=256)
+def _prefix_length(trigrams: int) -> int:
+    """
+    Filter prefix for a key of this many trigrams: sized for the lowest
+    threshold any partner that passes the length filter can impose.
+    """
+    lowest = min(
+        [fuzzy_threshold(trigrams)]
+        + [fuzzy_threshold(k) for k in range(1, trigrams) if k >= fuzzy_threshold(k) * trigrams]
+    )
+    return trigrams - math.ceil(lowest * trigrams) + 1
+
+
+def _key_numbers(key: str) -> tuple:
+    return () if key.replace(" ", "").isalpha() else tuple(_DIGITS_RE.findall(key))
+
+
+def _tokenize_titles(titles: list[str]) -> list[tuple[str, tuple]]:
+    """Title keys for accent-stripped titles of any script, one tokenizing pass."""
+    blob = "\n".join(titles).lower()
+    out: list[tuple[str, tuple]] = []
+    main: list[str] = []
+    extra: list[str] = []   # numbers kept from the subtitle
+    rest: list[str] = []    # subtitle words (fallback when the main title is empty)
+    in_main = True
+    comma_at = -1
+    for tok in _TITLE_TOKEN_RE.findall(blob + "\n"):
+        if tok == "\n" or (in_main and not (tok[0].isalnum() or tok[0] in "_&,")):
+            # End of the main title: 'Count of Monte Cristo, The' -> drop the trailing article
+            if in_main:
+                if comma_at == len(main) - 1 and main and main[-1] in _TRAILING_ARTICLES:
+                    main.pop()
+                in_main = False
+            if tok != "\n":
+                continue
+            out.append(_finish_key(main, extra, rest))
+            main, extra, rest = [], [], []
+            in_main, comma_at = True, -1
+        elif tok == ",":
+            if in_main:
+                comma_at = len(main)
+        elif in_main:
+            main.append("and" if tok == "&" else tok)
+        elif tok[0].isalnum() or tok[0] == "_" or tok == "&":
+            rest.append("and" if tok == "&" else tok)
+            if not tok.isalpha():
+                extra.extend(_DIGITS_RE.findall(tok))
+    return out
+
+
+def _split_ascii_titles(titles: list[str]) -> list[tuple[str, tuple]]:
+    """
+    Title keys for ASCII titles. One byte-table translate lowercases the batch
+    and marks subtitle delimiters with '|', so each line only needs C-level
+    partition/split calls.
+    """
+    blob = "\n".join(titles).encode().translate(_ASCII_TITLE_TABLE)
+    if b" - " in blob:
+        blob = blob.replace(b" - ", b" | ")
+    blob = blob.translate(_ASCII_SEPARATOR_TABLE)
+    if b"&" in blob:
+        blob = blob.replace(b"&", b" and ")
+    if b"," in blob:
+        blob = blob.replace(b",", b" , ")
+    out: list[tuple[str, tuple]] = []
+    for line in blob.decode().split("\n"):
+        main, subtitle, rest = line.partition("|")
+        words = main.split()
+        if "," in main:
+            if len(words) > 1 and words[-2] == "," and words[-1] in _TRAILING_ARTICLES:
+                del words[-2:]
+            words = [w for w in words if w != ","]
+        start = 0
+        while start < len(words) - 1 and words[start] in _ARTICLES:
+            start += 1
+        key_words = words[start:] if start else words
+        if subtitle and not rest.replace(" ", "").isalpha():
+            key_words = key_words + _DIGITS_RE.findall(rest)
+        key = " ".join(key_words)
+        if not key:
+            key = " ".join(words + rest.replace("|", " ").replace(",", " ").split())
+        out.append((key, _key_numbers(key)))
+    return out
+
+
+def _finish_key(main: list[str], extra: list[str], rest: list[str]) -> tuple[str, tuple]:
+    start = 0
+    while start < len(main) - 1 and main[start] in _ARTICLES:
+        start += 1
+    key = " ".join(main[start:] + extra if extra else main[start:]) or " ".join(main + rest)
+    return key, _key_numbers(key)
+
+
+def _normalize_titles(titles: list[str]) -> list[tuple[str, tuple]]:
+    """Title keys for titles without newlines; ASCII ones take the fast path."""
+    titles = [t if t.isascii() else _strip_accents(t) for t in titles]
+    if "".join(titles).isascii():
+        return _split_ascii_titles(titles)
+    out: list[tuple[str, tuple]] = [("", ())] * len(titles)
+    for wanted, normalize in ((True, _split_ascii_titles), (False, _tokenize_titles)):
+        indexes = [i for i, t in enumerate(titles) if t.isascii() is wanted]
+        if indexes:
+            for i, result in zip(indexes, normalize([titles[i] for i in indexes])):
+                out[i] = result
+    return out
+
+
+def _normalize_authors(authors: list[str]) -> list[frozenset]:
+    """Author keys for authors without newlines; one date pass over the batch."""
+    blob = "\n".join(authors)
+    if _MAYBE_DATES_RE.search(blob):
+        blob = _AUTHOR_DATES_RE.sub(" ", blob)
+    if blob.isascii():
+        blob = blob.encode().translate(_ASCII_AUTHOR_TABLE)
+        if b"&" in blob:
+            blob = blob.replace(b"&", b" and ")
+        lines = [line.split() for line in blob.decode().split("\n")]
+    else:
+        lines = [_words(line) for line in blob.split("\n")]
+    out: list[frozenset] = []
+    for words in lines:
+        if len(words) < 3 and " ".join(words) in _UNKNOWN_AUTHORS:
+            out.append(frozenset())
+        else:
+            out.append(frozenset(w for w in words if len(w) > 1))
+    return out
+
+
+def _cached_keys(cache: dict, stats: dict, texts: list[str], normalize) -> list:
+    """Keys for texts from cache, normalizing every uncached text in one batch."""
+    missing = [t for t in dict.fromkeys(texts) if t not in cache]
+    stats["misses"] += len(missing)
+    stats["hits"] += len(texts) - len(missing)
+    if missing:
+        if len(cache) + len(missing) > _CACHE_MAX:
+            cache.clear()
+            missing = list(dict.fromkeys(texts))
+        # One text per line in the batch
+        flat = [t.replace("\n", " ") for t in missing] if "\n" in "".join(missing) else missing
+        cache.update(zip(missing, normalize(flat)))
+    return [cache[t] for t in texts]
+
+
+def _title_keys(titles: list[str]) -> list[tuple[str, tuple]]:
+    """(key, numbers) per title."""
+    return _cached_keys(_title_cache, _title_stats, titles, _normalize_titles)
+
+
+def _author_keys(authors: list[str]) -> list[frozenset]:
+    return _cached_keys(_author_cache, _author_stats, authors, _normalize_authors)
+
+
+def title_key(title: str) -> str:
+    """
+    'Count of Monte-Cristo, The: A Novel' -> 'count of monte cristo'.
+    Numbers from a stripped subtitle are kept ('Dune: Book 2' -> 'dune 2')
+    so volumes never collapse into one key.
+    """
+    return _title_keys([title or ""])[0][0]
+
+
+def author_key(author: str) -> frozenset:
+    """Name tokens without dates, initials or order: 'Carroll, Lewis, 1832-1898' == 'Lewis Carroll'."""
+    key = _author_cache.get(author)
+    if key is None:
+        return _author_keys([author or ""])[0]
+    _author_stats["hits"] += 1
+    return key
+
+
+@lru_cache(maxsize=8192)
+def _trigrams(key: str) -> tuple[frozenset, tuple]:
+    """
+    (trigram set, filter prefix). The prefix comes from one fixed order shared
+    by every key, so it can be cached per key; reverse string order puts the
+    common word-start trigrams (' th', '  a') last.
+    """
+    padded = f"  {key} "
+    if len(padded) - 2 <= len(_TRIGRAM_SLICES):
+        grams = frozenset(map(padded.__getitem__, _TRIGRAM_SLICES[: len(padded) - 2]))
+    else:
+        grams = frozenset(map("".join, zip(padded, padded[1:], padded[2:])))
+    return grams, tuple(sorted(grams, reverse=True)[: _prefix_length(len(grams))])
+
+
+def clear_caches() -> None:
+    """Forget every memoized key (benchmarks measure the cold path with this)."""
+    _title_cache.clear()
+    _author_cache.clear()
+    _trigrams.cache_clear()
+
+
+register_stats("book_ranking.title_key", lambda: {**_title_stats, "currsize": len(_title_cache)})
+register_stats("book_ranking.author_key", lambda: {**_author_stats, "currsize": len(_author_cache)})
+register_stats("book_ranking._trigrams", lambda: _trigrams.cache_info()._asdict())
+
+
+def _authors_compatible(a: frozenset, b: frozenset) -> bool:
+    """
+    Unknown authors match anything; otherwise the names must share two tokens
+    (surname plus a given name) or most of the shorter name: 'Herbert' ==
+    'Frank Herbert', but 'Frank Herbert' != 'Brian Herbert'.
+    """
+    if not a or not b:
+        return True
+    shared = len(a & b)
+    return shared >= 2 or shared * 2 > min(len(a), len(b))
+
+
+def _size(result: dict) -> float:
+    try:
+        return float(result.get("size_mb") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _Cluster:
+    __slots__ = ("key", "numbers", "lead", "_authors", "members")
+
+    def __init__(self, key: str, numbers: tuple, members: list[tuple], authors: Optional[frozenset] = None):
+        self.key = key
+        self.numbers = numbers
+        self.members = members  # (source rank, input position, result)
+        self.lead = min(members)[:2]  # best (source rank, input position); positions are unique
+        self._authors = authors  # normalized on first use — most clusters are never compared
+
+    @property
+    def authors(self) -> frozenset:
+        """The first member's author key, or the first known one if that is empty."""
+        if self._authors is None:
+            self._authors = next(
+                (key for m in self.members if (key := author_key(m[2].get("author") or ""))), frozenset()
+            )
+        return self._authors
+
+    def absorb(self, other: "_Cluster") -> None:
+        self.members.extend(other.members)
+        self.lead = min(self.lead, other.lead)
+        self._authors = self.authors or other.authors
+
+
+def _edition_rank(member: tuple) -> tuple:
+    """EPUB > PDF > CBZ > CBR > other, then source priority, then larger known size."""
+    src, position, result = member
+    fmt = (result.get("format") or "").lower()
+    return (_FORMAT_RANK.get(fmt, len(_FORMAT_RANK)), src, -_size(result), position)
+
+
+def rank_results(results: Sequence[dict], source_priority: Sequence[str]) -> list[dict]:
+    """
+    Cluster near-duplicate results and return one copy of the best edition per
+    cluster (with "editions": cluster size), best clusters first. Input order
+    within a source is taken as that source's relevance order.
+    """
+    source_rank = {name: i for i, name in enumerate(source_priority)}
+    unranked = len(source_rank)
+
+    titled = [
+        (position, result) for position, result in enumerate(results)
+        if (title := result.get("title")) and isinstance(title, str) and not title.isspace()
+    ]
+    by_key: dict[tuple, list[tuple]] = {}
+    for (position, result), key in zip(titled, _title_keys([result["title"] for _, result in titled])):
+        member = (source_rank.get(result.get("source"), unranked), position, result)
+        if (same_key := by_key.get(key)) is None:
+            by_key[key] = [member]
+        else:
+            same_key.append(member)
+
+    # Results sharing a key are split by author: normalize those authors in one batch
+    authors = _author_keys([m[2].get("author") or "" for ms in by_key.values() if len(ms) > 1 for m in ms])
+
+    # Titles with different numbers never merge, so fuzzy matching only runs
+    # within a number group, and only where a group holds more than one cluster.
+    groups: dict[tuple, list[_Cluster]] = {}
+    start = 0
+    for (key, numbers), members in by_key.items():
+        group = groups.setdefault(numbers, [])
+        if len(members) == 1:
+            group.append(_Cluster(key, numbers, members))
+        else:
+            group.extend(_split_by_author(key, numbers, members, authors[start:start + len(members)]))
+            start += len(members)
+    merged: list[_Cluster] = []
+    for group in groups.values():
+        merged.extend(_merge_similar(group) if len(group) > 1 else group)
+
+    ranked = []
+    for cluster in sorted(merged, key=attrgetter("lead")):
+        members = cluster.members
+        best = members[0] if len(members) == 1 else min(members, key=_edition_rank)
+        row = dict(best[2])  # copy — cached rows must not change
+        row["editions"] = len(members)
+        ranked.append(row)
+    return ranked
+
+
+def _split_by_author(key: str, numbers: tuple, members: list[tuple], authors: list[frozenset]) -> list[_Cluster]:
+    """
+    Same-key results by incompatible authors ('Dune' by Herbert vs by Gibson)
+    stay apart. Each result joins the first compatible split, whose author is
+    its first known one.
+    """
+    splits: list[list] = []  # [author key, members]
+    for member, author in zip(members, authors):
+        for split in splits:
+            if _authors_compatible(split[0], author):
+                split[1].append(member)
+                split[0] = split[0] or author
+                break
+        else:
+            splits.append([author, [member]])
+    return [_Cluster(key, numbers, split_members, author) for author, split_members in splits]
+
+
+def _merge_similar(clusters: list[_Cluster]) -> list[_Cluster]:
+    """
+    Union clusters whose title keys are near-identical (trigram Jaccard >=
+    fuzzy_threshold of the shorter key). Candidate pairs come from prefix
+    filtering: with every key's trigrams in one fixed order, two sets that
+    reach threshold t must share one of their first len - ceil(t * len) + 1
+    trigrams (t the lowest threshold the key can face, _prefix_length), so
+    only clusters sharing a prefix trigram are ever compared.
+    """
+    parent = list(range(len(clusters)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    grams = [_trigrams(cluster.key) for cluster in clusters]
+    index: dict[str, list[int]] = {}
+    similar: list[tuple[int, int]] = []
+    for i, (gs, prefix) in enumerate(grams):
+        size = len(gs)
+        seen: set[int] = set()
+        for g in prefix:
+            bucket = index.get(g)
+            if bucket is None:
+                index[g] = [i]
+                continue
+            for j in bucket:
+                if j in seen:
+                    continue
+                seen.add(j)
+                other = grams[j][0]
+                small, large = (size, len(other)) if size <= len(other) else (len(other), size)
+                threshold = fuzzy_threshold(small)
+                if small < threshold * large:
+                    continue
+                shared = len(gs & other)
+                if shared < threshold * (size + len(other) - shared):
+                    continue
+                similar.append((i, j))
+            bucket.append(i)
+
+    # Authors only matter for similar titles: normalize them in one batch
+    _author_keys([
+        clusters[k].members[0][2].get("author") or ""
+        for k in {k for pair in similar for k in pair} if clusters[k]._authors is None
+    ])
+    for i, j in similar:
+        if _authors_compatible(clusters[i].authors, clusters[j].authors):
+            parent[find(i)] = find(j)
+
+    roots: dict[int, _Cluster] = {}
+    for i, cluster in enumerate(clusters):
+        root = find(i)
+        if root not in roots:
+            roots[root] = cluster
+        else:
+            roots[root].absorb(cluster)
+    return list(roots.values())
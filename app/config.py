@@ -33,11 +33,22 @@ class Settings(BaseSettings):
     KAVITA_URL: str = "http://172.17.0.1:8091"
     KAVITA_USERNAME: str = ""
     KAVITA_PASSWORD: str = ""
+    # Scans after downloads are coalesced per library: one scan once no new book
+    # has arrived for this many seconds (at most 4x this after the first).
+    KAVITA_SCAN_DEBOUNCE_SECS: float = 20.0
+    # Local Kavita catalog mirror (data/kavita_catalog.db) — full re-sync interval
+    KAVITA_CATALOG_SYNC_SECS: int = 30 * 60
 
     # Anna's Archive â€” optional DDoS-Guard session cookie for slow_download access.
     # Leave blank until you have a verified browser session from annas-archive.gl.
     # Set to the full Cookie header value from a logged-in browser session.
     ANNA_ARCHIVE_COOKIE: str = ""
+    # Resolve the top N Anna's Archive hits of every search in the background so
+    # picking one downloads at once (0 disables). Prefetches only ask Libgen
+    # unless ANNA_ARCHIVE_PREFETCH_SLOW_DOWNLOAD is set: falling through to
+    # slow_download spends download quota on a book nobody may pick.
+    ANNA_ARCHIVE_PREFETCH_TOP: int = 3
+    ANNA_ARCHIVE_PREFETCH_SLOW_DOWNLOAD: bool = False
 
     # OpenSubtitles - automatic subtitle download for completed videos
     OPENSUBTITLES_API_KEY: str = ""
@@ -52,6 +63,40 @@ class Settings(BaseSettings):
     SUBDL_API_KEY: str = ""
     SUBDL_LANGUAGES: str = "EN"
 
+    # Local state (SQLite indexes/caches). Mount a volume here so it survives rebuilds.
+    DATA_DIR: str = "/app/data"
+
+    # Subtitle index — how often the background crawler reconciles the Media tree
+    SUBTITLE_INDEX_CRAWL_SECS: int = 6 * 3600
+
+    # Librarian search — per-source result cache lifetime (data/search_cache.db)
+    BOOK_SEARCH_CACHE_TTL_SECS: int = 24 * 3600
+    # Gutenberg catalog index (data/gutenberg_catalog.db), built from the offline dump.
+    # Re-downloaded weekly; searches fall back to gutendex.com if it gets older than MAX_AGE.
+    # Set the URL to "" to disable the automatic download (load a file with
+    # scripts/load_gutenberg_catalog.py instead).
+    GUTENBERG_CATALOG_URL: str = "https://www.gutenberg.org/cache/epub/feeds/pg_catalog.csv.gz"
+    GUTENBERG_CATALOG_REFRESH_SECS: int = 7 * 24 * 3600
+    GUTENBERG_CATALOG_MAX_AGE_SECS: int = 30 * 24 * 3600
+    # Catalog hits in this language (ISO 639-1) rank ahead of translations of
+    # about the same relevance; "" ranks every language alike.
+    GUTENBERG_PREFERRED_LANGUAGE: str = "en"
+    # Standard Ebooks catalog (data/standard_ebooks_catalog.db), synced from the OPDS feed.
+    # The full feed needs a Patrons Circle e-mail; without one only new releases are
+    # synced and searches keep scraping the website.
+    STANDARD_EBOOKS_FEED_EMAIL: str = ""
+    STANDARD_EBOOKS_CATALOG_SYNC_SECS: int = 24 * 3600
+    STANDARD_EBOOKS_CATALOG_MAX_AGE_SECS: int = 7 * 24 * 3600
+    # Librarian downloads — hard cap per file (streamed to local temp, validated, then moved)
+    EBOOK_MAX_DOWNLOAD_MB: int = 1024
+    # Concurrent ebook downloads from any one host (single and batch downloads share the cap)
+    EBOOK_DOWNLOADS_PER_HOST: int = 2
+    # /librarian/download/batch — books fetched at once, and the most accepted per call
+    EBOOK_BATCH_CONCURRENCY: int = 4
+    EBOOK_BATCH_MAX_ITEMS: int = 50
+    # Ebook validation — worker processes for deep EPUB/CBZ/PDF checks (downloads and /librarian/validate)
+    EBOOK_VALIDATE_WORKERS: int = 2
+
     # slskd (Soulseek) — P2P music downloader
     # Use 172.17.0.1 (Docker bridge host IP) to reach slskd running on the VPS host.
     # SLSKD_USERNAME / SLSKD_PASSWORD: slskd web UI credentials (default: slskd / slskd).
@@ -0,0 +1,515 @@
+"""
+Deep structural validation of EPUB, CBZ and PDF files before Kavita sees them.
+
+validate_file() returns a report dict:
+
+  {"path": ..., "format": "epub", "ok": bool,
+   "errors": [...], "warnings": [...], "stats": {...}}
+
+Errors are things Kavita fails on (unreadable archive, no title, spine
+entries pointing at nothing, undecodable pages, truncated PDF); warnings are
+things readers cope with but that are worth knowing (page names that only
+sort correctly with natural ordering, stale xref offsets a reader rebuilds).
+
+  EPUB  container.xml → OPF → dc:title; manifest ids unique and every item
+        present in the archive; spine non-empty and every itemref in the
+        manifest; a sample of images decoded.
+  CBZ   page images present; page ordering (natural vs plain sort,
+        duplicate/missing page numbers); a sample of pages decoded;
+        ComicInfo.xml parses.
+  PDF   %PDF- header; %%EOF and startxref in the tail; startxref lands on an
+        xref table or xref stream; a sample of table offsets land on "n g obj".
+
+Images are decoded with Pillow when it is installed; otherwise JPEG/PNG/GIF/
+WebP are walked structurally (segment/chunk framing, PNG CRCs, end markers),
+which catches the truncated and zero-filled pages seen in practice.
+
+Validation is CPU and I/O heavy on large files, so the async entry points run
+it in a process pool; validate_tree() re-checks a whole library folder.
+"""
+import asyncio
+import multiprocessing
+import os
+import posixpath
+import re
+import struct
+import xml.etree.ElementTree as _ET
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Optional
+from urllib.parse import unquote
+
+try:
+    from PIL import Image as _PILImage
+except ImportError:  # pragma: no cover - Pillow is optional
+    _PILImage = None
+
+HAVE_PIL = _PILImage is not None
+
+IMAGE_SAMPLE = 12                       # images decoded per archive (evenly spaced)
+XREF_SAMPLE = 16                        # xref table offsets spot-checked per PDF
+_PDF_TAIL_BYTES = 4096
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif", ".jxl", ".bmp"}
+VALIDATED_FORMATS = ("epub", "cbz", "pdf")
+
+_NS_CONTAINER = {"ns": "urn:oasis:names:tc:opendocument:xmlns:container"}
+_NS_OPF = "{http://www.idpf.org/2007/opf}"
+_NS_DC = {"dc": "http://purl.org/dc/elements/1.1/"}
+
+
+def _report(path: str, fmt: str) -> dict:
+    return {"path": path, "format": fmt, "ok": True, "errors": [], "warnings": [], "stats": {}}
+
+
+def _sample(items: list, k: int) -> list:
+    """k items spread evenly over the list (first and last always included)."""
+    if len(items) <= k:
+        return list(items)
+    step = (len(items) - 1) / (k - 1)
+    return [items[round(i * step)] for i in range(k)]
+
+
+# ---------------------------------------------------------------------------
+# Image decodability
+# ---------------------------------------------------------------------------
+
+def _check_jpeg(data: bytes) -> Optional[str]:
+    if data[:2] != b"\xff\xd8":
+        return "missing JPEG SOI marker"
+    pos = 2
+    n = len(data)
+    while pos < n:
+        if data[pos] != 0xFF:
+            return f"bad JPEG segment marker at byte {pos}"
+        marker = data[pos + 1] if pos + 1 < n else None
+        if marker is None:
+            return "JPEG truncated inside a marker"
+        if marker == 0xFF:          # fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if pos + 4 > n:
+            return "JPEG truncated inside a segment header"
+        (length,) = struct.unpack(">H", data[pos + 2:pos + 4])
+        if marker == 0xDA:          # start of scan: entropy-coded data runs to EOI
+            # FF bytes inside scan data are stuffed (FF00), so FFD9 only appears as EOI
+            if data.rfind(b"\xff\xd9") <= pos:
+                return "JPEG truncated (no EOI marker after scan data)"
+            return None
+        pos += 2 + length
+    return "JPEG has no image data (no SOS segment)"
+
+
+def _check_png(data: bytes) -> Optional[str]:
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        return "missing PNG signature"
+    pos = 8
+    first = True
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        end = pos + 12 + length
+        if end > len(data):
+            return f"PNG truncated inside {ctype.decode('latin-1')} chunk"
+        if first and ctype != b"IHDR":
+            return "PNG does not start with IHDR"
+        first = False
+        (crc,) = struct.unpack(">I", data[end - 4:end])
+        if zlib.crc32(data[pos + 4:end - 4]) != crc:
+            return f"PNG CRC mismatch in {ctype.decode('latin-1')} chunk"
+        if ctype == b"IEND":
+            return None
+        pos = end
+    return "PNG truncated (no IEND chunk)"
+
+
+def _check_gif(data: bytes) -> Optional[str]:
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        return "missing GIF header"
+    if not data.rstrip(b"\x00").endswith(b"\x3b"):
+        return "GIF truncated (no trailer)"
+    return None
+
+
+def _check_webp(data: bytes) -> Optional[str]:
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return "missing RIFF/WEBP header"
+    (size,) = struct.unpack("<I", data[4:8])
+    if size + 8 > len(data):
+        return "WebP truncated"
+    return None
+
+
+_STRUCTURAL_CHECKS = {
+    ".jpg": _check_jpeg,
+    ".jpeg": _check_jpeg,
+    ".png": _check_png,
+    ".gif": _check_gif,
+    ".webp": _check_webp,
+}
+
+
+def check_image(data: bytes, name: str) -> Optional[str]:
+    """None if the image decodes, else a short reason."""
+    if not data:
+        return "empty file"
+    if not data.strip(b"\x00"):
+        return "file is all zero bytes"
+    if HAVE_PIL:
+        try:
+            with _PILImage.open(BytesIO(data)) as img:
+                img.load()
+            return None
+        except _PILImage.UnidentifiedImageError:
+            pass  # a format this Pillow build can't read (AVIF/JXL) — fall back to framing checks
+        except Exception as exc:
+            return f"{type(exc).__name__}: {exc}"
+    check = _STRUCTURAL_CHECKS.get(posixpath.splitext(name)[1].lower())
+    return check(data) if check else None
+
+
+def _check_images(zf: zipfile.ZipFile, names: list[str], report: dict) -> None:
+    sampled = _sample(names, IMAGE_SAMPLE)
+    bad = 0
+    for name in sampled:
+        try:
+            reason = check_image(zf.read(name), name)
+        except (zipfile.BadZipFile, zlib.error, OSError) as exc:   # CRC / deflate failures
+            reason = f"unreadable in archive ({exc})"
+        if reason:
+            bad += 1
+            report["errors"].append(f"image {name}: {reason}")
+    report["stats"]["images_sampled"] = len(sampled)
+    report["stats"]["images_bad"] = bad
+
+
+# ---------------------------------------------------------------------------
+# EPUB
+# ---------------------------------------------------------------------------
+
+def _validate_epub(path: str, report: dict) -> None:
+    errors, warnings, stats = report["errors"], report["warnings"], report["stats"]
+    with zipfile.ZipFile(path) as zf:
+        names = set(zf.namelist())
+
+        infos = zf.infolist()
+        if not infos or infos[0].filename != "mimetype":
+            warnings.append("'mimetype' is not the first archive entry")
+        elif zf.read("mimetype").strip() != b"application/epub+zip":
+            warnings.append("'mimetype' entry is not application/epub+zip")
+
+        if "META-INF/container.xml" not in names:
+            errors.append("EPUB is missing META-INF/container.xml")
+            return
+        try:
+            container = _ET.fromstring(zf.read("META-INF/container.xml"))
+        except Exception as exc:
+            errors.append(f"Could not parse META-INF/container.xml: {exc}")
+            return
+        rootfiles = container.findall(".//ns:rootfile", _NS_CONTAINER)
+        if not rootfiles:
+            errors.append("container.xml has no <rootfile> element")
+            return
+        opf_path = rootfiles[0].get("full-path", "")
+        if not opf_path or opf_path not in names:
+            errors.append(f"OPF package file '{opf_path}' not found in EPUB")
+            return
+        try:
+            opf = _ET.fromstring(zf.read(opf_path))
+        except Exception as exc:
+            errors.append(f"Could not parse OPF package '{opf_path}': {exc}")
+            return
+
+        title_el = opf.find(".//dc:title", _NS_DC)
+        if title_el is None or not (title_el.text or "").strip():
+            errors.append("EPUB OPF package has no <dc:title> metadata")
+
+        # Manifest: unique ids, every href present in the archive
+        opf_dir = posixpath.dirname(opf_path)
+        manifest: dict[str, tuple[str, str]] = {}
+        missing: list[str] = []
+        images: list[str] = []
+        for item in opf.iter(f"{_NS_OPF}item"):
+            item_id, href = item.get("id"), item.get("href")
+            if not item_id or not href:
+                errors.append("manifest <item> without id or href")
+                continue
+            if item_id in manifest:
+                errors.append(f"duplicate manifest id '{item_id}'")
+                continue
+            if "://" in href:
+                manifest[item_id] = (href, item.get("media-type", ""))
+                continue  # remote resource — nothing to find in the archive
+            full = posixpath.normpath(posixpath.join(opf_dir, unquote(href.split("#", 1)[0])))
+            manifest[item_id] = (full, item.get("media-type", ""))
+            if full not in names:
+                missing.append(full)
+            elif item.get("media-type", "").startswith("image/"):
+                images.append(full)
+        stats["manifest_items"] = len(manifest)
+        if not manifest:
+            errors.append("OPF manifest is empty")
+        for name in missing[:10]:
+            errors.append(f"manifest item missing from archive: {name}")
+        if len(missing) > 10:
+            errors.append(f"... and {len(missing) - 10} more missing manifest items")
+
+        # Spine: non-empty, every itemref resolves to a manifest item
+        spine = opf.find(f"{_NS_OPF}spine")
+        itemrefs = list(spine.iter(f"{_NS_OPF}itemref")) if spine is not None else []
+        stats["spine_items"] = len(itemrefs)
+        if not itemrefs:
+            errors.append("OPF spine is empty — no readable content")
+        for ref in itemrefs:
+            idref = ref.get("idref")
+            if idref not in manifest:
+                errors.append(f"spine itemref '{idref}' is not in the manifest")
+        toc = spine.get("toc") if spine is not None else None
+        if toc and toc not in manifest:
+            warnings.append(f"spine toc '{toc}' is not in the manifest")
+
+        _check_images(zf, images, report)
+
+
+# ---------------------------------------------------------------------------
+# CBZ
+# ---------------------------------------------------------------------------
+
+_DIGITS_RE = re.compile(r"(\d+)")
+
+
+def _natural_key(name: str) -> list:
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGITS_RE.split(name)]
+
+
+def _check_page_order(pages: list[str], report: dict) -> None:
+    warnings = report["warnings"]
+    natural = sorted(pages, key=_natural_key)
+    if natural != sorted(pages, key=str.lower):
+        warnings.append("page names are not zero-padded — plain sorting misorders pages")
+
+    # Page numbers: the last number in each file name, per folder
+    by_dir: dict[str, list[int]] = {}
+    for name in natural:
+        numbers = _DIGITS_RE.findall(posixpath.basename(name))
+        if numbers:
+            by_dir.setdefault(posixpath.dirname(name), []).append(int(numbers[-1]))
+    for folder, numbers in by_dir.items():
+        where = f" in '{folder}'" if folder else ""
+        dupes = len(numbers) - len(set(numbers))
+        if dupes:
+            warnings.append(f"{dupes} duplicate page number(s){where}")
+        if numbers and len(set(numbers)) > 1:
+            expected = max(numbers) - min(numbers) + 1
+            gaps = expected - len(set(numbers))
+            if 0 < gaps <= len(numbers):
+                warnings.append(f"{gaps} page number(s) missing from the sequence{where}")
+    if len(by_dir) > 1:
+        report["stats"]["page_folders"] = len(by_dir)
+
+
+def _validate_cbz(path: str, report: dict) -> None:
+    with zipfile.ZipFile(path) as zf:
+        names = [
+            n for n in zf.namelist()
+            if not n.endswith("/") and not n.startswith("__MACOSX/")
+            and not posixpath.basename(n).startswith(".")
+        ]
+        pages = sorted(
+            (n for n in names if posixpath.splitext(n)[1].lower() in IMAGE_EXTS), key=_natural_key
+        )
+        report["stats"]["pages"] = len(pages)
+        if not pages:
+            report["errors"].append("CBZ archive contains no page images")
+            return
+        _check_page_order(pages, report)
+
+        info = next((n for n in names if posixpath.basename(n).lower() == "comicinfo.xml"), None)
+        if info:
+            try:
+                _ET.fromstring(zf.read(info))
+            except Exception as exc:
+                report["warnings"].append(f"ComicInfo.xml does not parse: {exc}")
+
+        _check_images(zf, pages, report)
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)\s+%%EOF", re.S)
+_OBJ_RE = re.compile(rb"\s*\d+\s+\d+\s+obj\b")
+_XREF_SUBSECTION_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s*[\r\n]")
+_XREF_ENTRY_RE = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+
+
+def _validate_pdf(path: str, report: dict) -> None:
+    errors, warnings, stats = report["errors"], report["warnings"], report["stats"]
+    size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        head = fh.read(1024)
+        if b"%PDF-" not in head:
+            errors.append("File does not have a PDF header — likely an error page")
+            return
+        fh.seek(max(0, size - _PDF_TAIL_BYTES))
+        tail = fh.read()
+        if b"%%EOF" not in tail:
+            errors.append("PDF has no %%EOF marker — file is truncated")
+            return
+        matches = list(_STARTXREF_RE.finditer(tail))
+        if not matches:
+            errors.append("PDF has no startxref before %%EOF")
+            return
+        offset = int(matches[-1].group(1))
+        if offset >= size:
+            errors.append(f"startxref offset {offset} is past the end of the file ({size} bytes)")
+            return
+
+        fh.seek(offset)
+        window = fh.read(64 * 1024)
+        if window.lstrip().startswith(b"xref"):
+            stats["xref"] = "table"
+            _check_xref_table(fh, window, size, report)
+        elif _OBJ_RE.match(window):
+            stats["xref"] = "stream"   # compressed xref (PDF 1.5+); object layout not checked
+            if b"/XRef" not in window[:4096]:
+                warnings.append("startxref points at an object that is not an xref stream")
+        else:
+            errors.append("startxref does not point at an xref table or stream")
+            return
+
+        if b"/Encrypt" in tail or b"/Encrypt" in window[:8192]:
+            warnings.append("PDF is encrypted — Kavita may not be able to render it")
+
+
+def _check_xref_table(fh, window: bytes, size: int, report: dict) -> None:
+    pos = window.index(b"xref") + 4
+    entries: list[tuple[int, int]] = []
+    total = 0
+    while True:
+        m = _XREF_SUBSECTION_RE.match(window, pos)
+        if not m:
+            break
+        first, count = int(m.group(1)), int(m.group(2))
+        pos = m.end()
+        for i in range(count):
+            while pos < len(window) and window[pos:pos + 1] in b"\r\n ":
+                pos += 1
+            e = _XREF_ENTRY_RE.match(window, pos)
+            if not e:
+                break  # table runs past the read window — check what we have
+            if e.group(3) == b"n":
+                entries.append((first + i, int(e.group(1))))
+            pos = e.end()
+            total += 1
+    report["stats"]["xref_entries"] = total
+    if not total:
+        report["errors"].append("xref table is empty or malformed")
+        return
+
+    bad = 0
+    sampled = _sample(entries, XREF_SAMPLE)
+    for obj_num, offset in sampled:
+        if offset >= size:
+            bad += 1
+            continue
+        fh.seek(offset)
+        m = re.match(rb"\s*(\d+)\s+\d+\s+obj\b", fh.read(32))
+        if not m or int(m.group(1)) != obj_num:
+            bad += 1
+    if bad:
+        report["warnings"].append(
+            f"{bad} of {len(sampled)} sampled xref offsets are wrong — readers will have to rebuild the xref"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Entry points
+# ---------------------------------------------------------------------------
+
+_VALIDATORS = {
+    "epub": _validate_epub,
+    "cbz": _validate_cbz,
+    "pdf": _validate_pdf,
+}
+
+
+def validate_file(path: str, fmt: Optional[str] = None) -> dict:
+    """Validate one file (format from fmt or the extension). Never raises."""
+    fmt = (fmt or os.path.splitext(path)[1]).lower().lstrip(".")
+    report = _report(path, fmt)
+    validator = _VALIDATORS.get(fmt)
+    if validator is None:
+        report["warnings"].append(f"no deep validation for .{fmt} files")
+        return report
+    try:
+        report["stats"]["size_bytes"] = os.path.getsize(path)
+        validator(path, report)
+    except zipfile.BadZipFile:
+        report["errors"].append(f"File is not a valid ZIP/{fmt.upper()} archive")
+    except Exception as exc:
+        report["errors"].append(f"validator failed: {type(exc).__name__}: {exc}")
+    report["ok"] = not report["errors"]
+    return report
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 2
+
+
+def configure_pool(workers: int) -> None:
+    global _pool_workers
+    _pool_workers = max(1, workers)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and SQLite threads is unsafe
+        _pool = ProcessPoolExecutor(_pool_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def validate(path: str, fmt: Optional[str] = None) -> dict:
+    """validate_file in the worker pool (recreated once if a worker died)."""
+    global _pool
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        return await loop.run_in_executor(pool, validate_file, path, fmt)
+    except BrokenProcessPool:
+        if _pool is pool:
+            _pool = None
+        return await loop.run_in_executor(_get_pool(), validate_file, path, fmt)
+
+
+def _collect_files(root: str, formats: tuple[str, ...], max_files: Optional[int]) -> list[str]:
+    found: list[str] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower().lstrip(".") in formats and not name.startswith("."):
+                found.append(os.path.join(dirpath, name))
+                if max_files and len(found) >= max_files:
+                    return found
+    return found
+
+
+async def validate_tree(
+    root: str, formats: tuple[str, ...] = VALIDATED_FORMATS, max_files: Optional[int] = None
+) -> list[dict]:
+    """Validate every matching file under root in parallel (bounded by the pool size)."""
+    paths = await asyncio.to_thread(_collect_files, root, formats, max_files)
+    return list(await asyncio.gather(*(validate(p) for p in paths)))
@@ -0,0 +1,45 @@
+"""
+Small filesystem helpers shared by the subtitle and ebook pipelines.
+
+Writes to the rclone FUSE mount go through a sibling temp file followed by
+os.replace, so Jellyfin/Kavita never see a half-written file.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@contextmanager
+def atomic_writer(dest_path: str, mode: str = "wb", **open_kwargs) -> Iterator:
+    """Yield a file handle whose contents replace dest_path only if the block succeeds."""
+    directory = os.path.dirname(dest_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".part", dir=directory)
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as fh:
+            yield fh
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_stream_atomic(stream: BinaryIO, dest_path: str, expected_size: Optional[int] = None) -> None:
+    """
+    Copy a file-like stream into dest_path in fixed-size chunks, atomically.
+    With expected_size (e.g. the response's Content-Length), a stream that ends
+    early raises OSError and dest_path is left untouched.
+    """
+    with atomic_writer(dest_path) as fh:
+        written = 0
+        while chunk := stream.read(STREAM_CHUNK_SIZE):
+            fh.write(chunk)
+            written += len(chunk)
+        if expected_size is not None and written != expected_size:
+            raise OSError(f"short read: got {written} of {expected_size} bytes")
@@ -0,0 +1,159 @@
+"""
+Persistent job/state store (SQLite) for the music and YouTube routers.
+
+Replaces per-module dicts (search results awaiting a pick, download jobs,
+playlist contents) that grew for the life of the process and vanished on
+restart, orphaning in-flight downloads. Records are JSON documents keyed by
+(kind, id), with:
+
+  - a status column (indexed), so unfinished jobs can be found and resumed
+    on startup;
+  - a per-record TTL, counted from the last write — expired records are
+    invisible immediately and purged from disk and memory periodically;
+  - an in-memory read-through cache (a bounded TTLCache — entry and byte
+    budgets, LRU eviction), so status polls don't hit SQLite.
+
+Writes go through put()/update(); dicts returned by get() are the cached
+copies and must not be mutated directly (the change would not be persisted).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+from app.ttl_cache import TTLCache
+
+PURGE_INTERVAL_SECS = 10 * 60
+CACHE_MAX_ENTRIES = 500
+CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    kind        TEXT NOT NULL,
+    id          TEXT NOT NULL,
+    status      TEXT,
+    data_json   TEXT NOT NULL,
+    ttl_secs    REAL NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (kind, status);
+CREATE INDEX IF NOT EXISTS jobs_expires ON jobs (expires_at);
+"""
+
+
+class JobStore:
+    def __init__(self, db_path: str, name: str = "jobs"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # (kind, id) -> (data, ttl_secs); evicted entries are simply re-read from disk
+        self._cache = TTLCache(f"{name}_cache", CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+        self._last_purge = 0.0
+        self.purge_expired()
+
+    def put(self, kind: str, job_id: str, data: dict, ttl_secs: float) -> dict:
+        """Create or replace a record; it expires ttl_secs after its last write."""
+        now = time.time()
+        data_json = json.dumps(data, default=str)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (kind, id, status, data_json, ttl_secs, created_at, updated_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(kind, id) DO UPDATE SET
+                    status = excluded.status,
+                    data_json = excluded.data_json,
+                    ttl_secs = excluded.ttl_secs,
+                    updated_at = excluded.updated_at,
+                    expires_at = excluded.expires_at
+                """,
+                (kind, job_id, data.get("status"), data_json, ttl_secs, now, now, now + ttl_secs),
+            )
+            self._cache.set((kind, job_id), (data, ttl_secs), ttl_secs, size=len(data_json))
+        self._maybe_purge(now)
+        return data
+
+    def get(self, kind: str, job_id: str) -> Optional[dict]:
+        with self._lock:
+            cached = self._cache.get((kind, job_id))
+            if cached is not None:
+                return cached[0]
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT data_json, ttl_secs, expires_at FROM jobs WHERE kind = ? AND id = ? AND expires_at > ?",
+                (kind, job_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+            data = json.loads(row["data_json"])
+            self._cache.set(
+                (kind, job_id), (data, row["ttl_secs"]), row["expires_at"] - now, size=len(row["data_json"])
+            )
+            return data
+
+    def update(self, kind: str, job_id: str, **fields: Any) -> Optional[dict]:
+        """Merge fields into a live record and persist it (refreshing its TTL); None if missing/expired."""
+        data = self.get(kind, job_id)
+        if data is None:
+            return None
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT ttl_secs FROM jobs WHERE kind = ? AND id = ?", (kind, job_id)).fetchone()
+            if row is None:  # purged between get() and now
+                return None
+            ttl_secs = row["ttl_secs"]
+            data.update(fields)
+            data_json = json.dumps(data, default=str)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, data_json = ?, updated_at = ?, expires_at = ? WHERE kind = ? AND id = ?",
+                (data.get("status"), data_json, now, now + ttl_secs, kind, job_id),
+            )
+            self._cache.set((kind, job_id), (data, ttl_secs), ttl_secs, size=len(data_json))
+        return data
+
+    def by_status(self, kind: str, statuses: Iterable[str]) -> list[tuple[str, dict]]:
+        """(id, data) of live records of kind in any of statuses, oldest first."""
+        statuses = list(statuses)
+        with self._lock:
+            ids = [
+                r["id"]
+                for r in self._conn.execute(
+                    f"SELECT id FROM jobs WHERE kind = ? AND status IN ({','.join('?' * len(statuses))}) "
+                    "AND expires_at > ? ORDER BY created_at",
+                    (kind, *statuses, time.time()),
+                )
+            ]
+        return [(job_id, data) for job_id in ids if (data := self.get(kind, job_id)) is not None]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,)).rowcount
+        self._cache.purge_expired()
+        self._last_purge = now
+        return removed
+
+    def _maybe_purge(self, now: float) -> None:
+        if now - self._last_purge >= PURGE_INTERVAL_SECS:
+            self.purge_expired()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, status, COUNT(*) AS n FROM jobs WHERE expires_at > ? GROUP BY kind, status",
+                (time.time(),),
+            ).fetchall()
+        by_kind: dict[str, dict] = {}
+        for r in rows:
+            by_kind.setdefault(r["kind"], {})[r["status"] or "-"] = r["n"]
+        return {"records": by_kind, "cache": self._cache.stats()}
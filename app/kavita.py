@@ -1,28 +1,49 @@
+import asyncio
+import logging
+import posixpath
 import time
 from typing import Optional
 
 import httpx
 
+from app.token_manager import TokenAuth, TokenManager
+
+logger = logging.getLogger("uvicorn.error")
+
+AUTH_TTL = 20 * 60                  # re-login after 20 minutes
+LIBRARY_CACHE_TTL = 60 * 60         # library ids/folders rarely change
+MAX_FOLDER_SCANS = 5                # more pending folders than this → one library scan
+
 
 class KavitaClient:
     """
     Kavita API client — handles auth (JWT), library listing, search, and scan.
     Internal URL: http://localhost:8091 (host port 8091 → container port 5000)
+
+    Scans requested through request_scan() are coalesced per library: requests
+    arriving within scan_debounce seconds of each other (capped at
+    4 × scan_debounce from the first) become one scan. If only a few folders
+    changed and the server supports it, just those folders are scanned
+    (POST /api/Library/scan-folder); otherwise the whole library.
     """
 
-    def __init__(self, url: str, username: str, password: str):
+    def __init__(self, url: str, username: str, password: str, scan_debounce: float = 20.0):
         self.url = url.rstrip("/")
         self.username = username
         self.password = password
-        self._token: Optional[str] = None
-        self._auth_time: float = 0.0
-        self._auth_ttl: float = 20 * 60  # refresh token after 20 minutes
-
-    async def _ensure_auth(self) -> None:
-        now = time.monotonic()
-        if self._token and (now - self._auth_time) < self._auth_ttl:
-            return
+        self._api_key: Optional[str] = None
+        # JWT: one login at a time, refreshed ahead of the 20-minute mark, re-login once on a 401
+        self._tokens = TokenManager("kavita", self._login)
+        self._auth = TokenAuth(self._tokens)
+        self._libraries: Optional[list[dict]] = None
+        self._libraries_time: float = 0.0
+        self.scan_debounce = scan_debounce
+        self._scan_folder_supported = True
+        self._pending_scans: dict[int, dict] = {}
+        self._scan_tasks: dict[int, asyncio.Task] = {}
+        self._flushing: set[int] = set()  # libraries whose scan task is inside _flush_scan
 
+    async def _login(self) -> tuple[str, float]:
         async with httpx.AsyncClient() as client:
             resp = await client.post(
                 f"{self.url}/api/Account/login",
@@ -31,56 +52,229 @@ class KavitaClient:
             )
             resp.raise_for_status()
             data = resp.json()
-            self._token = data.get("token")
-            if not self._token:
-                raise RuntimeError(f"Kavita login failed — no token in response: {data}")
-        self._auth_time = now
-
-    def _headers(self) -> dict:
-        return {"Authorization": f"Bearer {self._token}"}
+        token = data.get("token")
+        if not token:
+            raise RuntimeError(f"Kavita login failed — no token in response: {data}")
+        self._api_key = data.get("apiKey")  # needed by scan-folder, which takes no JWT
+        return token, AUTH_TTL
 
-    async def get_libraries(self) -> list[dict]:
-        """Return all libraries with their IDs and names."""
-        await self._ensure_auth()
+    async def get_libraries(self, refresh: bool = False) -> list[dict]:
+        """Return all libraries with their IDs, names and folders (cached for an hour)."""
+        now = time.monotonic()
+        if not refresh and self._libraries is not None and now - self._libraries_time < LIBRARY_CACHE_TTL:
+            return self._libraries
         async with httpx.AsyncClient() as client:
             resp = await client.get(
                 f"{self.url}/api/Library/libraries",
-                headers=self._headers(),
+                auth=self._auth,
                 timeout=10,
             )
             resp.raise_for_status()
-            return resp.json()
+            self._libraries = resp.json()
+            self._libraries_time = now
+            return self._libraries
 
-    async def get_library_id(self, name_contains: str) -> Optional[int]:
-        """Find library ID by partial name match (case-insensitive)."""
-        libraries = await self.get_libraries()
+    async def get_library(self, name_contains: str) -> Optional[dict]:
+        """Find a library by partial name match (case-insensitive); refreshes the cache once on a miss."""
         name_lower = name_contains.lower()
-        for lib in libraries:
-            if name_lower in lib.get("name", "").lower():
-                return lib["id"]
+        for refresh in (False, True):
+            for lib in await self.get_libraries(refresh=refresh):
+                if name_lower in lib.get("name", "").lower():
+                    return lib
         return None
 
+    async def get_library_id(self, name_contains: str) -> Optional[int]:
+        """Find library ID by partial name match (case-insensitive)."""
+        lib = await self.get_library(name_contains)
+        return lib["id"] if lib else None
+
     async def scan_library(self, library_id: int) -> bool:
         """Trigger a library scan. Returns True if scan was queued successfully."""
-        await self._ensure_auth()
         async with httpx.AsyncClient() as client:
             resp = await client.post(
                 f"{self.url}/api/Library/scan",
                 params={"libraryId": library_id, "force": False},
-                headers=self._headers(),
+                auth=self._auth,
                 timeout=10,
             )
             # Kavita returns 200 on success
             return resp.status_code == 200
 
+    async def scan_folder(self, folder_path: str) -> bool:
+        """
+        Scan one folder (a series folder inside a library) as Kavita sees it.
+        Returns False — and stops trying — if the server has no scan-folder endpoint.
+        """
+        if not self._scan_folder_supported:
+            return False
+        await self._tokens.get()  # logging in also fetches the api key
+        if not self._api_key:
+            self._scan_folder_supported = False
+            return False
+        async with httpx.AsyncClient() as client:
+            resp = await client.post(
+                f"{self.url}/api/Library/scan-folder",
+                json={"apiKey": self._api_key, "folderPath": folder_path},
+                timeout=10,
+            )
+        if resp.status_code in (404, 405):
+            logger.info("Kavita has no scan-folder endpoint — falling back to library scans")
+            self._scan_folder_supported = False
+            return False
+        return resp.status_code == 200
+
+    # ------------------------------------------------------------------
+    # Coalesced scans
+    # ------------------------------------------------------------------
+
+    def request_scan(self, library: dict, subfolder: Optional[str] = None) -> None:
+        """
+        Schedule a scan of library (a get_library() dict). subfolder is a path
+        relative to the library root (e.g. the author folder a book was saved
+        to); None asks for the whole library.
+        """
+        library_id = library["id"]
+        now = time.monotonic()
+        pending = self._pending_scans.get(library_id)
+        if pending is None:
+            pending = self._pending_scans[library_id] = {
+                "library": library, "folders": set(), "full": False, "first": now, "last": now,
+            }
+        pending["last"] = now
+        if subfolder is None:
+            pending["full"] = True
+        else:
+            pending["folders"].add(subfolder)
+        task = self._scan_tasks.get(library_id)
+        if task is None or task.done():
+            self._scan_tasks[library_id] = asyncio.create_task(self._run_scan(library_id))
+
+    def cancel_pending_scan(self, library_id: int) -> None:
+        """Drop a scheduled scan (e.g. a full scan was just triggered directly)."""
+        self._pending_scans.pop(library_id, None)
+        self._cancel_waiting_scan(library_id)
+
+    async def flush_scan(self, library_id: int) -> bool:
+        """Run a library's scheduled scan now instead of waiting out the debounce."""
+        pending = self._pending_scans.pop(library_id, None)
+        if pending is None:
+            return False
+        self._cancel_waiting_scan(library_id)
+        await self._flush_scan(pending)
+        return True
+
+    def _cancel_waiting_scan(self, library_id: int) -> None:
+        """
+        Cancel a library's scan task if it is only waiting out the debounce.
+        A task already scanning an earlier batch is left to finish it; with
+        the pending entry gone, it finds nothing more to do and exits.
+        """
+        if library_id in self._flushing:
+            return
+        task = self._scan_tasks.pop(library_id, None)
+        if task is not None:
+            task.cancel()
+
+    def pending_scans(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "library_id": library_id,
+                "library": p["library"].get("name"),
+                "full": p["full"],
+                "folders": sorted(p["folders"]),
+                "scan_in_secs": round(max(0.0, self._scan_due(p) - now), 1),
+            }
+            for library_id, p in self._pending_scans.items()
+        ]
+
+    def _scan_due(self, pending: dict) -> float:
+        return min(pending["last"] + self.scan_debounce, pending["first"] + 4 * self.scan_debounce)
+
+    async def _run_scan(self, library_id: int) -> None:
+        # Runs until nothing is pending: requests that arrive during a flush
+        # see this task still alive and rely on it to pick them up.
+        while True:
+            pending = self._pending_scans.get(library_id)
+            if pending is None:
+                return
+            wait = self._scan_due(pending) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            pending = self._pending_scans.pop(library_id)
+            self._flushing.add(library_id)
+            try:
+                await self._flush_scan(pending)
+            except Exception as exc:
+                logger.warning("Kavita scan of library %s failed: %s", library_id, exc)
+            finally:
+                self._flushing.discard(library_id)
+
+    async def _flush_scan(self, pending: dict) -> None:
+        library = pending["library"]
+        folders = sorted(pending["folders"])
+        roots = library.get("folders") or []
+        if not pending["full"] and folders and len(folders) <= MAX_FOLDER_SCANS and len(roots) == 1:
+            results = [await self.scan_folder(posixpath.join(roots[0], f)) for f in folders]
+            if all(results):
+                logger.info("Kavita: scanned %d folder(s) in %s", len(folders), library.get("name"))
+                return
+        ok = await self.scan_library(library["id"])
+        logger.info("Kavita: library scan of %s %s", library.get("name"), "queued" if ok else "failed")
+
+    # ------------------------------------------------------------------
+    # Catalog listing (used by kavita_catalog to mirror series locally)
+    # ------------------------------------------------------------------
+
+    async def list_series(self, page: int, page_size: int = 500) -> list[dict]:
+        """One page of every series across all libraries (SeriesDto), oldest id first."""
+        async with httpx.AsyncClient() as client:
+            resp = await client.post(
+                f"{self.url}/api/Series/all-v2",
+                params={"PageNumber": page, "PageSize": page_size},
+                json={"statements": [], "combination": 1, "limitTo": 0,
+                      "sortOptions": {"sortField": 1, "isAscending": True}},
+                auth=self._auth,
+                timeout=30,
+            )
+            resp.raise_for_status()
+            return resp.json()
+
+    async def series_metadata(self, series_id: int) -> dict:
+        """SeriesMetadataDto — writers, genres, summary, …"""
+        async with httpx.AsyncClient() as client:
+            resp = await client.get(
+                f"{self.url}/api/Series/metadata",
+                params={"seriesId": series_id},
+                auth=self._auth,
+                timeout=10,
+            )
+            resp.raise_for_status()
+            return resp.json()
+
+    async def series_volumes(self, series_id: int) -> list[dict]:
+        async with httpx.AsyncClient() as client:
+            resp = await client.get(
+                f"{self.url}/api/Series/volumes",
+                params={"seriesId": series_id},
+                auth=self._auth,
+                timeout=10,
+            )
+            resp.raise_for_status()
+            return resp.json()
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
     async def search(self, query: str) -> dict:
         """Search Kavita library. Returns series/chapter matches."""
-        await self._ensure_auth()
         async with httpx.AsyncClient() as client:
             resp = await client.get(
                 f"{self.url}/api/Search/search",
                 params={"queryString": query},
-                headers=self._headers(),
+                auth=self._auth,
                 timeout=10,
             )
             resp.raise_for_status()
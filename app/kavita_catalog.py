@@ -0,0 +1,359 @@
+"""
+Local mirror (SQLite) of the Kavita catalog for "do we already own this?" checks.
+
+Kavita's /api/Search/search is a network round-trip per query, and any series
+hit at all used to count as "owned". Instead, every series (name, localized
+and original names, format, library, writers, volume names) is synced into a
+local table periodically and shortly after each scan, and owned checks are a
+local fuzzy lookup that returns a confidence score:
+
+  - title words covered: every significant word of a series name should
+    appear in the query ("Dune" does not own "Dune Messiah");
+  - numbers must agree: "Dune 2" is not series "Dune" (unless Dune has a
+    volume 2) and "Harry Potter 2" is not "Harry Potter 1";
+  - unexplained query words lower the score, except the series' writer
+    ("Atomic Habits James Clear") and volume words ("Saga vol 3");
+  - a character-level ratio catches typos ("Hary Potter"), but never lifts
+    a query with unexplained words above its word score;
+  - names are also matched without their subtitle, at reduced confidence:
+    "The Hunger Games" alone does not own "The Hunger Games: Catching Fire",
+    "Atomic Habits James Clear" still owns "Atomic Habits: An Easy…".
+
+Sync is incremental: the series list is re-read each time (one request per
+500 series) but writers/volumes are only fetched for new series or ones whose
+last-chapter-added timestamp changed. Until the first sync completes the
+catalog reports itself not ready and callers fall back to Kavita search.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from difflib import SequenceMatcher
+from typing import Optional
+
+from app.kavita import KavitaClient
+from app.search_cache import normalize_query
+
+logger = logging.getLogger("uvicorn.error")
+
+OWNED_CONFIDENCE = 0.8
+# A match on a name with its subtitle stripped stays below OWNED_CONFIDENCE
+# unless the writer's name in the query lifts it.
+STRIPPED_NAME_WEIGHT = 0.75
+_CLOSE_WORD_RATIO = 0.8
+_PAGE_SIZE = 500
+_DETAIL_CONCURRENCY = 4
+_STOPWORDS = {"the", "a", "an", "of", "and", "le", "la", "el", "der", "die", "das"}
+_VOLUME_WORDS = {"vol", "volume", "v", "book", "tome", "part", "issue"}
+_SUBTITLE_SPLIT_RE = re.compile(r"\s*(?::|\s-\s|\s—\s|\()")
+
+# Kavita MangaFormat enum
+_FORMATS = {0: "image", 1: "archive", 2: "unknown", 3: "epub", 4: "pdf"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id                  INTEGER PRIMARY KEY,
+    library_id          INTEGER,
+    library_name        TEXT,
+    name                TEXT NOT NULL,
+    localized_name      TEXT,
+    original_name       TEXT,
+    format              TEXT,
+    authors_json        TEXT NOT NULL DEFAULT '[]',
+    volumes_json        TEXT NOT NULL DEFAULT '[]',
+    last_chapter_added  TEXT,
+    synced_at           REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key     TEXT PRIMARY KEY,
+    value   TEXT NOT NULL
+);
+"""
+
+
+def _tokens(text: str) -> set[str]:
+    return set(normalize_query(text).split())
+
+
+def _significant(tokens: set[str]) -> set[str]:
+    return (tokens - _STOPWORDS) or tokens
+
+
+def _numbers(tokens: set[str]) -> set[str]:
+    return {t.lstrip("0") or "0" for t in tokens if t.isdigit()}
+
+
+def _close_word(a: str, b: str) -> bool:
+    """A likely typo of the same word ('hary' / 'harry'); numbers never are."""
+    return a.isalpha() and b.isalpha() and SequenceMatcher(None, a, b).ratio() >= _CLOSE_WORD_RATIO
+
+
+class _Entry:
+    __slots__ = ("row", "names", "author_tokens", "volume_tokens")
+
+    def __init__(self, row: dict):
+        self.row = row
+        names: dict[str, float] = {}  # normalized name -> weight (1.0, or subtitle stripped)
+        for raw in (row["name"], row["localized_name"], row["original_name"]):
+            if not raw:
+                continue
+            for variant, weight in ((raw, 1.0), (_SUBTITLE_SPLIT_RE.split(raw, 1)[0], STRIPPED_NAME_WEIGHT)):
+                norm = normalize_query(variant)
+                if norm and weight > names.get(norm, 0.0):
+                    names[norm] = weight
+        self.names = names
+        self.author_tokens: set[str] = set()
+        for author in json.loads(row["authors_json"]):
+            self.author_tokens |= _tokens(author)
+        self.volume_tokens: set[str] = set(_VOLUME_WORDS)
+        for volume in json.loads(row["volumes_json"]):
+            self.volume_tokens |= _tokens(str(volume))
+
+    def score(self, query_norm: str, query_tokens: set[str]) -> float:
+        query_sig = _significant(query_tokens)
+        query_numbers = _numbers(query_tokens - self.author_tokens)
+        stripped = " ".join(t for t in query_norm.split() if t not in self.author_tokens) or query_norm
+        best = 0.0
+        for name, weight in self.names.items():
+            name_tokens = set(name.split())
+            name_numbers = _numbers(name_tokens)
+            # Differing numbers are different books: a veto, not a penalty
+            if name_numbers - query_numbers or query_numbers - name_numbers - _numbers(self.volume_tokens):
+                continue
+            name_sig = _significant(name_tokens)
+            missing = name_sig - query_sig
+            leftover = query_sig - name_sig - self.author_tokens - self.volume_tokens
+            typos = 0
+            for word in sorted(leftover):
+                typo_of = next((m for m in sorted(missing) if _close_word(word, m)), None)
+                if typo_of is not None:
+                    leftover.discard(word)
+                    missing.discard(typo_of)
+                    typos += 1
+            coverage = 1 - len(missing) / len(name_sig)
+            precision = 1 - len(leftover) / len(query_sig)
+            token_score = coverage * (0.5 + 0.5 * precision)
+            fuzzy = SequenceMatcher(None, stripped, name).ratio()
+            # Typos count as covered words but never as an exact match; real
+            # leftover words cap the ratio at the word score.
+            if typos:
+                token_score = min(token_score, fuzzy)
+            if leftover:
+                fuzzy = min(fuzzy, token_score)
+            best = max(best, weight * max(token_score, fuzzy))
+        if self.author_tokens and self.author_tokens & query_tokens:
+            best = min(1.0, best + 0.1 * len(self.author_tokens & query_tokens) / len(self.author_tokens))
+        return best
+
+
+class KavitaCatalog:
+    def __init__(self, db_path: str, client: KavitaClient):
+        self.db_path = db_path
+        self.client = client
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._entries: list[_Entry] = []
+        self._by_token: dict[str, set[int]] = {}
+        self._sync_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+        self._sync_due = 0.0
+        self._load()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    @property
+    def last_sync(self) -> Optional[float]:
+        value = self._meta("last_sync")
+        return float(value) if value else None
+
+    @property
+    def ready(self) -> bool:
+        return self.last_sync is not None
+
+    def _load(self) -> None:
+        with self._lock:
+            rows = [dict(r) for r in self._conn.execute("SELECT * FROM series")]
+        entries = [_Entry(r) for r in rows]
+        by_token: dict[str, set[int]] = {}
+        for i, entry in enumerate(entries):
+            for name in entry.names:
+                for token in name.split():
+                    by_token.setdefault(token, set()).add(i)
+        self._entries, self._by_token = entries, by_token
+
+    def stats(self) -> dict:
+        last = self.last_sync
+        return {
+            "ready": last is not None,
+            "series": len(self._entries),
+            "last_sync_age_secs": round(time.time() - last) if last else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def lookup(self, query: str, limit: int = 3) -> list[dict]:
+        """Best-matching series for a free-text title (+ author) query, with confidence 0..1."""
+        query_norm = normalize_query(query)
+        query_tokens = set(query_norm.split())
+        if not query_tokens:
+            return []
+        entries, by_token = self._entries, self._by_token
+        candidates: set[int] = set()
+        for token in _significant(query_tokens):
+            candidates |= by_token.get(token, set())
+        scored = sorted(
+            ((entries[i].score(query_norm, query_tokens), entries[i]) for i in candidates),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )[:limit]
+        return [
+            {
+                "series_id": entry.row["id"],
+                "name": entry.row["name"],
+                "library": entry.row["library_name"],
+                "format": entry.row["format"],
+                "authors": json.loads(entry.row["authors_json"]),
+                "confidence": round(score, 3),
+            }
+            for score, entry in scored
+        ]
+
+    def owned(self, query: str) -> Optional[dict]:
+        """The best match if it clears OWNED_CONFIDENCE, else None."""
+        matches = self.lookup(query, limit=1)
+        return matches[0] if matches and matches[0]["confidence"] >= OWNED_CONFIDENCE else None
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    async def _details(self, series: dict, sem: asyncio.Semaphore) -> tuple[list[str], list[str]]:
+        async with sem:
+            authors: list[str] = []
+            volumes: list[str] = []
+            try:
+                meta = await self.client.series_metadata(series["id"])
+                authors = [w.get("name", "") for w in meta.get("writers") or [] if w.get("name")]
+            except Exception as exc:
+                logger.debug("Kavita catalog: metadata for series %s failed: %s", series["id"], exc)
+            try:
+                vols = await self.client.series_volumes(series["id"])
+                volumes = [str(v.get("name") or v.get("number") or "") for v in vols or []]
+                volumes = [v for v in volumes if v and v not in ("0", "-100000")]  # loose-chapter placeholders
+            except Exception as exc:
+                logger.debug("Kavita catalog: volumes for series %s failed: %s", series["id"], exc)
+            return authors, volumes
+
+    async def sync(self) -> dict:
+        """Mirror the Kavita series list; fetch writers/volumes only for new or changed series."""
+        async with self._sync_lock:
+            started = time.monotonic()
+            listing: list[dict] = []
+            page = 1
+            while True:
+                batch = await self.client.list_series(page, _PAGE_SIZE)
+                listing.extend(batch)
+                if len(batch) < _PAGE_SIZE:
+                    break
+                page += 1
+
+            with self._lock:
+                known = {
+                    r["id"]: r["last_chapter_added"]
+                    for r in self._conn.execute("SELECT id, last_chapter_added FROM series")
+                }
+            changed = [s for s in listing if s["id"] not in known or known[s["id"]] != s.get("lastChapterAdded")]
+            sem = asyncio.Semaphore(_DETAIL_CONCURRENCY)
+            details = await asyncio.gather(*(self._details(s, sem) for s in changed))
+
+            now = time.time()
+            present = {s["id"] for s in listing}
+            removed = [sid for sid in known if sid not in present] if listing else []
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT INTO series (id, library_id, library_name, name, localized_name, original_name,
+                                        format, authors_json, volumes_json, last_chapter_added, synced_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        library_id = excluded.library_id,
+                        library_name = excluded.library_name,
+                        name = excluded.name,
+                        localized_name = excluded.localized_name,
+                        original_name = excluded.original_name,
+                        format = excluded.format,
+                        authors_json = excluded.authors_json,
+                        volumes_json = excluded.volumes_json,
+                        last_chapter_added = excluded.last_chapter_added,
+                        synced_at = excluded.synced_at
+                    """,
+                    [
+                        (
+                            s["id"], s.get("libraryId"), s.get("libraryName"), s.get("name") or "",
+                            s.get("localizedName"), s.get("originalName"),
+                            _FORMATS.get(s.get("format"), str(s.get("format"))),
+                            json.dumps(authors), json.dumps(volumes), s.get("lastChapterAdded"), now,
+                        )
+                        for s, (authors, volumes) in zip(changed, details)
+                    ],
+                )
+                self._conn.executemany("DELETE FROM series WHERE id = ?", [(sid,) for sid in removed])
+                self._conn.execute(
+                    "INSERT INTO catalog_meta (key, value) VALUES ('last_sync', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (str(now),),
+                )
+            self._load()
+            result = {
+                "series": len(listing),
+                "updated": len(changed),
+                "removed": len(removed),
+                "secs": round(time.monotonic() - started, 2),
+            }
+            logger.info("Kavita catalog synced: %s", result)
+            return result
+
+    async def sync_forever(self, interval_secs: float) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as exc:
+                logger.warning("Kavita catalog sync failed: %s", exc)
+            await asyncio.sleep(interval_secs)
+
+    def request_sync(self, delay_secs: float) -> None:
+        """
+        Sync once after delay_secs (e.g. once a scheduled scan has had time to
+        run). Later requests push the pending sync back rather than queue another.
+        """
+        self._sync_due = max(self._sync_due, time.monotonic() + delay_secs)
+        if self._sync_task is not None and not self._sync_task.done():
+            return
+
+        async def _when_due() -> None:
+            while (wait := self._sync_due - time.monotonic()) > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self.sync()
+            except Exception as exc:
+                logger.warning("Kavita catalog sync failed: %s", exc)
+
+        self._sync_task = asyncio.create_task(_when_due())
@@ -6,24 +6,42 @@ Validates EPUBs before triggering Kavita scan to avoid Kavita parse failures.
 Triggers Kavita library scan after a successful, validated download.
 """
 import asyncio
-import io
+import functools
+import hashlib
 import logging
 import os
 import re as _re
-import xml.etree.ElementTree as _ET
-import zipfile
+import shutil
+import tempfile
+import time
 from typing import Optional
+from urllib.parse import urlsplit
 
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security.api_key import APIKeyHeader
 from pydantic import BaseModel
 
+from app.book_index import BookIndex, md5_from_source_id
+from app.book_ranking import rank_results
+from app import ebook_validate
 from app.config import settings
+from app.fsutil import STREAM_CHUNK_SIZE, atomic_writer
 from app.kavita import KavitaClient
+from app.kavita_catalog import OWNED_CONFIDENCE, KavitaCatalog
+from app.search_cache import SearchCache
 from app.sources.archive_org import search_archive_org
-from app.sources.annas_archive import resolve_annas_download, search_annas_archive
+from app.sources.annas_archive import mirror_pool as annas_mirror_pool
+from app.sources.annas_archive import (
+    forget_annas_download,
+    prefetch_annas_downloads,
+    resolve_annas_download,
+    search_annas_archive,
+)
+from app.sources.gutendex import catalog as gutenberg_catalog
 from app.sources.gutendex import search_gutendex
+from app.sources.standard_ebooks import catalog as standard_ebooks_catalog
+from app.sources.standard_ebooks import catalog_feed as standard_ebooks_feed
 from app.sources.standard_ebooks import search_standard_ebooks
 
 logger = logging.getLogger("uvicorn.error")
@@ -49,8 +67,102 @@ kavita = KavitaClient(
     url=settings.KAVITA_URL,
     username=settings.KAVITA_USERNAME,
     password=settings.KAVITA_PASSWORD,
+    scan_debounce=settings.KAVITA_SCAN_DEBOUNCE_SECS,
 )
 
+# Local mirror of Kavita's series for owned checks (synced periodically and after scans)
+kavita_catalog = KavitaCatalog(os.path.join(settings.DATA_DIR, "kavita_catalog.db"), kavita)
+
+# After a scan is queued, give Kavita this long to process it before re-syncing the catalog
+KAVITA_CATALOG_RESYNC_DELAY_SECS = 90
+
+# ---------------------------------------------------------------------------
+# Search sources, deadlines and the persistent per-source result cache
+# ---------------------------------------------------------------------------
+search_cache = SearchCache(os.path.join(settings.DATA_DIR, "search_cache.db"))
+
+# Listed in ranking priority: Standard Ebooks → Gutenberg → Archive.org → Anna's Archive
+SEARCH_SOURCES = {
+    "Standard Ebooks": search_standard_ebooks,
+    "Gutenberg":       search_gutendex,
+    "Archive.org":     search_archive_org,
+    "AnnasArchive":    search_annas_archive,
+}
+
+# Seconds each source gets before /search answers without it. A source that
+# misses its deadline keeps running in the background and fills the cache.
+SOURCE_DEADLINES: dict[str, float] = {
+    "Standard Ebooks": 6.0,
+    "Gutenberg":       6.0,
+    "Archive.org":     8.0,
+    "AnnasArchive":    10.0,
+    "Kavita":          3.0,
+}
+
+# Fallback owned check (before the local catalog's first sync): Kavita search,
+# cached briefly and invalidated whenever a book is added or a scan is requested.
+KAVITA_CACHE_TTL_SECS = 10 * 60
+
+_background_tasks: set[asyncio.Task] = set()
+
+# ---------------------------------------------------------------------------
+# Content-hash index of delivered books (duplicate detection)
+# ---------------------------------------------------------------------------
+book_index = BookIndex(os.path.join(settings.DATA_DIR, "book_index.db"))
+
+ebook_validate.configure_pool(settings.EBOOK_VALIDATE_WORKERS)
+
+
+def _store_search_result(source: str, query: str, limit: int, task: asyncio.Task) -> None:
+    if task.cancelled() or task.exception() is not None:
+        return
+    try:
+        search_cache.put(source, query, limit, task.result())
+    except Exception as exc:
+        logger.warning("Search cache write failed for %s: %s", source, exc)
+
+
+async def _kavita_owned(query: str) -> tuple[bool, Optional[dict], str]:
+    """(owned, best catalog match, status) — local fuzzy lookup once the catalog has synced."""
+    if kavita_catalog.ready:
+        match = kavita_catalog.owned(query)
+        return match is not None, match, "local"
+    owned, state = await _cached_source_call(
+        "Kavita", query, 0, KAVITA_CACHE_TTL_SECS, functools.partial(kavita.is_in_library, query),
+    )
+    return owned is True, None, state
+
+
+async def _cached_source_call(source: str, query: str, limit: int, ttl_secs: float, call) -> tuple:
+    """
+    Answer one source from the cache or live, within its deadline.
+    Returns (results, status) with status one of:
+      cached — fresh cache hit, no network
+      live   — fetched within the deadline (and cached)
+      stale  — live call missed its deadline or failed; expired cache entry served
+      timeout / error — nothing to serve
+    """
+    cached = search_cache.get(source, query, limit, ttl_secs)
+    if cached is not None and cached[1]:
+        return cached[0], "cached"
+
+    task = asyncio.create_task(call())
+    task.add_done_callback(functools.partial(_store_search_result, source, query, limit))
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), SOURCE_DEADLINES[source]), "live"
+    except asyncio.TimeoutError:
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        logger.info("Librarian search: %s missed its %.0fs deadline for %r", source, SOURCE_DEADLINES[source], query)
+        failed = "timeout"
+    except Exception as exc:
+        logger.warning("Librarian search: %s failed for %r: %s", source, query, exc)
+        failed = "error"
+    if cached is not None:
+        return cached[0], "stale"
+    return None, failed
+
+
 # ---------------------------------------------------------------------------
 # Path mappings — where to save ebooks on the VPS host
 # (Same Google Drive FUSE mount as Jellyfin — write here = saved to Drive + Kavita)
@@ -96,57 +208,121 @@ def _build_save_path(category: str, author: str, title: str, fmt: str) -> str:
     return os.path.join(base, safe_author, f"{safe_title}{ext}")
 
 
-def _validate_epub(content: bytes) -> tuple[bool, str]:
-    """
-    Lightweight structural EPUB validation.
-    Returns (is_valid, error_message).
+class _DownloadTooLarge(Exception):
+    pass
 
-    Checks:
-      1. File is a valid ZIP archive
-      2. Contains META-INF/container.xml
-      3. container.xml points to a valid OPF package file
-      4. OPF package contains a non-empty <dc:title> element
 
-    This catches the files that Kavita rejects at parse time with
-    "Unable to parse any meaningful information out of file".
+# host -> semaphore capping concurrent downloads from it (EBOOK_DOWNLOADS_PER_HOST)
+_host_slots: dict[str, asyncio.Semaphore] = {}
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).hostname or ""
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(settings.EBOOK_DOWNLOADS_PER_HOST)
+    return slot
+
+
+async def _stream_to_temp(url: str, max_bytes: int) -> tuple[str, int, str, str]:
     """
-    try:
-        zf = zipfile.ZipFile(io.BytesIO(content))
-    except zipfile.BadZipFile:
-        return False, "File is not a valid ZIP/EPUB archive"
+    Stream url into a local temp file (never the FUSE mount), hashing as it goes.
+    Returns (temp_path, size_bytes, sha256_hex, md5_hex); the caller removes temp_path.
+    Raises _DownloadTooLarge as soon as the declared or received size exceeds max_bytes.
+    At most EBOOK_DOWNLOADS_PER_HOST downloads run against one host at a time.
+    """
+    async with _host_slot(url):
+        return await _stream_to_temp_unlimited(url, max_bytes)
 
-    names = zf.namelist()
 
-    if "META-INF/container.xml" not in names:
-        return False, "EPUB is missing META-INF/container.xml"
+async def _stream_to_temp_unlimited(url: str, max_bytes: int) -> tuple[str, int, str, str]:
+    fd, tmp_path = tempfile.mkstemp(prefix="ebook-", suffix=".part")
+    digest = hashlib.sha256()
+    md5 = hashlib.md5()  # Anna's Archive identifies files by content MD5
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            async with httpx.AsyncClient(timeout=120, follow_redirects=True) as client:
+                async with client.stream("GET", url) as resp:
+                    resp.raise_for_status()
+                    declared = resp.headers.get("content-length", "")
+                    if declared.isdigit() and int(declared) > max_bytes:
+                        raise _DownloadTooLarge(int(declared))
+                    async for chunk in resp.aiter_bytes(STREAM_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise _DownloadTooLarge(size)
+                        digest.update(chunk)
+                        md5.update(chunk)
+                        fh.write(chunk)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return tmp_path, size, digest.hexdigest(), md5.hexdigest()
 
+
+async def _stream_annas_to_temp(
+    source_id: str, url: str, max_bytes: int, cookie: Optional[str]
+) -> tuple[str, int, str, str]:
+    """
+    _stream_to_temp for a resolved Anna's Archive URL. A cached URL can die
+    before its TTL (expired get.php key, one-shot partner link), so a failed
+    URL is forgotten and the download retried once with a fresh resolution.
+    """
     try:
-        container_xml = zf.read("META-INF/container.xml")
-        container = _ET.fromstring(container_xml)
+        return await _stream_to_temp(url, max_bytes)
+    except _DownloadTooLarge:
+        raise
     except Exception as exc:
-        return False, f"Could not parse META-INF/container.xml: {exc}"
+        forget_annas_download(source_id)
+        logger.info("Anna's Archive URL for %s failed (%s) — re-resolving", source_id, exc)
+        first_error = exc
+    try:
+        url = await resolve_annas_download(source_id, cookie=cookie)
+    except RuntimeError:
+        raise first_error
+    try:
+        return await _stream_to_temp(url, max_bytes)
+    except _DownloadTooLarge:
+        raise
+    except Exception:
+        forget_annas_download(source_id)
+        raise
 
-    ns = {"ns": "urn:oasis:names:tc:opendocument:xmlns:container"}
-    rootfiles = container.findall(".//ns:rootfile", ns)
-    if not rootfiles:
-        return False, "container.xml has no <rootfile> element"
 
-    opf_path = rootfiles[0].get("full-path", "")
-    if not opf_path or opf_path not in names:
-        return False, f"OPF package file '{opf_path}' not found in EPUB"
+def _install_file(tmp_path: str, save_path: str) -> None:
+    """Copy a validated local file onto the mount (sibling temp file + atomic rename)."""
+    with open(tmp_path, "rb") as src, atomic_writer(save_path) as dst:
+        shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
 
-    try:
-        opf_xml = zf.read(opf_path)
-        opf = _ET.fromstring(opf_xml)
-    except Exception as exc:
-        return False, f"Could not parse OPF package '{opf_path}': {exc}"
 
-    dc_ns = {"dc": "http://purl.org/dc/elements/1.1/"}
-    title_el = opf.find(".//dc:title", dc_ns)
-    if title_el is None or not (title_el.text or "").strip():
-        return False, "EPUB OPF package has no <dc:title> metadata"
+async def _owned_copy(entry: Optional[dict]) -> Optional[dict]:
+    """An index entry whose file is still in the library; stale entries are dropped."""
+    if entry is None:
+        return None
+    if await asyncio.to_thread(os.path.exists, entry["path"]):
+        return entry
+    book_index.forget(entry["sha256"])
+    return None
+
 
-    return True, ""
+def _duplicate_response(req, entry: dict, matched_by: str) -> dict:
+    return {
+        "success": True,
+        "message": f"Already in the library (same {matched_by}) — skipping download",
+        "saved_to": entry["path"],
+        "size_mb": round(entry["size_bytes"] / (1024 * 1024), 2),
+        "format": entry["format"] or req.format,
+        "sha256": entry["sha256"],
+        "already_existed": True,
+        "duplicate_of": entry["path"],
+        "matched_by": matched_by,
+        "kavita_safe": True,
+        "scan_triggered": False,
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -171,62 +347,102 @@ class BookDownloadRequest(BaseModel):
     format: str = "epub"  # epub | pdf | cbz | cbr
 
 
+class BookBatchDownloadRequest(BaseModel):
+    items: list[BookDownloadRequest]
+
+
 class LibraryScanRequest(BaseModel):
     category: str  # novel | comic | magazine
 
 
+class LibraryValidateRequest(BaseModel):
+    category: str  # novel | comic | magazine
+    subfolder: Optional[str] = None  # e.g. an author folder, relative to the category root
+    formats: list[str] = list(ebook_validate.VALIDATED_FORMATS)
+    max_files: Optional[int] = None
+    include_ok: bool = False  # also return reports for files that passed cleanly
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
 
 @router.get("/health")
 async def librarian_health():
-    return {"status": "ok", "service": "librarian"}
+    return {
+        "status": "ok",
+        "service": "librarian",
+        "annas_mirrors": annas_mirror_pool.snapshot(),
+        "indexed_books": book_index.count(),
+        "pending_kavita_scans": kavita.pending_scans(),
+        "kavita_catalog": kavita_catalog.stats(),
+        "gutenberg_catalog": gutenberg_catalog.stats(),
+        "standard_ebooks_catalog": standard_ebooks_catalog.stats(),
+    }
 
 
 @router.post("/search")
 async def search_books(req: BookSearchRequest, _: str = Depends(require_api_key)):
     """
     Search Standard Ebooks, Gutenberg, Archive.org, and Anna's Archive in parallel.
-    Results are ranked: Standard Ebooks → Gutenberg → Archive.org → Anna's Archive.
-    EPUB is always preferred over PDF. Deduplicates by title.
+    Each source is answered from the per-source cache when fresh, otherwise
+    live within its SOURCE_DEADLINES budget; sources that miss it are reported
+    in source_status (and partial=true) and finish in the background.
+    Near-duplicate results (same book under differently spelled titles/authors)
+    are merged into one row — the best edition: EPUB over PDF, then source
+    priority, then larger file — with "editions" counting the copies found.
+    Rows are ranked Standard Ebooks → Gutenberg → Archive.org → Anna's Archive.
     Anna's Archive results include source_id instead of download_url — use
     source="AnnasArchive" + source_id when calling /download for those results.
     """
-    gut_task = asyncio.create_task(search_gutendex(req.query, req.limit))
-    se_task = asyncio.create_task(search_standard_ebooks(req.query, req.limit))
-    ao_task = asyncio.create_task(search_archive_org(req.query, req.limit))
-    aa_task = asyncio.create_task(search_annas_archive(req.query, req.limit))
-
-    # Also check if it's already in Kavita
-    kavita_task = asyncio.create_task(kavita.is_in_library(req.query))
-
-    _gut, _se, _ao, _aa, _already_in_library = await asyncio.gather(
-        gut_task, se_task, ao_task, aa_task, kavita_task,
-        return_exceptions=True,
+    names = list(SEARCH_SOURCES)
+    outcomes = await asyncio.gather(
+        *(
+            _cached_source_call(
+                name, req.query, req.limit, settings.BOOK_SEARCH_CACHE_TTL_SECS,
+                functools.partial(SEARCH_SOURCES[name], req.query, req.limit),
+            )
+            for name in names
+        ),
+        # Also check if it's already in Kavita
+        _kavita_owned(req.query),
     )
 
-    gut_results: list = _gut if isinstance(_gut, list) else []
-    se_results: list = _se if isinstance(_se, list) else []
-    ao_results: list = _ao if isinstance(_ao, list) else []
-    aa_results: list = _aa if isinstance(_aa, list) else []
-    already_in_library: bool = _already_in_library if isinstance(_already_in_library, bool) else False
-
-    # Priority: Standard Ebooks → Gutenberg → Archive.org → Anna's Archive
-    combined = se_results + gut_results + ao_results + aa_results
-
-    # Deduplicate by title (case-insensitive) — first occurrence wins (highest priority)
-    seen_titles: set[str] = set()
-    deduped = []
-    for result in combined:
-        key = result.get("title", "").lower().strip()
-        if key and key not in seen_titles:
-            seen_titles.add(key)
-            deduped.append(result)
-
-    # Add index numbers
+    source_status: dict[str, str] = {}
+    combined: list = []
+    for name, (results, state) in zip(names, outcomes):
+        source_status[name] = state
+        if isinstance(results, list):
+            combined.extend(results)
+    already_in_library, kavita_match, source_status["Kavita"] = outcomes[-1]
+
+    # Merge near-duplicates, keep the best edition of each (rows are copies — cached rows stay as-is)
+    deduped = rank_results(combined, names)
+
+    # Add index numbers and mark books already delivered (same AA md5 or source URL)
+    owned = book_index.owned(
+        md5s=[md5_from_source_id(r.get("source_id")) for r in deduped if r.get("source") == "AnnasArchive"],
+        urls=[r.get("download_url") for r in deduped if r.get("source") != "AnnasArchive"],
+    )
     for i, item in enumerate(deduped, start=1):
         item["index"] = i
+        if item.get("source") == "AnnasArchive":
+            owned_path = owned.get(md5_from_source_id(item.get("source_id")) or "")
+        else:
+            owned_path = owned.get(item.get("download_url") or "")
+        item["owned"] = owned_path is not None
+        if owned_path:
+            item["owned_path"] = owned_path
+
+    # Resolve the top Anna's Archive hits now so picking one downloads immediately.
+    if settings.ANNA_ARCHIVE_PREFETCH_TOP > 0:
+        prefetch_annas_downloads(
+            [r["source_id"] for r in deduped if r.get("source") == "AnnasArchive" and r.get("source_id")][
+                :settings.ANNA_ARCHIVE_PREFETCH_TOP
+            ],
+            cookie=settings.ANNA_ARCHIVE_COOKIE or None,
+            libgen_only=not settings.ANNA_ARCHIVE_PREFETCH_SLOW_DOWNLOAD,
+        )
 
     # Build source breakdown
     sources: dict[str, int] = {}
@@ -237,26 +453,20 @@ async def search_books(req: BookSearchRequest, _: str = Depends(require_api_key)
     return {
         "query": req.query,
         "already_in_kavita": already_in_library,
+        "kavita_match": kavita_match,
         "results": deduped,
         "total_found": len(deduped),
         "sources": sources,
+        "source_status": source_status,
+        "partial": any(state in ("stale", "timeout", "error") for state in source_status.values()),
     }
 
 
-@router.post("/download")
-async def download_book(req: BookDownloadRequest, _: str = Depends(require_api_key)):
+async def _deliver(req: BookDownloadRequest) -> dict:
     """
-    Download an ebook and save it to the correct Kavita folder.
-    For standard sources (SE/Gutenberg/Archive.org): pass download_url.
-    For Anna's Archive results: pass source="AnnasArchive" and source_id="/md5/...".
-
-    EPUBs are validated for structural integrity before triggering a Kavita scan.
-    If validation fails the file is removed from disk and a 422 is returned.
-
-    Category determines where the file is saved:
-      - novel    → /mnt/cloud/gdrive/Media/Books/{Author}/{Title}.epub
-      - comic    → /mnt/cloud/gdrive/Media/Comics/{Author}/{Title}.epub
-      - magazine → /mnt/cloud/gdrive/Media/Magazines/{Author}/{Title}.epub
+    Fetch, validate and install one book (no Kavita scan). Returns the /download
+    response body; failures raise HTTPException. Shared by /download and
+    /download/batch.
     """
     if req.category not in KAVITA_PATHS:
         raise HTTPException(
@@ -271,6 +481,11 @@ async def download_book(req: BookDownloadRequest, _: str = Depends(require_api_k
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="source_id (e.g. '/md5/abc123') is required when source='AnnasArchive'",
             )
+        # The AA md5 is the file's content hash — skip resolving and downloading if we have it
+        aa_md5 = md5_from_source_id(req.source_id)
+        owned = await _owned_copy(book_index.by_md5(aa_md5)) if aa_md5 else None
+        if owned:
+            return _duplicate_response(req, owned, "md5")
         try:
             aa_cookie = settings.ANNA_ARCHIVE_COOKIE or None
             download_url = await resolve_annas_download(req.source_id, cookie=aa_cookie)
@@ -281,6 +496,9 @@ async def download_book(req: BookDownloadRequest, _: str = Depends(require_api_k
             )
     elif req.download_url:
         download_url = req.download_url
+        owned = await _owned_copy(book_index.by_url(download_url))
+        if owned:
+            return _duplicate_response(req, owned, "source URL")
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -289,7 +507,6 @@ async def download_book(req: BookDownloadRequest, _: str = Depends(require_api_k
 
     # Build destination path
     save_path = _build_save_path(req.category, req.author, req.title, req.format)
-    save_dir = os.path.dirname(save_path)
 
     # Check if already exists
     if os.path.exists(save_path):
@@ -302,76 +519,92 @@ async def download_book(req: BookDownloadRequest, _: str = Depends(require_api_k
             "scan_triggered": False,
         }
 
-    # Download the file
+    # Stream to a local temp file — validated before anything touches Drive
+    max_bytes = settings.EBOOK_MAX_DOWNLOAD_MB * 1024 * 1024
     try:
-        async with httpx.AsyncClient(timeout=120, follow_redirects=True) as client:
-            resp = await client.get(download_url)
-            resp.raise_for_status()
-            content = resp.content
-    except Exception as exc:
+        if req.source == "AnnasArchive":
+            tmp_path, size_bytes, sha256, md5 = await _stream_annas_to_temp(
+                req.source_id, download_url, max_bytes, settings.ANNA_ARCHIVE_COOKIE or None
+            )
+        else:
+            tmp_path, size_bytes, sha256, md5 = await _stream_to_temp(download_url, max_bytes)
+    except _DownloadTooLarge as exc:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Failed to download ebook: [{type(exc).__name__}] {exc}",
+            detail=(
+                f"Download exceeds the {settings.EBOOK_MAX_DOWNLOAD_MB} MB limit "
+                f"({int(exc.args[0]) / (1024 * 1024):.0f} MB) — aborted"
+            ),
         )
-
-    # Validate minimum size
-    if len(content) < 1000:
+    except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
-            detail="Downloaded file is too small — likely an error page, not an ebook",
+            detail=f"Failed to download ebook: [{type(exc).__name__}] {exc}",
         )
 
-    # Save to disk
     try:
-        os.makedirs(save_dir, exist_ok=True)
-        with open(save_path, "wb") as f:
-            f.write(content)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save file: {exc}",
-        )
+        # Validate minimum size
+        if size_bytes < 1000:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Downloaded file is too small — likely an error page, not an ebook",
+            )
 
-    size_mb = round(len(content) / (1024 * 1024), 2)
+        # Same bytes already delivered under another title/source — don't store it twice
+        owned = await _owned_copy(book_index.by_sha256(sha256))
+        if owned:
+            return _duplicate_response(req, owned, "content")
 
-    # EPUB structural validation — run after saving, delete file if invalid
-    kavita_safe = True
-    epub_error = None
-    if req.format.lower() == "epub":
-        valid, err = _validate_epub(content)
-        if not valid:
-            kavita_safe = False
-            epub_error = err
-            try:
-                os.remove(save_path)
-                # Remove the author folder if it's now empty
-                if not os.listdir(save_dir):
-                    os.rmdir(save_dir)
-            except Exception:
-                pass
+        # Deep structural validation (EPUB/CBZ/PDF) of the local copy, in the worker pool
+        report = await ebook_validate.validate(tmp_path, req.format)
+        if not report["ok"]:
+            is_epub = req.format.lower() == "epub"
+            report["path"] = download_url
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail={
-                    "message": f"EPUB validation failed — file rejected before Kavita scan",
-                    "epub_error": epub_error,
+                    "message": (
+                        "EPUB validation failed — file rejected before Kavita scan" if is_epub
+                        else f"{req.format.upper()} validation failed — file rejected before Kavita scan"
+                    ),
+                    "epub_error" if is_epub else "validation_error": report["errors"][0],
+                    "validation": report,
                     "kavita_safe": False,
                     "hint": "Try a different result (better source) for this title",
                 },
             )
 
-    # Trigger Kavita library scan (only for valid files)
-    scan_triggered = False
-    scan_error = None
-    try:
-        library_name = KAVITA_LIBRARY_NAMES[req.category]
-        library_id = await kavita.get_library_id(library_name)
-        if library_id:
-            scan_triggered = await kavita.scan_library(library_id)
-        else:
-            scan_error = f"Could not find Kavita library matching '{library_name}'"
-    except Exception as exc:
-        scan_error = str(exc)
-        logger.warning("Kavita scan failed after download: %s", exc)
+        # Only validated files are copied onto the mount
+        try:
+            await asyncio.to_thread(_install_file, tmp_path, save_path)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to save file: {exc}",
+            )
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    size_mb = round(size_bytes / (1024 * 1024), 2)
+    kavita_safe = True
+
+    book_index.add(
+        sha256=sha256,
+        md5=md5,
+        path=save_path,
+        size_bytes=size_bytes,
+        title=req.title,
+        author=req.author,
+        fmt=req.format,
+        source=req.source or "url",
+        source_url=req.download_url if req.source != "AnnasArchive" else None,
+    )
+
+    # A new book changes what Kavita owns — drop cached ownership checks.
+    search_cache.invalidate("Kavita")
 
     return {
         "success": True,
@@ -379,13 +612,165 @@ async def download_book(req: BookDownloadRequest, _: str = Depends(require_api_k
         "saved_to": save_path,
         "size_mb": size_mb,
         "format": req.format,
+        "sha256": sha256,
+        "validation_warnings": report["warnings"],
         "already_existed": False,
         "kavita_safe": kavita_safe,
+    }
+
+
+async def _queue_scan(category: str, save_paths: list[str]) -> Optional[dict]:
+    """
+    Schedule a Kavita scan of the author folders books were saved to.
+    Returns the library dict, or None when no library matches the category.
+    """
+    library = await kavita.get_library(KAVITA_LIBRARY_NAMES[category])
+    if not library:
+        return None
+    for save_path in save_paths:
+        kavita.request_scan(library, os.path.relpath(os.path.dirname(save_path), KAVITA_PATHS[category]))
+    return library
+
+
+@router.post("/download")
+async def download_book(req: BookDownloadRequest, _: str = Depends(require_api_key)):
+    """
+    Download an ebook and save it to the correct Kavita folder.
+    For standard sources (SE/Gutenberg/Archive.org): pass download_url.
+    For Anna's Archive results: pass source="AnnasArchive" and source_id="/md5/...".
+
+    The file is streamed to local temp storage and validated (EPUB/CBZ/PDF)
+    before it is copied into the library; if validation fails a 422 is returned.
+
+    Books already delivered are not downloaded again: the content-hash index is
+    checked by AA md5 / source URL up front and by SHA-256 after streaming.
+
+    Category determines where the file is saved:
+      - novel    → /mnt/cloud/gdrive/Media/Books/{Author}/{Title}.epub
+      - comic    → /mnt/cloud/gdrive/Media/Comics/{Author}/{Title}.epub
+      - magazine → /mnt/cloud/gdrive/Media/Magazines/{Author}/{Title}.epub
+    """
+    result = await _deliver(req)
+    if result["already_existed"]:
+        return result
+
+    # Schedule a Kavita scan of just the author folder (only for valid files).
+    # Back-to-back downloads into the same library are coalesced into one scan.
+    scan_triggered = False
+    scan_error = None
+    try:
+        if await _queue_scan(req.category, [result["saved_to"]]):
+            kavita_catalog.request_sync(kavita.scan_debounce + KAVITA_CATALOG_RESYNC_DELAY_SECS)
+            scan_triggered = True
+        else:
+            scan_error = f"Could not find Kavita library matching '{KAVITA_LIBRARY_NAMES[req.category]}'"
+    except Exception as exc:
+        scan_error = str(exc)
+        logger.warning("Kavita scan failed after download: %s", exc)
+
+    return {
+        **result,
         "scan_triggered": scan_triggered,
+        "scan_in_secs": kavita.scan_debounce if scan_triggered else None,
         "scan_error": scan_error,
     }
 
 
+@router.post("/download/batch")
+async def download_books_batch(req: BookBatchDownloadRequest, _: str = Depends(require_api_key)):
+    """
+    Download several books in one call (e.g. every novel of a series).
+    Up to EBOOK_BATCH_CONCURRENCY books are fetched at once — never more than
+    EBOOK_DOWNLOADS_PER_HOST from the same host — and validated in the worker
+    pool, each exactly as /download would. New files are scanned into Kavita
+    with one coalesced scan per library once the batch is done, instead of a
+    scan per book. Per-item outcomes are returned in request order; one failed
+    item does not fail the batch.
+    """
+    if not req.items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="items is empty")
+    if len(req.items) > settings.EBOOK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.EBOOK_BATCH_MAX_ITEMS} items per batch (got {len(req.items)})",
+        )
+
+    started = time.monotonic()
+    sem = asyncio.Semaphore(settings.EBOOK_BATCH_CONCURRENCY)
+
+    async def _one(index: int, item: BookDownloadRequest) -> dict:
+        async with sem:
+            try:
+                result = await _deliver(item)
+            except HTTPException as exc:
+                result = {"success": False, "status_code": exc.status_code, "error": exc.detail}
+            except Exception as exc:
+                logger.warning("Batch download of %r failed: %s", item.title, exc)
+                result = {"success": False, "status_code": 500, "error": f"[{type(exc).__name__}] {exc}"}
+        return {"index": index, "title": item.title, **result}
+
+    async def _duplicate_item(index: int, item: BookDownloadRequest, same_as: int) -> dict:
+        return {
+            "index": index,
+            "title": item.title,
+            "success": True,
+            "message": f"Same destination as item {same_as} in this batch — skipped",
+            "already_existed": True,
+            "duplicate_of_item": same_as,
+        }
+
+    # The same book twice in one batch would race for one destination file
+    first_index: dict[str, int] = {}
+    jobs = []
+    for i, item in enumerate(req.items, start=1):
+        dest = (
+            _build_save_path(item.category, item.author, item.title, item.format)
+            if item.category in KAVITA_PATHS else None
+        )
+        if dest is not None and dest in first_index:
+            jobs.append(_duplicate_item(i, item, first_index[dest]))
+        else:
+            if dest is not None:
+                first_index[dest] = i
+            jobs.append(_one(i, item))
+    results = await asyncio.gather(*jobs)
+
+    # One scan per library for everything that was actually added
+    new_files: dict[str, list[str]] = {}
+    for item, result in zip(req.items, results):
+        if result["success"] and not result["already_existed"]:
+            new_files.setdefault(item.category, []).append(result["saved_to"])
+    scans = []
+    for category, paths in new_files.items():
+        scan = {"category": category, "files": len(paths), "scan_triggered": False, "scan_error": None}
+        try:
+            library = await _queue_scan(category, paths)
+            if library:
+                await kavita.flush_scan(library["id"])
+                scan["scan_triggered"] = True
+            else:
+                scan["scan_error"] = f"Could not find Kavita library matching '{KAVITA_LIBRARY_NAMES[category]}'"
+        except Exception as exc:
+            scan["scan_error"] = str(exc)
+            logger.warning("Kavita scan failed after batch download: %s", exc)
+        scans.append(scan)
+    if any(scan["scan_triggered"] for scan in scans):
+        kavita_catalog.request_sync(KAVITA_CATALOG_RESYNC_DELAY_SECS)
+
+    downloaded = sum(1 for r in results if r["success"] and not r["already_existed"])
+    skipped = sum(1 for r in results if r["success"] and r["already_existed"])
+    return {
+        "success": all(r["success"] for r in results),
+        "total": len(results),
+        "downloaded": downloaded,
+        "skipped": skipped,
+        "failed": len(results) - downloaded - skipped,
+        "secs": round(time.monotonic() - started, 2),
+        "results": results,
+        "scans": scans,
+    }
+
+
 @router.post("/scan")
 async def scan_library(req: LibraryScanRequest, _: str = Depends(require_api_key)):
     """Manually trigger a Kavita library scan for a given category."""
@@ -403,7 +788,10 @@ async def scan_library(req: LibraryScanRequest, _: str = Depends(require_api_key
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"No Kavita library found matching '{library_name}'",
             )
+        kavita.cancel_pending_scan(library_id)  # superseded by this full scan
         triggered = await kavita.scan_library(library_id)
+        search_cache.invalidate("Kavita")
+        kavita_catalog.request_sync(KAVITA_CATALOG_RESYNC_DELAY_SECS)
     except HTTPException:
         raise
     except Exception as exc:
@@ -419,9 +807,81 @@ async def scan_library(req: LibraryScanRequest, _: str = Depends(require_api_key
     }
 
 
+@router.post("/validate")
+async def validate_library(req: LibraryValidateRequest, _: str = Depends(require_api_key)):
+    """
+    Re-validate files already in a library folder (deep EPUB/CBZ/PDF checks),
+    in parallel across the validation worker pool. Returns a summary plus the
+    reports of files with errors or warnings.
+    """
+    if req.category not in KAVITA_PATHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown category '{req.category}'. Valid: {list(KAVITA_PATHS.keys())}",
+        )
+    base = os.path.realpath(KAVITA_PATHS[req.category])
+    root = os.path.realpath(os.path.join(base, req.subfolder)) if req.subfolder else base
+    if root != base and not root.startswith(base + os.sep):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="subfolder must stay inside the category folder",
+        )
+    if not os.path.isdir(root):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Folder not found: {root}")
+
+    formats = tuple(f.lower().lstrip(".") for f in req.formats)
+    reports = await ebook_validate.validate_tree(root, formats, req.max_files)
+    failed = [r for r in reports if not r["ok"]]
+    warned = [r for r in reports if r["ok"] and r["warnings"]]
+    return {
+        "root": root,
+        "checked": len(reports),
+        "ok": len(reports) - len(failed),
+        "failed": len(failed),
+        "with_warnings": len(warned),
+        "reports": reports if req.include_ok else failed + warned,
+    }
+
+
+@router.on_event("startup")
+async def _start_kavita_catalog_sync() -> None:
+    task = asyncio.create_task(kavita_catalog.sync_forever(settings.KAVITA_CATALOG_SYNC_SECS))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@router.on_event("startup")
+async def _start_gutenberg_catalog_refresh() -> None:
+    if not settings.GUTENBERG_CATALOG_URL:
+        return
+    task = asyncio.create_task(
+        gutenberg_catalog.refresh_forever(settings.GUTENBERG_CATALOG_URL, settings.GUTENBERG_CATALOG_REFRESH_SECS)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@router.on_event("startup")
+async def _start_standard_ebooks_catalog_sync() -> None:
+    feed_url, auth = standard_ebooks_feed()
+    task = asyncio.create_task(
+        standard_ebooks_catalog.sync_forever(feed_url, settings.STANDARD_EBOOKS_CATALOG_SYNC_SECS, auth)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@router.on_event("shutdown")
+async def _stop_validation_pool() -> None:
+    ebook_validate.shutdown_pool()
+
+
 @router.get("/status")
 async def library_status(title: Optional[str] = None, _: str = Depends(require_api_key)):
-    """Check if a title is already in Kavita library."""
+    """
+    Check if a title is already in Kavita library. Answered from the local
+    catalog mirror (fuzzy match with a confidence score) once it has synced.
+    """
     if not title:
         try:
             libraries = await kavita.get_libraries()
@@ -432,6 +892,15 @@ async def library_status(title: Optional[str] = None, _: str = Depends(require_a
             )
         return {"libraries": libraries}
 
+    if kavita_catalog.ready:
+        matches = kavita_catalog.lookup(title)
+        return {
+            "title": title,
+            "in_kavita": bool(matches) and matches[0]["confidence"] >= OWNED_CONFIDENCE,
+            "matches": matches,
+            "catalog": kavita_catalog.stats(),
+        }
+
     try:
         in_library = await kavita.is_in_library(title)
         search_result = await kavita.search(title)
@@ -1,18 +1,16 @@
 ﻿import asyncio
-import io
 import itertools
 import json
 import logging
 import os
 import re as _re
 import shutil
-import zipfile
 from pathlib import Path
 from typing import Optional
 
 from fastapi import Depends, FastAPI, HTTPException, Request, Security, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security.api_key import APIKeyHeader
 from pydantic import BaseModel
 
@@ -29,7 +27,17 @@ from app.opensubtitles import OpenSubtitlesClient
 from app.privatehd import search_privatehd
 from app.qbittorrent import QBittorrentClient
 from app.subdl import SubDLClient
+from app.subtitle_index import SubtitleIndex
+from app.subtitle_sync import sync_subtitle
+from app.subtitle_timing import shift_subtitle_file
+from app.subtitle_archive import (
+    episode_token,
+    extract_episode_subtitles,
+    extract_member,
+    pick_subtitle_member,
+)
 from app.tmdb import TMDBClient
+from app.ttl_cache import all_stats as cache_stats
 
 app = FastAPI(title="Sam's Media API", version="3.0.0")
 app.include_router(librarian_router)
@@ -88,6 +96,9 @@ subdl = SubDLClient(
     languages=settings.SUBDL_LANGUAGES,
 )
 
+# Local SQLite mirror of subtitle sidecars + offset notes (avoids FUSE round-trips)
+subtitle_index = SubtitleIndex(os.path.join(settings.DATA_DIR, "subtitle_index.db"))
+
 # ---------------------------------------------------------------------------
 # Path mappings
 # ---------------------------------------------------------------------------
@@ -117,12 +128,30 @@ MEDIA_PATHS: dict[str, str] = {
     "music-punjabi":  "/mnt/cloud/gdrive/Media/Music/Punjabi",
 }
 
+# Folders the subtitle index crawler keeps in sync (video libraries only)
+SUBTITLE_INDEX_ROOTS: list[str] = [
+    path for category, path in MEDIA_PATHS.items() if not category.startswith("music-")
+]
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+@app.on_event("startup")
+async def _start_subtitle_index_crawler() -> None:
+    task = asyncio.create_task(
+        subtitle_index.crawl_forever(SUBTITLE_INDEX_ROOTS, settings.SUBTITLE_INDEX_CRAWL_SECS)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 # ---------------------------------------------------------------------------
 # Request / Response models
 # ---------------------------------------------------------------------------
 
 
 _VIDEO_EXTS = {".mkv", ".mp4", ".avi", ".m4v", ".ts", ".wmv", ".mov"}
+_SUBTITLE_EXTS = {".srt", ".ass", ".ssa", ".sub"}
 
 
 def _safe_name(name: str) -> str:
@@ -176,12 +205,11 @@ def _subtitle_sidecars_for_video(video_path: str) -> list[Path]:
     base = video.with_suffix("")
     parent = base.parent
     stem = base.name
-    exts = {".srt", ".ass", ".ssa", ".sub"}
     matches: list[Path] = []
     for candidate in parent.iterdir():
         if not candidate.is_file():
             continue
-        if candidate.suffix.lower() not in exts:
+        if candidate.suffix.lower() not in _SUBTITLE_EXTS:
             continue
         if not candidate.name.startswith(f"{stem}."):
             continue
@@ -189,15 +217,21 @@ def _subtitle_sidecars_for_video(video_path: str) -> list[Path]:
     return matches
 
 
+def _indexed_sidecars(video_path: str) -> list[str]:
+    """Known sidecars for a video, from the subtitle index; lists the folder only when cold."""
+    if not subtitle_index.is_indexed(video_path):
+        subtitle_index.reconcile_media(
+            video_path, [str(p) for p in _subtitle_sidecars_for_video(video_path)]
+        )
+    return [row["path"] for row in subtitle_index.sidecars(video_path)]
+
+
+def _subtitle_exists(video_path: str, subtitle_path: str) -> bool:
+    return subtitle_path in _indexed_sidecars(video_path)
+
+
 def _clear_subtitle_sidecars(video_path: str, keep_path: Optional[str] = None) -> list[str]:
-    removed: list[str] = []
-    keep = Path(keep_path) if keep_path else None
-    for candidate in _subtitle_sidecars_for_video(video_path):
-        if keep and candidate == keep:
-            continue
-        candidate.unlink(missing_ok=True)
-        removed.append(str(candidate))
-    return removed
+    return _remove_paths(_indexed_sidecars(video_path), keep_path=keep_path)
 
 
 def _normalize_release_name(name: str) -> str:
@@ -255,19 +289,242 @@ def _original_release_name(content_path: str, fallback_name: str) -> str:
     return fallback_name
 
 
-def _extract_subtitle_bytes(archive_bytes: bytes) -> tuple[bytes, str]:
-    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as zf:
-        names = [n for n in zf.namelist() if not n.endswith("/")]
-        if not names:
-            raise RuntimeError("Subtitle archive is empty")
+async def _install_subtitle_from_archive(
+    download_url: str,
+    media_path: str,
+    subtitle_path: str,
+    replace_existing: bool,
+    *,
+    language: Optional[str] = None,
+    release_name: Optional[str] = None,
+    match_score: Optional[int] = None,
+) -> tuple[str, list[str]]:
+    """Spool a SubDL archive to a temp file and stream its best subtitle into subtitle_path."""
+    try:
+        archive = await asyncio.to_thread(subdl.spool_archive, download_url)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Subtitle download failed: [{type(exc).__name__}] {exc}",
+        )
+
+    with archive:
+        try:
+            member = await asyncio.to_thread(pick_subtitle_member, archive)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Subtitle download failed: [{type(exc).__name__}] {exc}",
+            )
+
+        try:
+            removed = _clear_subtitle_sidecars(media_path) if replace_existing else []
+            await asyncio.to_thread(extract_member, archive, member, subtitle_path)
+        except Exception as exc:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to save subtitle file: {exc}",
+            )
+
+    subtitle_index.record_sidecar(
+        media_path,
+        subtitle_path,
+        language=language,
+        source_release=release_name,
+        source_file=member.filename,
+        match_score=match_score,
+    )
+    return member.filename, removed
+
+
+def _scan_season_dir(season_path: str) -> tuple[list[str], list[str]]:
+    """Single scandir pass over a season folder: (video paths, subtitle sidecar paths)."""
+    videos: list[str] = []
+    sidecars: list[str] = []
+    with os.scandir(season_path) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in _VIDEO_EXTS:
+                videos.append(entry.path)
+            elif ext in _SUBTITLE_EXTS:
+                sidecars.append(entry.path)
+    videos.sort()
+    return videos, sidecars
+
+
+def _known_sidecars(video_path: str, sidecars: list[str]) -> list[str]:
+    prefix = f"{Path(video_path).stem}."
+    return [p for p in sidecars if os.path.basename(p).startswith(prefix)]
+
+
+def _remove_paths(paths: list[str], keep_path: Optional[str] = None) -> list[str]:
+    removed: list[str] = []
+    for path in paths:
+        if path == keep_path:
+            continue
+        Path(path).unlink(missing_ok=True)
+        removed.append(path)
+    subtitle_index.remove_sidecars(removed)
+    return removed
+
+
+async def _batch_pack_episodes(
+    req: "SubtitleBatchRequest",
+    language: str,
+    season: int,
+    targets: dict[tuple[int, int], dict],
+) -> list[dict]:
+    """Try one season-pack archive for every pending episode. Returns per-episode results."""
+    representative = Path(next(iter(targets.values()))["video"]).stem
+    try:
+        result = await asyncio.to_thread(
+            subdl.search,
+            title=req.title,
+            year=req.year,
+            media_type="tv",
+            languages=language.upper(),
+            limit=req.limit,
+            season_number=season,
+            full_season=True,
+        )
+    except Exception as exc:
+        logger.warning("Season-pack subtitle search failed for %s: %s", req.season_path, exc)
+        return []
+
+    packs = [
+        item for item in result.get("subtitles", [])
+        if item.get("download_url") and episode_token(item.get("release_name") or "") is None
+    ]
+    if not packs:
+        return []
+    pack = max(packs, key=lambda item: _subtitle_match_details(representative, item.get("release_name") or "")["score"])
+
+    try:
+        archive = await asyncio.to_thread(subdl.spool_archive, pack["download_url"])
+    except Exception as exc:
+        logger.warning("Season-pack subtitle download failed for %s: %s", req.season_path, exc)
+        return []
+
+    with archive:
+        try:
+            written = await asyncio.to_thread(
+                extract_episode_subtitles,
+                archive,
+                {token: target["subtitle_path"] for token, target in targets.items()},
+            )
+        except Exception as exc:
+            logger.warning("Season-pack extraction failed for %s: %s", req.season_path, exc)
+            return []
+
+    # Old sidecars go only once their replacement is in place
+    removed: dict[tuple[int, int], list[str]] = {}
+    if req.replace_existing:
+        for token in written:
+            removed[token] = _remove_paths(targets[token]["sidecars"], keep_path=targets[token]["subtitle_path"])
+
+    for token, member in written.items():
+        subtitle_index.record_sidecar(
+            targets[token]["video"],
+            targets[token]["subtitle_path"],
+            language=language,
+            source_release=pack.get("release_name"),
+            source_file=member,
+        )
+    return [
+        {
+            "event": "episode",
+            "status": "downloaded",
+            "episode": f"S{token[0]:02d}E{token[1]:02d}",
+            "media_path": targets[token]["video"],
+            "path": targets[token]["subtitle_path"],
+            "source": "season_pack",
+            "source_file": member,
+            "release_name": pack.get("release_name"),
+            "removed": removed.get(token, []),
+        }
+        for token, member in written.items()
+    ]
+
 
-        def _rank(name: str) -> tuple[int, int]:
-            ext = Path(name).suffix.lower()
-            priority = {".srt": 0, ".ass": 1, ".ssa": 2, ".sub": 3}.get(ext, 99)
-            return (priority, -len(name))
+async def _batch_single_episode(
+    req: "SubtitleBatchRequest",
+    language: str,
+    token: tuple[int, int],
+    target: dict,
+    sem: asyncio.Semaphore,
+) -> dict:
+    """Search and install one episode's subtitle; never raises."""
+    base = {
+        "event": "episode",
+        "episode": f"S{token[0]:02d}E{token[1]:02d}",
+        "media_path": target["video"],
+    }
+    original_name = Path(target["video"]).stem
+    async with sem:
+        try:
+            result = await asyncio.to_thread(
+                subdl.search,
+                title=req.title,
+                year=req.year,
+                original_name=original_name,
+                media_type="tv",
+                languages=language.upper(),
+                limit=req.limit,
+                season_number=token[0],
+                episode_number=token[1],
+            )
+        except Exception as exc:
+            return {**base, "status": "failed", "reason": f"search failed: [{type(exc).__name__}] {exc}"}
+
+        ranked = [
+            {**item, "match": _subtitle_match_details(original_name, item.get("release_name") or "")}
+            for item in result.get("subtitles", [])
+            if item.get("download_url")
+        ]
+        if req.exact_only:
+            ranked = [item for item in ranked if item["match"]["exact"]]
+        if not ranked:
+            return {**base, "status": "not_found", "reason": "no subtitle candidates returned"}
+        selected = max(ranked, key=lambda item: item["match"]["score"])
 
-        chosen = sorted(names, key=_rank)[0]
-        return zf.read(chosen), chosen
+        try:
+            archive = await asyncio.to_thread(subdl.spool_archive, selected["download_url"])
+        except Exception as exc:
+            return {**base, "status": "failed", "reason": f"download failed: [{type(exc).__name__}] {exc}"}
+
+        with archive:
+            try:
+                member = await asyncio.to_thread(pick_subtitle_member, archive)
+                await asyncio.to_thread(extract_member, archive, member, target["subtitle_path"])
+            except Exception as exc:
+                return {**base, "status": "failed", "reason": f"extract failed: [{type(exc).__name__}] {exc}"}
+
+    # Old sidecars go only once their replacement is in place
+    removed = (
+        _remove_paths(target["sidecars"], keep_path=target["subtitle_path"])
+        if req.replace_existing else []
+    )
+
+    subtitle_index.record_sidecar(
+        target["video"],
+        target["subtitle_path"],
+        language=language,
+        source_release=selected.get("release_name"),
+        source_file=member.filename,
+        match_score=selected["match"]["score"],
+    )
+    return {
+        **base,
+        "status": "downloaded",
+        "path": target["subtitle_path"],
+        "source": "episode",
+        "source_file": member.filename,
+        "release_name": selected.get("release_name"),
+        "match": selected["match"],
+        "removed": removed,
+    }
 
 
 async def _download_best_subtitle(
@@ -285,7 +542,7 @@ async def _download_best_subtitle(
     language = (settings.OPENSUBTITLES_LANGUAGES or "en").split(",", 1)[0].strip() or "en"
     subtitle_path = _subtitle_path_for_video(media_file, language)
 
-    if os.path.exists(subtitle_path) and not replace_existing:
+    if not replace_existing and _subtitle_exists(media_file, subtitle_path):
         return {"status": "skipped", "reason": "subtitle already exists", "path": subtitle_path}
 
     candidates = await opensubtitles.search_candidates(
@@ -300,10 +557,14 @@ async def _download_best_subtitle(
         return {"status": "not_found", "reason": f"only {len(candidates)} candidates available"}
 
     selected = candidates[attempt]
-    content, source_name = await opensubtitles.download_subtitle(selected["file_id"])
-    os.makedirs(os.path.dirname(subtitle_path), exist_ok=True)
-    with open(subtitle_path, "wb") as f:
-        f.write(content)
+    source_name = await opensubtitles.download_subtitle_to(selected["file_id"], subtitle_path)
+    subtitle_index.record_sidecar(
+        media_file,
+        subtitle_path,
+        language=language,
+        source_release=selected.get("release") or selected.get("file_name") or source_name,
+        source_file=source_name,
+    )
 
     return {
         "status": "downloaded",
@@ -374,6 +635,18 @@ class SubtitleTryFallbackRequest(BaseModel):
     replace_existing: bool = True
 
 
+class SubtitleBatchRequest(BaseModel):
+    season_path: str           # folder holding the season's episode files
+    title: str                 # show title, e.g. "Breaking Bad"
+    year: Optional[int] = None
+    season: Optional[int] = None   # defaults to the season parsed from the episode filenames
+    language: str = "en"
+    limit: int = 10
+    concurrency: int = 4       # max SubDL searches/downloads in flight
+    exact_only: bool = False   # per-episode fallback only accepts exact release matches
+    replace_existing: bool = False
+
+
 class SubtitleClearRequest(BaseModel):
     media_path: str
 
@@ -383,6 +656,19 @@ class SubtitleOffsetRequest(BaseModel):
     offset_seconds: float
     subtitle_file: Optional[str] = None
     note: Optional[str] = None
+    apply_to_file: bool = False    # rewrite the sidecar's timestamps instead of only noting the offset
+    drift_factor: float = 1.0      # linear drift: new = old * drift_factor + offset_seconds
+
+
+class SubtitleSyncRequest(BaseModel):
+    media_path: str
+    subtitle_file: Optional[str] = None      # sidecar next to the media; defaults to <stem>.en.srt
+    max_offset_seconds: float = 60.0         # search window either side of zero
+    detect_drift: bool = True                # also try 23.976 <-> 24/25 fps ratios
+    audio_stream: int = 0                    # index among the file's audio streams
+    analyze_seconds: Optional[float] = None  # decode only the first N seconds (less FUSE I/O)
+    apply_to_file: bool = False              # bake the result into the sidecar's timestamps
+    force: bool = False                      # save even when the alignment is ambiguous
 
 
 # ---------------------------------------------------------------------------
@@ -395,6 +681,12 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics(_: str = Depends(require_api_key)):
+    """Size, hit/miss, eviction and expiration counters of every in-process cache."""
+    return {"caches": cache_stats()}
+
+
 @app.post("/search")
 async def search(req: SearchRequest, _: str = Depends(require_api_key)):
     """
@@ -598,31 +890,21 @@ async def download_subtitle(req: SubtitleDownloadRequest, _: str = Depends(requi
 
     language = (req.language or "en").strip().lower() or "en"
     subtitle_path = _subtitle_path_for_video(req.media_path, language)
-    if os.path.exists(subtitle_path) and not req.replace_existing:
+    if not req.replace_existing and _subtitle_exists(req.media_path, subtitle_path):
         return {
             "status": "skipped",
             "reason": "subtitle already exists",
             "path": subtitle_path,
         }
 
-    try:
-        archive_bytes = await asyncio.to_thread(subdl.download_archive, req.download_url)
-        subtitle_bytes, source_name = await asyncio.to_thread(_extract_subtitle_bytes, archive_bytes)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Subtitle download failed: [{type(exc).__name__}] {exc}",
-        )
-
-    try:
-        removed = _clear_subtitle_sidecars(req.media_path) if req.replace_existing else []
-        with open(subtitle_path, "wb") as f:
-            f.write(subtitle_bytes)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save subtitle file: {exc}",
-        )
+    source_name, removed = await _install_subtitle_from_archive(
+        req.download_url,
+        req.media_path,
+        subtitle_path,
+        req.replace_existing,
+        language=language,
+        release_name=req.release_name,
+    )
 
     return {
         "status": "downloaded",
@@ -695,31 +977,22 @@ async def try_fallback_subtitle(req: SubtitleTryFallbackRequest, _: str = Depend
     selected = fallback_candidates[index]
     language = (req.language or "en").strip().lower() or "en"
     subtitle_path = _subtitle_path_for_video(req.media_path, language)
-    if os.path.exists(subtitle_path) and not req.replace_existing:
+    if not req.replace_existing and _subtitle_exists(req.media_path, subtitle_path):
         return {
             "status": "skipped",
             "reason": "subtitle already exists",
             "path": subtitle_path,
         }
 
-    try:
-        archive_bytes = await asyncio.to_thread(subdl.download_archive, selected.get("download_url"))
-        subtitle_bytes, source_name = await asyncio.to_thread(_extract_subtitle_bytes, archive_bytes)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Subtitle download failed: [{type(exc).__name__}] {exc}",
-        )
-
-    try:
-        removed = _clear_subtitle_sidecars(req.media_path) if req.replace_existing else []
-        with open(subtitle_path, "wb") as f:
-            f.write(subtitle_bytes)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save subtitle file: {exc}",
-        )
+    source_name, removed = await _install_subtitle_from_archive(
+        selected.get("download_url") or "",
+        req.media_path,
+        subtitle_path,
+        req.replace_existing,
+        language=language,
+        release_name=selected.get("release_name"),
+        match_score=selected["match"]["score"],
+    )
 
     return {
         "status": "downloaded",
@@ -732,6 +1005,96 @@ async def try_fallback_subtitle(req: SubtitleTryFallbackRequest, _: str = Depend
     }
 
 
+@app.post("/subtitles/batch")
+async def batch_subtitles(req: SubtitleBatchRequest, _: str = Depends(require_api_key)):
+    """
+    Fetch subtitles for every episode in a season folder.
+    The folder is scanned once; a SubDL season pack is tried first and shared
+    across all episodes, then any episode it did not cover is searched
+    individually with at most `concurrency` requests in flight.
+    Results stream back as NDJSON, one line per episode as it finishes,
+    followed by a final summary line.
+    """
+    if not os.path.isdir(req.season_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Season folder not found: {req.season_path}",
+        )
+
+    try:
+        videos, sidecars = await asyncio.to_thread(_scan_season_dir, req.season_path)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to scan season folder: {exc}",
+        )
+
+    language = (req.language or "en").strip().lower() or "en"
+    existing = set(sidecars)
+    pending: dict[tuple[int, int], dict] = {}
+    early: list[dict] = []
+    for video in videos:
+        subtitle_index.reconcile_media(video, _known_sidecars(video, sidecars))
+        token = episode_token(os.path.basename(video))
+        if token is None or (req.season is not None and token[0] != req.season):
+            early.append({"event": "episode", "status": "skipped", "media_path": video,
+                          "reason": "no matching episode number in filename"})
+            continue
+        subtitle_path = _subtitle_path_for_video(video, language)
+        if subtitle_path in existing and not req.replace_existing:
+            early.append({"event": "episode", "status": "skipped", "media_path": video,
+                          "episode": f"S{token[0]:02d}E{token[1]:02d}",
+                          "reason": "subtitle already exists", "path": subtitle_path})
+            continue
+        if token in pending:
+            early.append({"event": "episode", "status": "skipped", "media_path": video,
+                          "episode": f"S{token[0]:02d}E{token[1]:02d}",
+                          "reason": f"duplicate episode — already handled by {pending[token]['video']}"})
+            continue
+        pending[token] = {
+            "video": video,
+            "subtitle_path": subtitle_path,
+            "sidecars": _known_sidecars(video, sidecars),
+        }
+
+    seasons = [token[0] for token in pending]
+    season = req.season if req.season is not None else (max(set(seasons), key=seasons.count) if seasons else None)
+
+    async def _events():
+        counts: dict[str, int] = {}
+
+        def _line(item: dict) -> bytes:
+            if item.get("event") == "episode":
+                counts[item["status"]] = counts.get(item["status"], 0) + 1
+            return (json.dumps(item) + "\n").encode("utf-8")
+
+        yield _line({"event": "start", "season_path": req.season_path, "season": season,
+                     "episodes": len(videos), "pending": len(pending)})
+        for item in early:
+            yield _line(item)
+
+        if pending and season is not None:
+            for item in await _batch_pack_episodes(req, language, season, pending):
+                pending.pop(episode_token(item["episode"]), None)
+                yield _line(item)
+
+        sem = asyncio.Semaphore(max(1, min(req.concurrency, 8)))
+        tasks = [
+            asyncio.create_task(_batch_single_episode(req, language, token, target, sem))
+            for token, target in sorted(pending.items())
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield _line(await next_done)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield _line({"event": "done", "season_path": req.season_path, "results": counts})
+
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
+
+
 @app.post("/subtitles/clear")
 async def clear_subtitles(req: SubtitleClearRequest, _: str = Depends(require_api_key)):
     if not os.path.isfile(req.media_path):
@@ -756,6 +1119,51 @@ async def clear_subtitles(req: SubtitleClearRequest, _: str = Depends(require_ap
     }
 
 
+def _offset_subtitle_path(media_path: str, subtitle_file: Optional[str]) -> str:
+    """Sidecar the offset refers to: the given file name next to the media, else <stem>.en.srt."""
+    name = subtitle_file or Path(_subtitle_path_for_video(media_path, "en")).name
+    return os.path.join(os.path.dirname(media_path), os.path.basename(name))
+
+
+async def _apply_offset_to_file(subtitle_path: str, offset_seconds: float, drift_factor: float) -> int:
+    if drift_factor <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="drift_factor must be greater than 0",
+        )
+    try:
+        return await asyncio.to_thread(
+            shift_subtitle_file, subtitle_path, subtitle_path, offset_seconds, drift_factor
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Subtitle file not found: {subtitle_path}",
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to rewrite subtitle timings: {exc}",
+        )
+
+
+def _write_offset_note(media_path: str, payload: dict) -> Path:
+    note_path = _subtitle_note_path(media_path)
+    try:
+        with open(note_path, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, indent=2)
+            fh.write("\n")
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save subtitle offset note: {exc}",
+        )
+    subtitle_index.set_offset(media_path, payload)
+    return note_path
+
+
 @app.post("/subtitles/offset")
 async def save_subtitle_offset(req: SubtitleOffsetRequest, _: str = Depends(require_api_key)):
     if not os.path.isfile(req.media_path):
@@ -764,41 +1172,135 @@ async def save_subtitle_offset(req: SubtitleOffsetRequest, _: str = Depends(requ
             detail=f"Media file not found: {req.media_path}",
         )
 
-    note_path = _subtitle_note_path(req.media_path)
+    subtitle_path = _offset_subtitle_path(req.media_path, req.subtitle_file)
     payload = {
         "media_path": req.media_path,
-        "subtitle_file": req.subtitle_file or Path(_subtitle_path_for_video(req.media_path, "en")).name,
+        "subtitle_file": Path(subtitle_path).name,
         "offset_seconds": req.offset_seconds,
         "note": req.note or "",
     }
 
+    cues_shifted = None
+    if req.apply_to_file:
+        cues_shifted = await _apply_offset_to_file(subtitle_path, req.offset_seconds, req.drift_factor)
+        # The file now carries the correction; players should not add it again.
+        payload["applied_to_file"] = True
+        payload["drift_factor"] = req.drift_factor
+        payload["cues_shifted"] = cues_shifted
+
+    note_path = _write_offset_note(req.media_path, payload)
+
+    return {
+        "status": "saved",
+        "path": str(note_path),
+        "offset_seconds": req.offset_seconds,
+        "subtitle_file": payload["subtitle_file"],
+        "applied_to_file": req.apply_to_file,
+        "cues_shifted": cues_shifted,
+    }
+
+
+@app.post("/subtitles/sync")
+async def auto_sync_subtitle(req: SubtitleSyncRequest, _: str = Depends(require_api_key)):
+    """
+    Measure the subtitle offset (and frame-rate drift) from the audio itself and
+    save it as the offset note. Ambiguous alignments are reported but not saved
+    unless force=true.
+    """
+    if not os.path.isfile(req.media_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Media file not found: {req.media_path}",
+        )
+    subtitle_path = _offset_subtitle_path(req.media_path, req.subtitle_file)
+    if not os.path.isfile(subtitle_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Subtitle file not found: {subtitle_path}",
+        )
+
     try:
-        with open(note_path, "w", encoding="utf-8") as fh:
-            json.dump(payload, fh, indent=2)
-            fh.write("\n")
+        result = await asyncio.to_thread(
+            sync_subtitle,
+            req.media_path,
+            subtitle_path,
+            max_offset_seconds=req.max_offset_seconds,
+            detect_drift=req.detect_drift,
+            audio_stream=req.audio_stream,
+            max_seconds=req.analyze_seconds,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="ffmpeg is not available in this container",
+        )
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save subtitle offset note: {exc}",
+            detail=f"Subtitle sync failed: {exc}",
         )
 
+    if not result["reliable"] and not req.force:
+        return {
+            "status": "uncertain",
+            "media_path": req.media_path,
+            "subtitle_file": Path(subtitle_path).name,
+            "sync": result,
+        }
+
+    payload = {
+        "media_path": req.media_path,
+        "subtitle_file": Path(subtitle_path).name,
+        "offset_seconds": result["offset_seconds"],
+        "note": "auto-sync from audio",
+        "drift_factor": result["drift_factor"],
+        "auto_sync": result,
+    }
+    cues_shifted = None
+    if req.apply_to_file:
+        cues_shifted = await _apply_offset_to_file(
+            subtitle_path, result["offset_seconds"], result["drift_factor"]
+        )
+        payload["applied_to_file"] = True
+        payload["cues_shifted"] = cues_shifted
+
+    note_path = _write_offset_note(req.media_path, payload)
+
     return {
         "status": "saved",
         "path": str(note_path),
-        "offset_seconds": req.offset_seconds,
+        "offset_seconds": result["offset_seconds"],
+        "drift_factor": result["drift_factor"],
         "subtitle_file": payload["subtitle_file"],
+        "applied_to_file": req.apply_to_file,
+        "cues_shifted": cues_shifted,
+        "sync": result,
     }
 
 
 @app.get("/subtitles/offset")
 async def get_subtitle_offset(media_path: str, _: str = Depends(require_api_key)):
-    if not os.path.isfile(media_path):
+    note_path = _subtitle_note_path(media_path)
+
+    # The crawler only drops deleted media every SUBTITLE_INDEX_CRAWL_SECS, so
+    # the file is stat'ed (off the event loop) even when the index has it, and
+    # a missing one is forgotten right away.
+    if not await asyncio.to_thread(os.path.isfile, media_path):
+        subtitle_index.forget_media(media_path)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Media file not found: {media_path}",
         )
 
-    note_path = _subtitle_note_path(media_path)
+    # Otherwise served from the local index whenever possible — no note read.
+    payload = subtitle_index.get_offset(media_path)
+    if payload is not None:
+        return {"status": "ok", "path": str(note_path), "offset": payload}
+    if subtitle_index.is_indexed(media_path):
+        return {"status": "not_found", "path": str(note_path), "offset": None}
+
     if not note_path.exists():
         return {
             "status": "not_found",
@@ -814,6 +1316,7 @@ async def get_subtitle_offset(media_path: str, _: str = Depends(require_api_key)
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to read subtitle offset note: {exc}",
         )
+    subtitle_index.set_offset(media_path, payload)
 
     return {
         "status": "ok",
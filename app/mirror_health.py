@@ -0,0 +1,186 @@
+"""
+Mirror health tracking and hedged racing for sites served from several mirrors.
+
+MirrorPool keeps a rolling (EWMA) latency and success rate per mirror and
+ranks mirrors by expected time-to-good-answer. race() sends the request to the
+best mirror and hedges: if no answer arrives within a short delay derived
+from that mirror's usual latency, the next mirror is started too, and so on.
+The first good answer wins and the stragglers are cancelled. With no history
+yet (cold start) the hedge delay is zero — a plain race across all mirrors.
+
+A fetch that raises MirrorBlocked (e.g. a DDoS-Guard challenge page) puts that
+mirror on a long cooldown; repeated ordinary failures back off exponentially.
+Mirrors on cooldown are never hedged onto; they are only tried once every
+healthy mirror has failed.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger("uvicorn.error")
+
+T = TypeVar("T")
+
+_ALPHA = 0.3                       # EWMA weight of the newest sample
+_UNKNOWN_LATENCY = 2.0             # optimistic guess for mirrors with no history
+_MIN_HEDGE_SECS = 0.3
+_MAX_HEDGE_SECS = 3.0
+BLOCKED_COOLDOWN_SECS = 15 * 60
+_FAILURE_COOLDOWN_BASE = 30.0
+_FAILURE_COOLDOWN_MAX = 10 * 60
+
+
+class MirrorBlocked(Exception):
+    """The mirror answered, but with a bot-check/challenge page instead of content."""
+
+
+class _MirrorStats:
+    __slots__ = ("latency", "success", "failures", "cooldown_until", "last_error")
+
+    def __init__(self) -> None:
+        self.latency: Optional[float] = None
+        self.success = 1.0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.last_error: Optional[str] = None
+
+    def expected_cost(self) -> float:
+        latency = self.latency if self.latency is not None else _UNKNOWN_LATENCY
+        return latency / max(self.success, 0.05)
+
+
+class MirrorPool:
+    def __init__(self, mirrors: list[str], name: str = "mirror"):
+        self.name = name
+        self._stats: dict[str, _MirrorStats] = {m: _MirrorStats() for m in mirrors}
+
+    # ------------------------------------------------------------------
+    # Ranking
+    # ------------------------------------------------------------------
+
+    def _partition(self) -> tuple[list[str], list[str]]:
+        now = time.monotonic()
+        healthy = [m for m, s in self._stats.items() if s.cooldown_until <= now]
+        cooling = [m for m, s in self._stats.items() if s.cooldown_until > now]
+        healthy.sort(key=lambda m: self._stats[m].expected_cost())
+        cooling.sort(key=lambda m: self._stats[m].cooldown_until)
+        return healthy, cooling
+
+    def ranked(self) -> list[str]:
+        """Healthy mirrors by expected cost, then cooled-down ones (soonest available first)."""
+        healthy, cooling = self._partition()
+        return healthy + cooling
+
+    def best(self) -> str:
+        return self.ranked()[0]
+
+    def hedge_delay(self, mirror: str) -> float:
+        latency = self._stats[mirror].latency
+        if latency is None:
+            return 0.0
+        return min(max(1.5 * latency, _MIN_HEDGE_SECS), _MAX_HEDGE_SECS)
+
+    # ------------------------------------------------------------------
+    # Recording outcomes
+    # ------------------------------------------------------------------
+
+    def record_success(self, mirror: str, latency: float) -> None:
+        s = self._stats[mirror]
+        s.latency = latency if s.latency is None else (1 - _ALPHA) * s.latency + _ALPHA * latency
+        s.success = (1 - _ALPHA) * s.success + _ALPHA
+        s.failures = 0
+        s.cooldown_until = 0.0
+        s.last_error = None
+
+    def record_failure(self, mirror: str, error: str, *, blocked: bool = False) -> None:
+        s = self._stats[mirror]
+        s.success = (1 - _ALPHA) * s.success
+        s.failures += 1
+        s.last_error = error
+        if blocked:
+            cooldown = BLOCKED_COOLDOWN_SECS
+        elif s.failures >= 2:
+            cooldown = min(_FAILURE_COOLDOWN_BASE * 2 ** (s.failures - 2), _FAILURE_COOLDOWN_MAX)
+        else:
+            return
+        s.cooldown_until = max(s.cooldown_until, time.monotonic() + cooldown)
+        logger.info("%s %s on cooldown for %.0fs: %s", self.name, mirror, cooldown, error)
+
+    def snapshot(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "mirror": m,
+                "latency_secs": round(s.latency, 3) if s.latency is not None else None,
+                "success_rate": round(s.success, 3),
+                "consecutive_failures": s.failures,
+                "cooldown_secs": max(0, round(s.cooldown_until - now)),
+                "last_error": s.last_error,
+            }
+            for m, s in ((m, self._stats[m]) for m in self.ranked())
+        ]
+
+    # ------------------------------------------------------------------
+    # Hedged race
+    # ------------------------------------------------------------------
+
+    async def _attempt(self, mirror: str, fetch: Callable[[str], Awaitable[T]]) -> tuple[bool, Optional[T]]:
+        started = time.monotonic()
+        try:
+            result = await fetch(mirror)
+        except asyncio.CancelledError:
+            raise
+        except MirrorBlocked as exc:
+            self.record_failure(mirror, str(exc) or "blocked", blocked=True)
+            return False, None
+        except Exception as exc:
+            self.record_failure(mirror, f"{type(exc).__name__}: {exc}")
+            logger.debug("%s %s failed: %s", self.name, mirror, exc)
+            return False, None
+        self.record_success(mirror, time.monotonic() - started)
+        return True, result
+
+    async def race(self, fetch: Callable[[str], Awaitable[T]]) -> tuple[Optional[str], Optional[T]]:
+        """
+        Run fetch(mirror) hedged across mirrors in ranked order.
+        fetch must raise (MirrorBlocked or any exception) for a bad answer.
+        Returns (mirror, result) for the first good answer, or (None, None).
+        """
+        healthy, cooling = self._partition()
+        order = healthy + cooling
+        delay = self.hedge_delay(order[0]) if order else 0.0
+        pending: dict[asyncio.Task, str] = {}
+        launched = 0
+
+        def launch() -> None:
+            nonlocal launched
+            mirror = order[launched]
+            launched += 1
+            pending[asyncio.create_task(self._attempt(mirror, fetch))] = mirror
+
+        try:
+            if order:
+                launch()
+            while pending:
+                # Hedge only onto healthy mirrors; cooled-down ones are a last resort.
+                can_hedge = launched < len(healthy)
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()  # hedge: the leader is slower than usual
+                    continue
+                for task in done:
+                    mirror = pending.pop(task)
+                    ok, result = task.result()
+                    if ok:
+                        return mirror, result
+                # A mirror failed outright — start the next one now rather than
+                # waiting out the hedge delay (cooled-down ones once nothing else is running).
+                if launched < len(healthy) or (launched < len(order) and not pending):
+                    launch()
+            return None, None
+        finally:
+            for task in pending:
+                task.cancel()
@@ -3,30 +3,44 @@ Music pipeline router — /music/*
 
 Endpoints:
   POST /music/search    — search Soulseek via slskd, return ranked FLAC results
+  POST /music/search/stream — same search, partial rankings streamed as SSE
   POST /music/download  — start slskd download for a chosen result
   GET  /music/status/{id} — poll download progress
 
+Searches and downloads are kept in the job store (data/jobs.db), so a restart
+neither forgets a search_id nor orphans a download — unfinished downloads are
+picked up again on startup.
+
 Auth flow:
   slskd uses JWT (Bearer token). We login with SLSKD_USERNAME/PASSWORD and
-  cache the token. It's valid for 7 days; we refresh with a 5-minute buffer.
+  cache the token in a TokenManager (app/token_manager.py). It's valid for
+  7 days; we refresh in the background 5 minutes before expiry and re-login
+  once on any 401.
 """
 
 import asyncio
+import json
 import logging
 import os
 import re
 import time
 import uuid
+from contextlib import aclosing
 from typing import Optional
 
+import anyio
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Security, status
+from fastapi.responses import StreamingResponse
 from fastapi.security.api_key import APIKeyHeader
 from pydantic import BaseModel
 
 from app.config import settings
+from app.job_store import JobStore
 from app.music_enrichment import enrich_and_deliver, enrich_single_track
 from app.navidrome import search_album as navidrome_search
+from app.token_manager import TokenAuth, TokenManager
+from app.ttl_cache import register_stats
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -49,15 +63,12 @@ async def _require_api_key(key: Optional[str] = Security(_api_key_header)) -> st
 
 
 # ---------------------------------------------------------------------------
-# slskd JWT token cache
+# slskd JWT — shared TokenManager: one login at a time, refreshed ahead of
+# expiry, and every slskd request (auth=_slskd_auth) retried once on a 401
+# (e.g. after slskd restarted with a new signing key)
 # ---------------------------------------------------------------------------
-_jwt: dict = {"token": None, "expires": 0.0}
-
 
-async def _slskd_token() -> str:
-    """Return a valid slskd JWT token, refreshing if needed."""
-    if _jwt["token"] and _jwt["expires"] > time.time() + 300:
-        return _jwt["token"]
+async def _slskd_login() -> tuple[str, float]:
     async with httpx.AsyncClient(timeout=10) as client:
         r = await client.post(
             f"{settings.SLSKD_URL}/api/v0/session",
@@ -66,22 +77,37 @@ async def _slskd_token() -> str:
     if r.status_code != 200:
         raise HTTPException(status_code=503, detail=f"slskd login failed: {r.status_code}")
     data = r.json()
-    _jwt["token"] = data["token"]
-    # Cap at 5 min to avoid stale tokens when slskd is restarted
-    _jwt["expires"] = min(float(data["expires"]), time.time() + 300)
-    return _jwt["token"]
+    return data["token"], float(data["expires"]) - time.time()
 
 
-async def _slskd_headers() -> dict:
-    token = await _slskd_token()
-    return {"Authorization": f"Bearer {token}"}
+_slskd_tokens = TokenManager("slskd", _slskd_login, refresh_ahead_secs=300)
+_slskd_auth = TokenAuth(_slskd_tokens)
 
 
 # ---------------------------------------------------------------------------
-# In-memory stores (reset on container restart — acceptable for our use case)
+# Persistent state (data/jobs.db) — survives restarts; unfinished downloads resume
 # ---------------------------------------------------------------------------
-_search_cache: dict[str, dict] = {}   # search_id → {mode, results}
-_downloads: dict[str, dict] = {}      # download_id → {language, peer, files, folder, status, ...}
+_jobs = JobStore(os.path.join(settings.DATA_DIR, "jobs.db"), name="music_jobs")
+_SEARCH = "music_search"       # search_id → {mode, results}
+_DOWNLOAD = "music_download"   # download_id → {language, peer, files, folder, status, ...}
+_SEARCH_TTL_SECS = 24 * 3600
+_DOWNLOAD_TTL_SECS = 7 * 24 * 3600
+_UNFINISHED = ("starting", "downloading", "enriching")
+
+
+def _set_download(download_id: str, **fields) -> None:
+    _jobs.update(_DOWNLOAD, download_id, **fields)
+
+
+# Poll/enrich tasks — referenced here so they can't be garbage-collected mid-run
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 # ---------------------------------------------------------------------------
 # Models
@@ -211,15 +237,41 @@ def _parse_responses_tracks(responses: list) -> list[dict]:
 # slskd search
 # ---------------------------------------------------------------------------
 
-async def _slskd_search(query: str, timeout_ms: int = 30000) -> list:
-    """Run a slskd search and return ranked result list."""
+# Responses are fetched while the search runs (only when slskd reports new
+# ones), so callers can show partial results; the search is stopped early once
+# enough good results from peers that can upload right now have arrived —
+# most of them come in the first few seconds of a 30 s search.
+_SEARCH_POLL_SECS = 1.0
+_EARLY_STOP_AFTER_SECS = 5          # never stop before this — let fast peers compete
+_EARLY_STOP_RESULTS = 10            # good results needed to stop early
+_EARLY_STOP_MIN_ALBUM_FILES = 4     # a folder with fewer FLACs is a single, not an album
+
+
+def _peer_responsive(resp: dict) -> bool:
+    """Peer has a free upload slot and a known upload speed — a download would start now."""
+    return bool(resp.get("hasFreeUploadSlot")) and (resp.get("uploadSpeed") or 0) > 0
+
+
+def _good_result_count(responses: list, mode: str) -> int:
+    """FLAC results from responsive peers (album mode: only folders that look like albums)."""
+    responsive = [r for r in responses if _peer_responsive(r)]
+    if mode == "track":
+        return len(_parse_responses_tracks(responsive))
+    return sum(1 for r in _parse_responses(responsive) if len(r["files"]) >= _EARLY_STOP_MIN_ALBUM_FILES)
+
+
+async def _slskd_search_updates(query: str, mode: str = "album", timeout_ms: int = 30000):
+    """
+    Run a slskd search, yielding the cumulative response list each time new
+    responses arrive; the last list yielded is the final one. The search is
+    deleted from slskd when the generator finishes or is closed.
+    """
     search_id = str(uuid.uuid4())
-    hdrs = await _slskd_headers()
+    base = f"{settings.SLSKD_URL}/api/v0/searches"
 
-    async with httpx.AsyncClient(timeout=45) as client:
+    async with httpx.AsyncClient(timeout=45, auth=_slskd_auth) as client:
         await client.post(
-            f"{settings.SLSKD_URL}/api/v0/searches",
-            headers=hdrs,
+            base,
             json={
                 "id": search_id,
                 "searchText": query,
@@ -229,30 +281,54 @@ async def _slskd_search(query: str, timeout_ms: int = 30000) -> list:
                 "timeout": timeout_ms,
             },
         )
+        started = time.monotonic()
+        deadline = started + timeout_ms / 1000 + 15   # headroom over slskd's own timeout
+        responses: list = []
+
+        async def fetch_responses() -> bool:
+            nonlocal responses
+            r = await client.get(f"{base}/{search_id}/responses")
+            if r.status_code != 200:
+                return False
+            fresh = r.json() or []
+            changed = len(fresh) != len(responses)
+            responses = fresh
+            return changed
 
-        # Poll until Completed/Stopped (max 45s — covers 30s timeout with headroom)
-        for _ in range(45):
-            await asyncio.sleep(1)
-            r = await client.get(
-                f"{settings.SLSKD_URL}/api/v0/searches/{search_id}",
-                headers=hdrs,
-            )
-            if r.status_code == 200 and r.json().get("state", "").startswith("Completed"):
-                break
-
-        # Fetch responses
-        r = await client.get(
-            f"{settings.SLSKD_URL}/api/v0/searches/{search_id}/responses",
-            headers=hdrs,
-        )
-        responses = r.json() if r.status_code == 200 else []
+        try:
+            while True:
+                await asyncio.sleep(_SEARCH_POLL_SECS)
+                r = await client.get(f"{base}/{search_id}")
+                info = r.json() if r.status_code == 200 else {}
+                complete = info.get("isComplete") or (info.get("state") or "").startswith("Completed")
+                if (info.get("responseCount") or 0) > len(responses) or complete:
+                    if await fetch_responses():
+                        yield responses
+                if complete or time.monotonic() >= deadline:
+                    break
+                elapsed = time.monotonic() - started
+                if elapsed >= _EARLY_STOP_AFTER_SECS and _good_result_count(responses, mode) >= _EARLY_STOP_RESULTS:
+                    logger.info("slskd search %r: stopping early after %.1fs (%d responses)",
+                                query, elapsed, len(responses))
+                    await client.put(f"{base}/{search_id}")
+                    if await fetch_responses():
+                        yield responses
+                    break
+        finally:
+            # Shielded: an SSE client disconnect cancels this generator, and
+            # the cancellation must not also cancel the cleanup
+            with anyio.move_on_after(10, shield=True):
+                try:
+                    await client.delete(f"{base}/{search_id}")
+                except Exception as e:
+                    logger.warning("slskd search cleanup failed: %s", e)
 
-        # Clean up
-        await client.delete(
-            f"{settings.SLSKD_URL}/api/v0/searches/{search_id}",
-            headers=hdrs,
-        )
 
+async def _slskd_search(query: str, mode: str = "album", timeout_ms: int = 30000) -> list:
+    """Run a slskd search and return the final response list."""
+    responses: list = []
+    async for responses in _slskd_search_updates(query, mode, timeout_ms):
+        pass
     return responses
 
 
@@ -263,11 +339,9 @@ async def _slskd_search(query: str, timeout_ms: int = 30000) -> list:
 async def _slskd_cancel_download(peer: str, transfer_id: str) -> None:
     """Cancel and remove a single slskd transfer."""
     try:
-        hdrs = await _slskd_headers()
-        async with httpx.AsyncClient(timeout=10) as client:
+        async with httpx.AsyncClient(timeout=10, auth=_slskd_auth) as client:
             await client.delete(
                 f"{settings.SLSKD_URL}/api/v0/transfers/downloads/{peer}/{transfer_id}",
-                headers=hdrs,
                 params={"remove": "true"},
             )
         logger.info("Cancelled slskd transfer %s / %s", peer, transfer_id)
@@ -281,32 +355,39 @@ _SIZE_MISMATCH_RE = re.compile(r"remote size of (\d+)")
 async def _slskd_download_files(peer_username: str, file_list: list[dict]) -> None:
     """Queue all files from a peer in a single batch POST.
 
+    Raises RuntimeError when slskd rejects the batch (non-2xx, or it reports
+    no file enqueued), so the caller can fail the job instead of waiting for
+    stuck detection.
+
     Handles TransferSizeMismatchException transparently: after enqueueing,
     waits 2 s, checks for immediate size-mismatch failures, then deletes
     and re-enqueues with the peer's actual announced size.
     """
-    hdrs = await _slskd_headers()
     payload = [{"filename": f["filename"], "size": f.get("size") or 0} for f in file_list]
 
-    async with httpx.AsyncClient(timeout=30) as client:
+    async with httpx.AsyncClient(timeout=30, auth=_slskd_auth) as client:
         r = await client.post(
             f"{settings.SLSKD_URL}/api/v0/transfers/downloads/{peer_username}",
-            headers=hdrs,
             json=payload,
         )
 
+    if not r.is_success:
+        logger.warning("slskd enqueue %s: HTTP %s %s", peer_username, r.status_code, r.text[:200])
+        raise RuntimeError(f"slskd rejected the download (HTTP {r.status_code})")
     try:
         resp_data = r.json()
-        if isinstance(resp_data, dict):
-            enqueued = len(resp_data.get("enqueued", []))
-            n_failed = len(resp_data.get("failed", []))
-        else:
-            enqueued = n_failed = 0
-            logger.warning("slskd enqueue unexpected response: %s", resp_data)
-    except Exception:
-        enqueued = n_failed = 0
-    logger.info("slskd enqueue %s: HTTP %s, enqueued=%d failed=%d",
-                peer_username, r.status_code, enqueued, n_failed)
+    except ValueError:
+        resp_data = None
+    if not isinstance(resp_data, dict):
+        # No per-file report to check — the 2xx status is all we have
+        logger.warning("slskd enqueue unexpected response: %s", resp_data)
+    else:
+        enqueued = len(resp_data.get("enqueued") or [])
+        n_failed = len(resp_data.get("failed") or [])
+        logger.info("slskd enqueue %s: HTTP %s, enqueued=%d failed=%d",
+                    peer_username, r.status_code, enqueued, n_failed)
+        if payload and enqueued == 0:
+            raise RuntimeError(f"slskd enqueued none of the {len(payload)} files ({n_failed} failed)")
 
     # Wait briefly for any immediate size-mismatch failures to appear
     await asyncio.sleep(2)
@@ -316,13 +397,11 @@ async def _slskd_download_files(peer_username: str, file_list: list[dict]) -> No
 async def _slskd_fix_size_mismatches(peer_username: str, file_list: list[dict]) -> None:
     """Check for failed transfers due to size mismatch; delete and re-enqueue with corrected sizes."""
     filenames = {f["filename"] for f in file_list}
-    hdrs = await _slskd_headers()
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with httpx.AsyncClient(timeout=15, auth=_slskd_auth) as client:
             r = await client.get(
                 f"{settings.SLSKD_URL}/api/v0/transfers/downloads/{peer_username}",
-                headers=hdrs,
             )
         if r.status_code != 200:
             return
@@ -346,10 +425,9 @@ async def _slskd_fix_size_mismatches(peer_username: str, file_list: list[dict])
                         tf["filename"].rsplit("\\", 1)[-1], tf.get("size", 0), actual_size)
             if transfer_id:
                 try:
-                    async with httpx.AsyncClient(timeout=10) as client:
+                    async with httpx.AsyncClient(timeout=10, auth=_slskd_auth) as client:
                         await client.delete(
                             f"{settings.SLSKD_URL}/api/v0/transfers/downloads/{peer_username}/{transfer_id}",
-                            headers=hdrs,
                             params={"remove": "true"},
                         )
                 except Exception as e:
@@ -358,11 +436,9 @@ async def _slskd_fix_size_mismatches(peer_username: str, file_list: list[dict])
 
     if retry_payload:
         try:
-            hdrs = await _slskd_headers()
-            async with httpx.AsyncClient(timeout=30) as client:
+            async with httpx.AsyncClient(timeout=30, auth=_slskd_auth) as client:
                 r = await client.post(
                     f"{settings.SLSKD_URL}/api/v0/transfers/downloads/{peer_username}",
-                    headers=hdrs,
                     json=retry_payload,
                 )
             logger.info("Size-corrected re-enqueue %s: HTTP %s, files=%d",
@@ -371,80 +447,208 @@ async def _slskd_fix_size_mismatches(peer_username: str, file_list: list[dict])
             logger.error("Size-corrected re-enqueue failed: %s", e)
 
 
+# ---------------------------------------------------------------------------
+# Shared transfer monitor — one slskd poll for every in-flight download
+# ---------------------------------------------------------------------------
+# Each download job used to run its own 10 s loop against
+# /transfers/downloads/{peer}, so N concurrent downloads meant N requests
+# (and N httpx clients) every 10 s. Jobs now register a _TransferWatch and
+# sleep on its event; a single task fetches /transfers/downloads (all peers)
+# once per interval, updates every watch, detects stalls and wakes only the
+# jobs whose state changed. The task exits when nothing is being watched.
+# (slskd also has a SignalR hub, but its transfer events are not a stable
+# API — the REST listing is.)
+
+_TRANSFER_POLL_SECS = 10
+_TRANSFER_TIMEOUT_SECS = 3600        # max 60 min per download
+_MIN_COMPLETE_BYTES = 65536          # "succeeded" with less than this = bogus file
+
+
+def _transfer_outcome(tf: dict) -> Optional[str]:
+    """"completed" / "failed" for a finished slskd transfer, None while in flight."""
+    st = (tf.get("state") or "").lower()
+    if "succeeded" in st and int(tf.get("bytesTransferred") or 0) >= _MIN_COMPLETE_BYTES:
+        return "completed"
+    if "succeeded" in st or "completed" in st or "errored" in st or "cancelled" in st or "rejected" in st:
+        return "failed"
+    return None
+
+
+class _TransferWatch:
+    """State of one job's files, as last seen by the monitor."""
+
+    def __init__(self, peer: str, filenames: set[str], expected: int):
+        self.peer = peer
+        self.filenames = filenames
+        self.expected = expected
+        self.completed = self.failed = self.bytes = 0
+        self.transfer_ids: dict[str, str] = {}   # filename → slskd transfer id
+        self.started = self.last_progress = time.monotonic()
+        self.stuck_reason: Optional[str] = None
+        self.changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.completed + self.failed >= self.expected or self.stuck_reason is not None
+
+    def update(self, files: list[dict], now: float) -> None:
+        completed = failed = total_bytes = 0
+        for tf in files:
+            if tf.get("filename") not in self.filenames:
+                continue
+            if tf.get("id"):
+                self.transfer_ids[tf["filename"]] = tf["id"]
+            total_bytes += int(tf.get("bytesTransferred") or 0)
+            outcome = _transfer_outcome(tf)
+            if outcome == "completed":
+                completed += 1
+            elif outcome == "failed":
+                failed += 1
+        changed = (completed, failed) != (self.completed, self.failed)
+        self.completed, self.failed = completed, failed
+        if total_bytes > self.bytes:
+            self.last_progress = now
+        self.bytes = max(self.bytes, total_bytes)
+        # Stuck-peer detection (only before any file has finished)
+        if not (completed or failed) and self.stuck_reason is None:
+            if self.bytes == 0 and now - self.started >= _STUCK_NO_START_SECS:
+                self.stuck_reason = "unresponsive for 10 minutes"
+            elif self.bytes > 0 and now - self.last_progress >= _STUCK_STALL_SECS:
+                self.stuck_reason = "stalled for 5 minutes"
+            changed = changed or self.stuck_reason is not None
+        if changed or self.finished:
+            self.changed.set()
+
+    async def wait(self, timeout: float) -> None:
+        """Return once every file finished, the peer got stuck, or timeout elapsed."""
+        deadline = time.monotonic() + timeout
+        while not self.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+            self.changed.clear()
+
+    def progress(self) -> dict:
+        return {
+            "files_total": self.expected,
+            "files_completed": self.completed,
+            "files_failed": self.failed,
+            "bytes": self.bytes,
+        }
+
+
+class _TransferMonitor:
+    def __init__(self, interval_secs: float):
+        self.interval_secs = interval_secs
+        self._watches: dict[str, _TransferWatch] = {}   # download_id → watch
+        self._task: Optional[asyncio.Task] = None
+        self.polls = self.poll_errors = 0
+
+    def watch(self, download_id: str, peer: str, filenames: set[str], expected: int) -> _TransferWatch:
+        w = _TransferWatch(peer, filenames, expected)
+        self._watches[download_id] = w
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return w
+
+    def unwatch(self, download_id: str) -> None:
+        self._watches.pop(download_id, None)
+
+    def get(self, download_id: str) -> Optional[_TransferWatch]:
+        return self._watches.get(download_id)
+
+    async def _run(self) -> None:
+        client = httpx.AsyncClient(timeout=15, auth=_slskd_auth)
+        try:
+            while True:
+                await asyncio.sleep(self.interval_secs)
+                if not self._watches:
+                    self._task = None  # before any await, so a new watch() starts a fresh task
+                    return
+                await self._poll(client)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+            await client.aclose()
+
+    async def _poll(self, client: httpx.AsyncClient) -> None:
+        self.polls += 1
+        try:
+            r = await client.get(f"{settings.SLSKD_URL}/api/v0/transfers/downloads")
+            r.raise_for_status()
+            listing = r.json() or []
+            by_peer: dict[str, list[dict]] = {}
+            for user in (listing if isinstance(listing, list) else [listing]):
+                by_peer[user.get("username")] = [
+                    tf for directory in (user.get("directories") or []) for tf in (directory.get("files") or [])
+                ]
+        except Exception as e:  # a malformed listing must not kill the monitor task
+            self.poll_errors += 1
+            logger.warning("Transfer poll error: %s", e)
+            return
+        now = time.monotonic()
+        for w in list(self._watches.values()):
+            w.update(by_peer.get(w.peer, []), now)
+
+    def stats(self) -> dict:
+        return {"watching": len(self._watches), "polls": self.polls, "poll_errors": self.poll_errors}
+
+
+_transfers = _TransferMonitor(_TRANSFER_POLL_SECS)
+register_stats("slskd_transfer_monitor", _transfers.stats)
+
+
+async def _await_transfers(download_id: str, peer_username: str, filenames: set[str], expected: int, label: str) -> Optional[_TransferWatch]:
+    """
+    Wait on the shared monitor until the job's files finish. Returns the final
+    watch, or None after cancelling a stuck peer's transfers and marking the
+    download stuck.
+    """
+    watch = _transfers.watch(download_id, peer_username, filenames, expected)
+    try:
+        while True:
+            before = (watch.completed, watch.failed)
+            await watch.wait(_TRANSFER_TIMEOUT_SECS - (time.monotonic() - watch.started))
+            if (watch.completed, watch.failed) != before:
+                logger.info("%s %s: %d/%d done, %d failed", label, download_id, watch.completed, expected, watch.failed)
+            if watch.finished or time.monotonic() - watch.started >= _TRANSFER_TIMEOUT_SECS:
+                break
+    finally:
+        _transfers.unwatch(download_id)
+    if watch.stuck_reason:
+        logger.warning("%s %s: peer %s %s — cancelling", label, download_id, peer_username, watch.stuck_reason)
+        for tid in watch.transfer_ids.values():
+            await _slskd_cancel_download(peer_username, tid)
+        _set_download(download_id, status="stuck", message=(
+            f"Peer {peer_username} was {watch.stuck_reason}. Download cancelled."
+        ))
+        return None
+    return watch
+
+
 async def _poll_and_enrich(download_id: str, peer_username: str, file_count: int) -> None:
     """Monitor slskd until all files complete, then run enrichment."""
     logger.info("Download poll: %s (%s, %d files)", download_id, peer_username, file_count)
-    info = _downloads.get(download_id)
+    info = _jobs.get(_DOWNLOAD, download_id)
     if not info:
         return
 
-    _downloads[download_id]["status"] = "downloading"
+    _set_download(download_id, status="downloading")
 
     our_files = {f["filename"] for f in info.get("files", [])}
-    _start = time.monotonic()
-    _last_bytes: int = 0
-    _last_progress = _start
-    _transfer_ids: dict[str, str] = {}   # filename → slskd transfer id
-    completed = failed = 0               # track across loop (safe post-loop access)
-
-    for _ in range(360):  # max 60 min
-        await asyncio.sleep(10)
-        try:
-            hdrs = await _slskd_headers()
-            async with httpx.AsyncClient(timeout=10) as client:
-                r = await client.get(
-                    f"{settings.SLSKD_URL}/api/v0/transfers/downloads/{peer_username}",
-                    headers=hdrs,
-                )
-            data = r.json() if r.status_code == 200 else {}
-            completed = failed = 0
-            _cur_total_bytes: int = 0
-            for directory in (data.get("directories") or []):
-                for tf in directory.get("files") or []:
-                    if tf.get("filename") in our_files:
-                        tid = tf.get("id", "")
-                        if tid:
-                            _transfer_ids[tf["filename"]] = tid
-                        tf_bytes = int(tf.get("bytesTransferred") or 0)
-                        _cur_total_bytes += tf_bytes
-                        st = (tf.get("state") or "").lower()
-                        if "succeeded" in st and tf_bytes >= 65536:
-                            completed += 1
-                        elif "succeeded" in st or "completed" in st or "errored" in st or "cancelled" in st or "rejected" in st:
-                            failed += 1
-            logger.info("Download %s: %d/%d done, %d failed", download_id, completed, file_count, failed)
-            if completed + failed >= file_count:
-                break
-            # Stuck-peer detection
-            _now = time.monotonic()
-            if _cur_total_bytes > _last_bytes:
-                _last_bytes = _cur_total_bytes
-                _last_progress = _now
-            if not (completed or failed):
-                no_start = (_last_bytes == 0) and ((_now - _start) >= _STUCK_NO_START_SECS)
-                stalled  = (_last_bytes > 0)  and ((_now - _last_progress) >= _STUCK_STALL_SECS)
-                if no_start or stalled:
-                    reason = "unresponsive for 10 minutes" if no_start else "stalled for 5 minutes"
-                    logger.warning("Album %s: peer %s %s — cancelling", download_id, peer_username, reason)
-                    for tid in _transfer_ids.values():
-                        await _slskd_cancel_download(peer_username, tid)
-                    _downloads[download_id]["status"]  = "stuck"
-                    _downloads[download_id]["message"] = (
-                        f"Peer {peer_username} was {reason}. Download cancelled."
-                    )
-                    return
-        except Exception as e:
-            logger.warning("Transfer poll error: %s", e)
-
-    if _downloads[download_id].get("status") != "downloading":
-        return  # was marked stuck inside the loop
-    if completed == 0:
-        _downloads[download_id]["status"]  = "stuck"
-        _downloads[download_id]["message"] = (
+    watch = await _await_transfers(download_id, peer_username, our_files, file_count, "Album")
+    if watch is None:
+        return
+    if watch.completed == 0:
+        _set_download(download_id, status="stuck", message=(
             f"Peer {peer_username} rejected or failed the transfer."
-        )
+        ))
         return
-    _downloads[download_id]["status"] = "enriching"
+    _set_download(download_id, status="enriching")
 
     # Derive local folder path: slskd saves to {downloads_dir}/{album_folder_name}/
     # (slskd uses only the last path component as the folder name, no peer subfolder)
@@ -473,10 +677,9 @@ async def _poll_and_enrich(download_id: str, peer_username: str, file_count: int
             raise OSError("all FLAC files are too small or unreadable")
     except Exception as e:
         logger.error("Album enrichment: file check failed for %s — %s", local_folder, e)
-        _downloads[download_id]["status"]  = "stuck"
-        _downloads[download_id]["message"] = (
+        _set_download(download_id, status="stuck", message=(
             f"Peer {peer_username} signalled success but no valid files were written."
-        )
+        ))
         return
 
     success = await enrich_and_deliver(
@@ -486,83 +689,29 @@ async def _poll_and_enrich(download_id: str, peer_username: str, file_count: int
         album_hint=info.get("album", ""),
     )
     if not success:
-        _downloads[download_id]["status"]  = "stuck"
-        _downloads[download_id]["message"] = "Enrichment failed — album could not be identified."
+        _set_download(download_id, status="stuck", message="Enrichment failed — album could not be identified.")
         return
-    _downloads[download_id]["status"] = "done"
+    _set_download(download_id, status="done")
 
 
 async def _poll_and_enrich_track(download_id: str, peer_username: str, filename: str) -> None:
     """Monitor slskd until a single file completes, then run single-track enrichment."""
     logger.info("Track poll: %s (%s, %s)", download_id, peer_username, filename)
-    info = _downloads.get(download_id)
+    info = _jobs.get(_DOWNLOAD, download_id)
     if not info:
         return
 
-    _downloads[download_id]["status"] = "downloading"
-
-    _start = time.monotonic()
-    _last_bytes: int = 0
-    _last_progress = _start
-    _transfer_id: Optional[str] = None
-    _cur_bytes: int = 0
-    completed = failed = 0               # track across loop (safe post-loop access)
+    _set_download(download_id, status="downloading")
 
-    for _ in range(360):  # max 60 min
-        await asyncio.sleep(10)
-        try:
-            hdrs = await _slskd_headers()
-            async with httpx.AsyncClient(timeout=10) as client:
-                r = await client.get(
-                    f"{settings.SLSKD_URL}/api/v0/transfers/downloads/{peer_username}",
-                    headers=hdrs,
-                )
-            data = r.json() if r.status_code == 200 else {}
-            completed = failed = 0
-            _cur_bytes = 0
-            for directory in (data.get("directories") or []):
-                for tf in directory.get("files") or []:
-                    if tf.get("filename") == filename:
-                        _transfer_id = tf.get("id") or _transfer_id
-                        _cur_bytes = int(tf.get("bytesTransferred") or 0)
-                        st = (tf.get("state") or "").lower()
-                        if "succeeded" in st and _cur_bytes >= 65536:
-                            completed += 1
-                        elif "succeeded" in st or "completed" in st or "errored" in st or "cancelled" in st or "rejected" in st:
-                            failed += 1
-            logger.info("Track download %s: completed=%d failed=%d bytes=%d", download_id, completed, failed, _cur_bytes)
-            if completed + failed >= 1:
-                break
-            # Stuck-peer detection
-            _now = time.monotonic()
-            if _cur_bytes > _last_bytes:
-                _last_bytes = _cur_bytes
-                _last_progress = _now
-            if not (completed or failed):
-                no_start = (_last_bytes == 0) and ((_now - _start) >= _STUCK_NO_START_SECS)
-                stalled  = (_last_bytes > 0)  and ((_now - _last_progress) >= _STUCK_STALL_SECS)
-                if no_start or stalled:
-                    reason = "unresponsive for 10 minutes" if no_start else "stalled for 5 minutes"
-                    logger.warning("Track %s: peer %s %s — cancelling", download_id, peer_username, reason)
-                    if _transfer_id is not None:
-                        await _slskd_cancel_download(peer_username, _transfer_id)
-                    _downloads[download_id]["status"]  = "stuck"
-                    _downloads[download_id]["message"] = (
-                        f"Peer {peer_username} was {reason}. Download cancelled."
-                    )
-                    return
-        except Exception as e:
-            logger.warning("Track poll error: %s", e)
-
-    if _downloads[download_id].get("status") != "downloading":
-        return  # was marked stuck inside the loop
-    if completed == 0:
-        _downloads[download_id]["status"]  = "stuck"
-        _downloads[download_id]["message"] = (
+    watch = await _await_transfers(download_id, peer_username, {filename}, 1, "Track")
+    if watch is None:
+        return
+    if watch.completed == 0:
+        _set_download(download_id, status="stuck", message=(
             f"Peer {peer_username} rejected or failed the transfer."
-        )
+        ))
         return
-    _downloads[download_id]["status"] = "enriching"
+    _set_download(download_id, status="enriching")
 
     # slskd saves single file to {downloads_dir}/{last_folder_component}/{basename}
     folder_name = _remote_folder(filename).replace("\\", "/").rsplit("/", 1)[-1]
@@ -580,10 +729,9 @@ async def _poll_and_enrich_track(download_id: str, peer_username: str, filename:
             raise OSError(f"only {len(sample)} bytes readable")
     except Exception as e:
         logger.error("Track enrichment: file check failed for %s — %s", local_path, e)
-        _downloads[download_id]["status"]  = "stuck"
-        _downloads[download_id]["message"] = (
+        _set_download(download_id, status="stuck", message=(
             f"Peer {peer_username} signalled success but no valid file was written."
-        )
+        ))
         return
 
     success = await enrich_single_track(
@@ -593,38 +741,55 @@ async def _poll_and_enrich_track(download_id: str, peer_username: str, filename:
         artist_hint=info.get("artist", ""),
     )
     if not success:
-        _downloads[download_id]["status"]  = "stuck"
-        _downloads[download_id]["message"] = "Enrichment failed — track could not be identified."
+        _set_download(download_id, status="stuck", message="Enrichment failed — track could not be identified.")
         return
-    _downloads[download_id]["status"] = "done"
+    _set_download(download_id, status="done")
 
 
-# ---------------------------------------------------------------------------
-# Endpoints
-# ---------------------------------------------------------------------------
+async def _enqueue_download(download_id: str, peer: str, files: list[dict]) -> None:
+    """
+    Hand a new download to slskd. If slskd can't be reached or rejects the
+    files, the job is marked failed — not left "starting", which would
+    re-queue it on the next restart after the caller was told it failed —
+    and the error is re-raised.
+    """
+    try:
+        await _slskd_download_files(peer, files)
+    except Exception as e:
+        _set_download(download_id, status="failed", message=f"Could not queue the download with slskd: {e}")
+        raise
+    _set_download(download_id, status="downloading")
 
-@router.post("/search")
-async def music_search(req: MusicSearchRequest, _: str = Depends(_require_api_key)):
-    """Search Soulseek via slskd, return up to 10 ranked FLAC results.
-    mode='album' (default) groups by folder; mode='track' returns individual files."""
-    if not settings.SLSKD_PASSWORD:
-        raise HTTPException(status_code=503, detail="SLSKD_PASSWORD not configured")
 
-    already_in_navidrome = False
-    if req.artist and req.album:
-        already_in_navidrome = await navidrome_search(req.artist, req.album)
+async def _resume_download(download_id: str, info: dict) -> None:
+    """Re-attach the poll/enrich task of a download interrupted by a restart."""
+    peer = info["peer_username"]
+    logger.info("Resuming music download %s (%s, was %s)", download_id, peer, info.get("status"))
+    if info.get("status") == "starting":
+        # Stopped before the enqueue was confirmed — slskd may never have seen it
+        try:
+            await _slskd_download_files(peer, info.get("files", []))
+        except Exception as e:
+            _set_download(download_id, status="stuck", message=f"Could not re-queue after restart: {e}")
+            return
+    if info.get("filename"):
+        await _poll_and_enrich_track(download_id, peer, info["filename"])
+    else:
+        await _poll_and_enrich(download_id, peer, len(info.get("files", [])))
 
-    raw_responses = await _slskd_search(req.query)
-    mode = req.mode if req.mode in ("album", "track") else "album"
 
-    if mode == "track":
-        results_raw = _parse_responses_tracks(raw_responses)
-    else:
-        results_raw = _parse_responses(raw_responses)
+@router.on_event("startup")
+async def _resume_unfinished_downloads() -> None:
+    for download_id, info in _jobs.by_status(_DOWNLOAD, _UNFINISHED):
+        _spawn(_resume_download(download_id, info))
+
+
+def _rank_results(responses: list, mode: str) -> list[dict]:
+    return _parse_responses_tracks(responses) if mode == "track" else _parse_responses(responses)
 
-    search_id = str(uuid.uuid4())
-    _search_cache[search_id] = {"mode": mode, "results": results_raw}
 
+def _public_results(results_raw: list[dict], mode: str) -> list[dict]:
+    """Numbered results as returned to clients (result_index for /music/download)."""
     results = []
     if mode == "track":
         for i, r in enumerate(results_raw, 1):
@@ -646,19 +811,98 @@ async def music_search(req: MusicSearchRequest, _: str = Depends(_require_api_ke
                 "size_mb": round(r["total_size"] / 1_048_576, 1),
                 "quality": r["quality_label"],
             })
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+@router.post("/search")
+async def music_search(req: MusicSearchRequest, _: str = Depends(_require_api_key)):
+    """Search Soulseek via slskd, return up to 10 ranked FLAC results.
+    mode='album' (default) groups by folder; mode='track' returns individual files."""
+    if not settings.SLSKD_PASSWORD:
+        raise HTTPException(status_code=503, detail="SLSKD_PASSWORD not configured")
+
+    already_in_navidrome = False
+    if req.artist and req.album:
+        already_in_navidrome = await navidrome_search(req.artist, req.album)
+
+    mode = req.mode if req.mode in ("album", "track") else "album"
+    raw_responses = await _slskd_search(req.query, mode)
+    results_raw = _rank_results(raw_responses, mode)
+    search_id = str(uuid.uuid4())
+    _jobs.put(_SEARCH, search_id, {"mode": mode, "results": results_raw}, _SEARCH_TTL_SECS)
 
     return {
         "search_id": search_id,
         "mode": mode,
         "already_in_navidrome": already_in_navidrome,
-        "results": results,
+        "results": _public_results(results_raw, mode),
     }
 
 
+@router.post("/search/stream")
+async def music_search_stream(req: MusicSearchRequest, _: str = Depends(_require_api_key)):
+    """
+    Same search as POST /music/search, streamed as Server-Sent Events:
+      event: results  — current ranking, re-sent whenever new responses change it
+      event: done     — the final response of POST /music/search (with search_id)
+    Indexes in "results" events are provisional; download with the search_id
+    and indexes from "done".
+    """
+    if not settings.SLSKD_PASSWORD:
+        raise HTTPException(status_code=503, detail="SLSKD_PASSWORD not configured")
+    mode = req.mode if req.mode in ("album", "track") else "album"
+
+    def _sse(event: str, data: dict) -> bytes:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+    async def _events():
+        navidrome = (
+            asyncio.create_task(navidrome_search(req.artist, req.album)) if req.artist and req.album else None
+        )
+        started = time.monotonic()
+        results_raw: list[dict] = []
+        last_sent: Optional[list] = None
+        try:
+            async with aclosing(_slskd_search_updates(req.query, mode)) as updates:
+                async for responses in updates:
+                    results_raw = _rank_results(responses, mode)
+                    public = _public_results(results_raw, mode)
+                    if public != last_sent:
+                        last_sent = public
+                        yield _sse("results", {
+                            "mode": mode,
+                            "responses": len(responses),
+                            "elapsed_secs": round(time.monotonic() - started, 1),
+                            "results": public,
+                        })
+            already_in_navidrome = await navidrome if navidrome else False
+        except Exception as e:
+            logger.error("Streaming music search %r failed: %s", req.query, e)
+            yield _sse("error", {"detail": f"slskd search failed: {e}"})
+            return
+        finally:
+            if navidrome and not navidrome.done():
+                navidrome.cancel()
+        search_id = str(uuid.uuid4())
+        _jobs.put(_SEARCH, search_id, {"mode": mode, "results": results_raw}, _SEARCH_TTL_SECS)
+        yield _sse("done", {
+            "search_id": search_id,
+            "mode": mode,
+            "already_in_navidrome": already_in_navidrome,
+            "results": _public_results(results_raw, mode),
+        })
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @router.post("/download")
 async def music_download(req: MusicDownloadRequest, _: str = Depends(_require_api_key)):
     """Trigger slskd download for the chosen result. Returns immediately; enrichment runs in background."""
-    cached = _search_cache.get(req.search_id)
+    cached = _jobs.get(_SEARCH, req.search_id)
     if not cached:
         raise HTTPException(status_code=404, detail="Search ID not found or expired. Re-search first.")
 
@@ -678,7 +922,7 @@ async def music_download(req: MusicDownloadRequest, _: str = Depends(_require_ap
         file_size = int(result["size_mb"] * 1_048_576)
         file_list = [{"filename": filename, "size": file_size}]
 
-        _downloads[download_id] = {
+        _jobs.put(_DOWNLOAD, download_id, {
             "status": "starting",
             "language": req.language.lower(),
             "peer_username": peer,
@@ -686,11 +930,10 @@ async def music_download(req: MusicDownloadRequest, _: str = Depends(_require_ap
             "filename": filename,
             "title": result.get("file_basename", "").rsplit(".", 1)[0],
             "artist": "",
-        }
+        }, _DOWNLOAD_TTL_SECS)
 
-        await _slskd_download_files(peer, file_list)
-        _downloads[download_id]["status"] = "downloading"
-        asyncio.create_task(_poll_and_enrich_track(download_id, peer, filename))
+        await _enqueue_download(download_id, peer, file_list)
+        _spawn(_poll_and_enrich_track(download_id, peer, filename))
 
         return {
             "success": True,
@@ -706,7 +949,7 @@ async def music_download(req: MusicDownloadRequest, _: str = Depends(_require_ap
     else:
         files = result["files"]
 
-        _downloads[download_id] = {
+        _jobs.put(_DOWNLOAD, download_id, {
             "status": "starting",
             "language": req.language.lower(),
             "peer_username": peer,
@@ -714,11 +957,10 @@ async def music_download(req: MusicDownloadRequest, _: str = Depends(_require_ap
             "folder_path": result["folder_path"],
             "artist": "",
             "album": "",
-        }
+        }, _DOWNLOAD_TTL_SECS)
 
-        await _slskd_download_files(peer, files)
-        _downloads[download_id]["status"] = "downloading"
-        asyncio.create_task(_poll_and_enrich(download_id, peer, len(files)))
+        await _enqueue_download(download_id, peer, files)
+        _spawn(_poll_and_enrich(download_id, peer, len(files)))
 
         return {
             "success": True,
@@ -733,7 +975,7 @@ async def music_download(req: MusicDownloadRequest, _: str = Depends(_require_ap
 @router.get("/status/{download_id}")
 async def music_status(download_id: str, _: str = Depends(_require_api_key)):
     """Poll download + enrichment status."""
-    info = _downloads.get(download_id)
+    info = _jobs.get(_DOWNLOAD, download_id)
     if not info:
         raise HTTPException(status_code=404, detail="Download ID not found")
     resp: dict = {
@@ -744,4 +986,7 @@ async def music_status(download_id: str, _: str = Depends(_require_api_key)):
     }
     if info.get("message"):
         resp["message"] = info["message"]
+    watch = _transfers.get(download_id)
+    if watch is not None:
+        resp["progress"] = watch.progress()
     return resp
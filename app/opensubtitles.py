@@ -1,13 +1,27 @@
 import asyncio
-import base64
+import http.client
 import json
 import re
-import time
 import urllib.error
 import urllib.parse
 import urllib.request
 from typing import Optional
 
+from app.fsutil import write_stream_atomic
+from app.token_manager import TokenManager
+
+AUTH_TTL = 20 * 60  # re-login after 20 minutes
+_FILENAME_STAR_RE = re.compile(r"filename\*=UTF-8''([^;]+)", re.IGNORECASE)
+_FILENAME_RE = re.compile(r'filename="([^"]*)"', re.IGNORECASE)
+
+
+class _HTTPStatusError(RuntimeError):
+    """An HTTP error response from the API (status kept for the 401 retry)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
 
 class OpenSubtitlesClient:
     def __init__(
@@ -27,10 +41,9 @@ class OpenSubtitlesClient:
         self.prefer_sdh = prefer_sdh
         self.proxy_url = (proxy_url or "").rstrip("/")
         self.proxy_key = proxy_key
-        self._token: Optional[str] = None
         self._base_url = "https://api.opensubtitles.com"
-        self._auth_time: float = 0.0
-        self._auth_ttl: float = 20 * 60
+        # JWT: one login at a time, refreshed ahead of the 20-minute mark, re-login once on a 401
+        self._tokens = TokenManager("opensubtitles", self._login)
         self._headers = {
             "Api-Key": self.api_key,
             "Accept": "application/json",
@@ -42,16 +55,7 @@ class OpenSubtitlesClient:
             "X-User-Agent": "SamAssist v2.2.0",
         }
 
-    async def _ensure_auth(self) -> None:
-        if self.proxy_url:
-            return
-        if not self.api_key or not self.username or not self.password:
-            raise RuntimeError("OpenSubtitles credentials are not configured")
-
-        now = time.monotonic()
-        if self._token and (now - self._auth_time) < self._auth_ttl:
-            return
-
+    async def _login(self) -> tuple[str, float]:
         data = await asyncio.to_thread(
             self._request_json,
             "https://api.opensubtitles.com/api/v1/login",
@@ -64,9 +68,22 @@ class OpenSubtitlesClient:
         base_url = str(data.get("base_url") or "api.opensubtitles.com").strip()
         if not base_url.startswith("http"):
             base_url = f"https://{base_url}"
-        self._token = token
         self._base_url = base_url.rstrip("/")
-        self._auth_time = now
+        return token, AUTH_TTL
+
+    async def _authed_json(self, path: str, **kwargs) -> dict:
+        """_request_json against the login's base_url with the JWT; re-login and retry once on a 401."""
+        if not self.api_key or not self.username or not self.password:
+            raise RuntimeError("OpenSubtitles credentials are not configured")
+        token = await self._tokens.get()
+        try:
+            return await asyncio.to_thread(self._request_json, f"{self._base_url}{path}", token=token, **kwargs)
+        except _HTTPStatusError as exc:
+            if exc.status != 401:
+                raise
+        self._tokens.record_retry(token)
+        token = await self._tokens.get()
+        return await asyncio.to_thread(self._request_json, f"{self._base_url}{path}", token=token, **kwargs)
 
     async def search_candidates(
         self,
@@ -88,7 +105,6 @@ class OpenSubtitlesClient:
             )
             return payload.get("candidates", [])
 
-        await self._ensure_auth()
         lang = languages or self.languages
 
         queries = self._build_queries(title, year, original_name)
@@ -96,11 +112,9 @@ class OpenSubtitlesClient:
         combined: list[dict] = []
 
         for query in queries:
-            payload = await asyncio.to_thread(
-                self._request_json,
-                f"{self._base_url}/api/v1/subtitles",
+            payload = await self._authed_json(
+                "/api/v1/subtitles",
                 params={"query": query, "languages": lang},
-                token=self._token,
             )
             for item in payload.get("data", []):
                 for candidate in self._extract_candidates(item):
@@ -123,40 +137,34 @@ class OpenSubtitlesClient:
         )
         return combined
 
-    async def download_subtitle(
+    async def download_subtitle_to(
         self,
         file_id: int,
+        dest_path: str,
         *,
         sub_format: str = "srt",
-    ) -> tuple[bytes, str]:
+    ) -> str:
+        """Stream a subtitle straight into dest_path (atomic rename). Returns the source filename."""
         if self.proxy_url:
-            payload = await asyncio.to_thread(
-                self._proxy_json,
-                "/download",
+            return await asyncio.to_thread(
+                self._proxy_stream_to_file,
+                "/download/raw",
                 {"file_id": file_id, "sub_format": sub_format},
+                dest_path,
+                f"{file_id}.{sub_format}",
             )
-            content_b64 = payload.get("content_b64")
-            if not content_b64:
-                raise RuntimeError(f"OpenSubtitles proxy download response missing content: {payload}")
-            filename = payload.get("file_name") or f"{file_id}.{sub_format}"
-            return base64.b64decode(content_b64), filename
 
-        await self._ensure_auth()
-
-        payload = await asyncio.to_thread(
-            self._request_json,
-            f"{self._base_url}/api/v1/download",
+        payload = await self._authed_json(
+            "/api/v1/download",
             method="POST",
             payload={"file_id": file_id, "sub_format": sub_format},
-            token=self._token,
         )
         link = payload.get("link")
         if not link:
             raise RuntimeError(f"OpenSubtitles download response missing link: {payload}")
 
-        content = await asyncio.to_thread(self._request_bytes, link)
-        filename = payload.get("file_name") or f"{file_id}.{sub_format}"
-        return content, filename
+        await asyncio.to_thread(self._stream_url_to_file, link, dest_path)
+        return payload.get("file_name") or f"{file_id}.{sub_format}"
 
     def _request_json(
         self,
@@ -187,7 +195,7 @@ class OpenSubtitlesClient:
                 raw = resp.read().decode("utf-8", errors="replace")
         except urllib.error.HTTPError as exc:
             body = exc.read().decode("utf-8", errors="replace")
-            raise RuntimeError(f"OpenSubtitles HTTP {exc.code}: {body[:300]}") from exc
+            raise _HTTPStatusError(exc.code, f"OpenSubtitles HTTP {exc.code}: {body[:300]}") from exc
         except Exception as exc:
             raise RuntimeError(f"OpenSubtitles request failed: [{type(exc).__name__}] {exc}") from exc
 
@@ -197,11 +205,41 @@ class OpenSubtitlesClient:
             snippet = raw[:300].replace("\n", " ")
             raise RuntimeError(f"OpenSubtitles returned non-JSON content: {snippet}") from exc
 
-    def _request_bytes(self, url: str) -> bytes:
+    def _stream_url_to_file(self, url: str, dest_path: str) -> None:
         req = urllib.request.Request(url, method="GET")
         req.add_header("User-Agent", self._headers["User-Agent"])
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            return resp.read()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                write_stream_atomic(resp, dest_path, _content_length(resp))
+        except urllib.error.HTTPError as exc:
+            body = exc.read().decode("utf-8", errors="replace")
+            raise RuntimeError(f"OpenSubtitles file HTTP {exc.code}: {body[:300]}") from exc
+        except (OSError, http.client.HTTPException) as exc:
+            raise RuntimeError(f"OpenSubtitles file download failed: [{type(exc).__name__}] {exc}") from exc
+
+    def _proxy_stream_to_file(self, path: str, payload: dict, dest_path: str, default_name: str) -> str:
+        if not self.proxy_url:
+            raise RuntimeError("OpenSubtitles proxy URL is not configured")
+
+        data = json.dumps(payload).encode("utf-8")
+        req = urllib.request.Request(f"{self.proxy_url}{path}", data=data, method="POST")
+        req.add_header("Content-Type", "application/json")
+        req.add_header("Accept", "application/octet-stream")
+        req.add_header("X-Proxy-Key", self.proxy_key)
+
+        try:
+            with urllib.request.urlopen(req, timeout=90) as resp:
+                filename = _filename_from_disposition(resp.headers.get("Content-Disposition", ""))
+                # Without a Content-Length the proxy sends chunked; http.client raises
+                # IncompleteRead if the terminating chunk never arrives.
+                write_stream_atomic(resp, dest_path, _content_length(resp))
+        except urllib.error.HTTPError as exc:
+            body = exc.read().decode("utf-8", errors="replace")
+            raise RuntimeError(f"OpenSubtitles proxy HTTP {exc.code}: {body[:300]}") from exc
+        except Exception as exc:
+            raise RuntimeError(f"OpenSubtitles proxy request failed: [{type(exc).__name__}] {exc}") from exc
+
+        return filename or default_name
 
     def _proxy_json(self, path: str, payload: dict) -> dict:
         if not self.proxy_url:
@@ -323,3 +361,20 @@ class OpenSubtitlesClient:
         text = re.sub(r"\[[^\]]+\]|\([^)]+\)", " ", text)
         text = re.sub(r"[^A-Za-z0-9+\- ]", " ", text)
         return re.sub(r"\s+", " ", text).strip()
+
+
+def _filename_from_disposition(header: str) -> str:
+    match = _FILENAME_STAR_RE.search(header or "")
+    if match:
+        return urllib.parse.unquote(match.group(1).strip())
+    match = _FILENAME_RE.search(header or "")
+    return match.group(1) if match else ""
+
+
+def _content_length(resp) -> Optional[int]:
+    """Declared body size, for a short-read check (None when absent, e.g. chunked)."""
+    value = resp.headers.get("Content-Length")
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
@@ -1,23 +1,27 @@
-import time
 from typing import Optional
 
 import httpx
 
+from app.token_manager import TokenAuth, TokenManager
+
+AUTH_TTL = 25 * 60  # re-login after 25 minutes
+
+
+def _sid_cookie(request: httpx.Request, sid: str) -> None:
+    request.headers["Cookie"] = f"SID={sid}"
+
 
 class QBittorrentClient:
     def __init__(self, url: str, username: str, password: str):
         self.url = url.rstrip("/")
         self.username = username
         self.password = password
-        self._sid: Optional[str] = None
-        self._auth_time: float = 0.0
-        self._auth_ttl: float = 25 * 60  # refresh SID after 25 minutes
-
-    async def _ensure_auth(self) -> None:
-        now = time.monotonic()
-        if self._sid and (now - self._auth_time) < self._auth_ttl:
-            return
+        # SID cookie: one login at a time, refreshed ahead of the 25-minute mark;
+        # qBittorrent answers 403 to an expired SID, which re-logs in once and retries
+        self._tokens = TokenManager("qbittorrent", self._login)
+        self._auth = TokenAuth(self._tokens, apply=_sid_cookie, unauthorized=(403,))
 
+    async def _login(self) -> tuple[str, float]:
         async with httpx.AsyncClient(verify=False) as client:
             resp = await client.post(
                 f"{self.url}/api/v2/auth/login",
@@ -30,11 +34,7 @@ class QBittorrentClient:
             sid = resp.cookies.get("SID") or client.cookies.get("SID")
             if not sid:
                 raise RuntimeError("qBittorrent login succeeded but no SID cookie returned")
-            self._sid = sid
-        self._auth_time = now
-
-    def _auth_cookies(self) -> dict:
-        return {"SID": self._sid}
+        return sid, AUTH_TTL
 
     async def add_torrent_from_url(
         self, torrent_url: str, save_path: str, category: str, tags: str = ""
@@ -45,8 +45,6 @@ class QBittorrentClient:
             torrent_resp.raise_for_status()
             torrent_bytes = torrent_resp.content
 
-        await self._ensure_auth()
-
         post_data: dict = {"savepath": save_path, "category": category}
         if tags:
             post_data["tags"] = tags
@@ -54,22 +52,10 @@ class QBittorrentClient:
         async with httpx.AsyncClient(verify=False) as client:
             resp = await client.post(
                 f"{self.url}/api/v2/torrents/add",
-                cookies=self._auth_cookies(),
+                auth=self._auth,
                 files={"torrents": ("download.torrent", torrent_bytes, "application/x-bittorrent")},
                 data=post_data,
             )
-
-            if resp.status_code == 403:
-                # SID expired — re-auth once and retry
-                self._sid = None
-                await self._ensure_auth()
-                resp = await client.post(
-                    f"{self.url}/api/v2/torrents/add",
-                    cookies=self._auth_cookies(),
-                    files={"torrents": ("download.torrent", torrent_bytes, "application/x-bittorrent")},
-                    data=post_data,
-                )
-
             resp.raise_for_status()
             if resp.text.strip().lower() == "fails.":
                 raise RuntimeError(
@@ -83,12 +69,11 @@ class QBittorrentClient:
         Tags are stored as "Movie Title|Year" (e.g. "RoboCop 2|1990").
         Returns (title, year) — year is None if not stored.
         """
-        await self._ensure_auth()
         async with httpx.AsyncClient(verify=False) as client:
             resp = await client.get(
                 f"{self.url}/api/v2/torrents/info",
                 params={"hashes": info_hash.lower()},
-                cookies=self._auth_cookies(),
+                auth=self._auth,
             )
             resp.raise_for_status()
             torrents = resp.json()
@@ -109,24 +94,12 @@ class QBittorrentClient:
         return title, year
 
     async def get_active_downloads(self) -> list[dict]:
-        await self._ensure_auth()
-
         async with httpx.AsyncClient(verify=False) as client:
             resp = await client.get(
                 f"{self.url}/api/v2/torrents/info",
                 params={"filter": "active"},
-                cookies=self._auth_cookies(),
+                auth=self._auth,
             )
-
-            if resp.status_code == 403:
-                self._sid = None
-                await self._ensure_auth()
-                resp = await client.get(
-                    f"{self.url}/api/v2/torrents/info",
-                    params={"filter": "active"},
-                    cookies=self._auth_cookies(),
-                )
-
             resp.raise_for_status()
 
         torrents = resp.json()
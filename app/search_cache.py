@@ -0,0 +1,108 @@
+"""
+Persistent per-source search cache (SQLite) for the librarian.
+
+Each ebook source's results are stored under (source, normalized query), so
+"The  Count of Monte-Cristo" and "the count of monte cristo" share an entry.
+An entry fetched with limit=N can answer any request with limit <= N, or any
+limit at all if the source returned fewer than N results (nothing more to get).
+
+Entries past their TTL are still returned, flagged stale, so a caller can
+serve them when the live source misses its deadline. Empty results expire
+sooner: sources swallow their own errors, so an empty list may be an outage.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Optional
+
+EMPTY_RESULT_TTL_SECS = 15 * 60
+PRUNE_AFTER_SECS = 30 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_results (
+    source          TEXT NOT NULL,
+    query_key       TEXT NOT NULL,
+    fetch_limit     INTEGER NOT NULL,
+    result_count    INTEGER NOT NULL,
+    results_json    TEXT NOT NULL,
+    fetched_at      REAL NOT NULL,
+    PRIMARY KEY (source, query_key)
+);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", query or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r"[^\w]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class SearchCache:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM source_results WHERE fetched_at < ?", (time.time() - PRUNE_AFTER_SECS,)
+            )
+
+    def get(self, source: str, query: str, limit: int, ttl_secs: float) -> Optional[tuple[Any, bool]]:
+        """
+        Return (results, fresh) for a cached entry that can satisfy limit, else None.
+        List results are trimmed to limit.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM source_results WHERE source = ? AND query_key = ?",
+                (source, normalize_query(query)),
+            ).fetchone()
+        if row is None:
+            return None
+        if row["fetch_limit"] < limit and row["result_count"] >= row["fetch_limit"]:
+            return None
+        if row["result_count"] == 0:
+            ttl_secs = min(ttl_secs, EMPTY_RESULT_TTL_SECS)
+        fresh = (time.time() - row["fetched_at"]) < ttl_secs
+        results = json.loads(row["results_json"])
+        if isinstance(results, list):
+            results = results[:limit]
+        return results, fresh
+
+    def put(self, source: str, query: str, limit: int, results: Any) -> None:
+        count = len(results) if isinstance(results, list) else 1
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO source_results (source, query_key, fetch_limit, result_count, results_json, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(source, query_key) DO UPDATE SET
+                    fetch_limit = excluded.fetch_limit,
+                    result_count = excluded.result_count,
+                    results_json = excluded.results_json,
+                    fetched_at = excluded.fetched_at
+                """,
+                (source, normalize_query(query), limit, count, json.dumps(results), time.time()),
+            )
+
+    def invalidate(self, source: str, query: Optional[str] = None) -> None:
+        """Drop every entry for a source, or just one query."""
+        with self._lock, self._conn:
+            if query is None:
+                self._conn.execute("DELETE FROM source_results WHERE source = ?", (source,))
+            else:
+                self._conn.execute(
+                    "DELETE FROM source_results WHERE source = ? AND query_key = ?",
+                    (source, normalize_query(query)),
+                )
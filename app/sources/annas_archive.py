@@ -7,6 +7,11 @@ SEARCH: Works fully -- returns results with source="AnnasArchive" and
 RESOLVER: Two-step resolution via Libgen (primary) or Anna's slow_download (fallback).
           Libgen path: GET libgen.li/ads.php?md5={md5} -> parse [GET] link -> return URL.
           slow_download path: only attempted if ANNA_ARCHIVE_COOKIE is set in .env.
+          Results (and definite failures) are cached per md5 for the URL's
+          validity window; a URL whose download fails is forgotten
+          (forget_annas_download). Top search hits are prefetched in the
+          background (ANNA_ARCHIVE_PREFETCH_TOP) — via Libgen only unless
+          ANNA_ARCHIVE_PREFETCH_SLOW_DOWNLOAD is set.
 
 HTML structure confirmed via live VPS testing (2026-03-03):
   - Search result blocks: div.flex.pt-3.pb-3.border-b
@@ -15,13 +20,19 @@ HTML structure confirmed via live VPS testing (2026-03-03):
   - Metadata (format, size, lang): div.text-gray-800.font-semibold.text-sm
   - Download links on detail page: a.js-download-link with href=/slow_download/... or /fast_download/...
 """
+import asyncio
+import functools
 import logging
 import re
-from typing import Optional
+from typing import Iterable, Optional
 
 import httpx
 from bs4 import BeautifulSoup
 
+from app.mirror_health import MirrorBlocked, MirrorPool
+from app.ttl_cache import TTLCache
+from app.sources.annas_extract import parse_search_results
+
 logger = logging.getLogger("uvicorn.error")
 
 MIRRORS = [
@@ -40,8 +51,8 @@ _HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-# Module-level cache: remember the last mirror that worked
-_active_mirror: Optional[str] = None
+# Rolling latency/success per mirror; DDoS-Guard answers put a mirror on cooldown
+mirror_pool = MirrorPool(MIRRORS, name="Anna's Archive mirror")
 
 
 def _is_valid_search_html(html: str) -> bool:
@@ -56,143 +67,24 @@ def _is_ddos_guard(html: str) -> bool:
 
 async def _find_working_mirror(query: str) -> tuple[Optional[str], Optional[str]]:
     """
-    Try each mirror in order. Return (mirror_url, search_html) for the first
-    mirror that returns a valid search results page.
+    Race the search across mirrors (hedged, healthiest first — see MirrorPool).
+    Return (mirror_url, search_html) for the first mirror that returns a valid
+    search results page, or (None, None) if every mirror failed.
     """
-    global _active_mirror
-    mirrors_to_try = [_active_mirror] + [m for m in MIRRORS if m != _active_mirror]
-    mirrors_to_try = [m for m in mirrors_to_try if m]  # remove None
-
     async with httpx.AsyncClient(timeout=20, headers=_HEADERS, follow_redirects=True) as client:
-        for mirror in mirrors_to_try:
-            try:
-                resp = await client.get(
-                    f"{mirror}/search",
-                    params={"q": query, "ext": "epub"},
-                )
-                if resp.status_code == 200:
-                    html = resp.text
-                    if _is_valid_search_html(html):
-                        _active_mirror = mirror
-                        return mirror, html
-            except Exception as exc:
-                logger.debug("AA mirror %s failed: %s", mirror, exc)
-
-    return None, None
-
-
-def _parse_metadata_block(text: str) -> dict:
-    """
-    Parse the metadata string like:
-      "English [en] · EPUB · 1.4MB · 2019 · Book (non-fiction) · ..."
-    Returns dict with format, size_mb, year keys.
-    """
-    parts = [p.strip() for p in text.split("\u00b7")]
-    fmt = None
-    size_mb = None
-    year = None
-
-    for part in parts:
-        part_clean = part.strip()
-        # Format: "EPUB", "PDF", "MOBI", "AZW3", "CBZ", etc.
-        if re.match(r'^(epub|pdf|mobi|azw3|cbz|cbr|fb2|djvu)$', part_clean, re.IGNORECASE):
-            fmt = part_clean.lower()
-        # Size: "1.4MB", "850KB", "1.1 MB"
-        elif re.match(r'^[\d.]+\s*(MB|KB|GB)$', part_clean, re.IGNORECASE):
-            m = re.match(r'^([\d.]+)\s*(MB|KB|GB)$', part_clean, re.IGNORECASE)
-            if m:
-                num, unit = float(m.group(1)), m.group(2).upper()
-                if unit == "KB":
-                    size_mb = round(num / 1024, 3)
-                elif unit == "GB":
-                    size_mb = round(num * 1024, 1)
-                else:
-                    size_mb = round(num, 2)
-        # Year: 4-digit number between 1000-2099
-        elif re.match(r'^(1[0-9]{3}|20[0-9]{2})$', part_clean):
-            year = int(part_clean)
-
-    return {"format": fmt, "size_mb": size_mb, "year": year}
-
-
-def _parse_search_results(html: str, limit: int, mirror: str) -> list[dict]:
-    """
-    Parse Anna's Archive search results HTML into a list of normalised result dicts.
-    Deduplicates by title, preferring EPUB over PDF within AA results.
-    """
-    soup = BeautifulSoup(html, "html.parser")
-    results: list[dict] = []
-    seen_titles: set[str] = set()
-
-    # Find all result blocks: div elements with classes "flex pt-3 pb-3 border-b"
-    blocks = soup.find_all("div", class_=lambda c: c and "flex" in c and "pt-3" in c and "pb-3" in c and "border-b" in c)
-
-    for block in blocks:
-        if len(results) >= limit:
-            break
-
-        # Extract MD5 path from cover <a>
-        cover_a = block.find("a", href=lambda h: h and h.startswith("/md5/"))
-        if not cover_a:
-            continue
-        source_id = cover_a["href"]  # e.g. "/md5/890a91b4f0cf047b5276c9f7d522adc6"
-
-        # Extract title and author from data-content attributes (most reliable)
-        title = None
-        author = None
-        fallback_divs = block.find_all("div", attrs={"data-content": True})
-        for div in fallback_divs:
-            cls = " ".join(div.get("class", []))
-            if "violet" in cls and not title:
-                title = div.get("data-content", "").strip()
-            elif "amber" in cls and not author:
-                author = div.get("data-content", "").strip()
-
-        # Fallback: extract title from the bold anchor link text
-        if not title:
-            title_a = block.find("a", href=lambda h: h and h.startswith("/md5/"),
-                                  class_=lambda c: c and "font-semibold" in c)
-            if title_a:
-                title = title_a.get_text(strip=True)
-
-        if not title:
-            continue
 
-        # Normalise: strip trailing commas, clean author list separators
-        title = title.strip().rstrip(",")
-        if author:
-            # Anna's Archive may list "Author1; Author2" or "Author1, Author2"
-            author = re.split(r'[;,]', author)[0].strip()
-
-        # Extract format/size/year from the metadata block
-        meta_div = block.find("div", class_=lambda c: c and "text-gray-800" in c and "font-semibold" in c)
-        meta = {}
-        if meta_div:
-            meta = _parse_metadata_block(meta_div.get_text())
-
-        fmt = meta.get("format")
-        if not fmt:
-            continue  # skip results with no recognisable format
-
-        # Deduplicate: skip if we already have a result with this title
-        title_key = title.lower().strip()
-        if title_key in seen_titles:
-            continue
-        seen_titles.add(title_key)
-
-        results.append({
-            "title": title,
-            "author": author or "Unknown",
-            "year": meta.get("year"),
-            "format": fmt,
-            "download_url": f"{mirror}{source_id}",  # Clickable detail page for manual-mode downloads
-            "source_id": source_id,     # "/md5/{hash}"
-            "cover_url": None,
-            "source": "AnnasArchive",
-            "size_mb": meta.get("size_mb"),
-        })
+        async def fetch(mirror: str) -> str:
+            resp = await client.get(f"{mirror}/search", params={"q": query, "ext": "epub"})
+            html = resp.text
+            if _is_ddos_guard(html):
+                raise MirrorBlocked("DDoS-Guard challenge")
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}")
+            if not _is_valid_search_html(html):
+                raise RuntimeError("not a search results page")
+            return html
 
-    return results
+        return await mirror_pool.race(fetch)
 
 
 async def search_annas_archive(query: str, limit: int = 5) -> list[dict]:
@@ -208,17 +100,54 @@ async def search_annas_archive(query: str, limit: int = 5) -> list[dict]:
         if not mirror or not html:
             logger.warning("Anna's Archive: no working mirror found for query %r", query)
             return []
-        return _parse_search_results(html, limit, mirror)
+        return parse_search_results(html, limit, mirror)
     except Exception as exc:
         logger.warning("Anna's Archive search failed: %s", exc)
         return []
 
 
-async def _resolve_via_libgen(md5: str) -> Optional[str]:
+# ---------------------------------------------------------------------------
+# Resolved-URL cache (md5 -> direct URL, or known-unresolvable)
+# ---------------------------------------------------------------------------
+# Libgen get.php links carry a time-based key; treat them as good for an hour.
+LIBGEN_URL_TTL_SECS = 60 * 60
+# slow_download redirects land on short-lived signed partner URLs.
+SLOW_DOWNLOAD_URL_TTL_SECS = 10 * 60
+# Libgen answered but had no file and slow_download refused too.
+UNRESOLVABLE_TTL_SECS = 30 * 60
+PREFETCH_CONCURRENCY = 2
+
+# md5 -> (url, error); exactly one of url/error is set. TTL is per entry (see above).
+_resolved = TTLCache("annas_resolved", max_entries=512)
+# md5 -> resolution in progress, shared by downloads and prefetches
+_inflight: dict[str, asyncio.Task] = {}
+_prefetch_sem = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _md5_of(source_id: str) -> str:
+    # Safely extract just the hex md5 hash from "/md5/{hash}" or "md5/{hash}"
+    return re.sub(r"^/?md5/", "", source_id).strip("/").lower()
+
+
+def _remember(md5: str, url: Optional[str], error: Optional[str], ttl_secs: float) -> None:
+    _resolved.set(md5, (url, error), ttl_secs)
+
+
+def _cached_resolution(md5: str) -> Optional[tuple[Optional[str], Optional[str]]]:
+    return _resolved.get(md5)
+
+
+def forget_annas_download(source_id: str) -> None:
+    """Drop the cached resolution for source_id — e.g. its URL stopped working."""
+    _resolved.pop(_md5_of(source_id))
+
+
+async def _resolve_via_libgen(md5: str) -> tuple[Optional[str], bool]:
     """
     Try to resolve a direct download URL via the libgen.li ads page.
-    Returns the get.php URL if found, None if libgen.li is unreachable or
-    doesn't have the file.
+    Returns (get.php URL or None, answered) — answered is False when libgen.li
+    was unreachable or errored, True when it replied (with or without the file).
 
     Flow: GET ads.php?md5={md5} -> parse [GET] link -> return full get.php URL.
     The returned URL is valid across different httpx client sessions (key is
@@ -229,19 +158,19 @@ async def _resolve_via_libgen(md5: str) -> Optional[str]:
             resp = await client.get(f"https://libgen.li/ads.php?md5={md5}")
         if resp.status_code != 200:
             logger.debug("Libgen ads.php returned HTTP %s for md5 %s", resp.status_code, md5)
-            return None
+            return None, resp.status_code == 404
         soup = BeautifulSoup(resp.text, "html.parser")
         get_link = soup.find("a", href=re.compile(r"get\.php\?md5="))
         if not get_link:
             logger.debug("Libgen ads.php: no get.php link found for md5 %s", md5)
-            return None
+            return None, True
         href = get_link["href"]
         if isinstance(href, str) and href.startswith("http"):
-            return href
-        return f"https://libgen.li/{href.lstrip('/')}"
+            return href, True
+        return f"https://libgen.li/{href.lstrip('/')}", True
     except Exception as exc:
         logger.debug("Libgen resolution failed for md5 %s: %s", md5, exc)
-        return None
+        return None, False
 
 
 async def resolve_annas_download(source_id: str, cookie: Optional[str] = None) -> str:
@@ -249,22 +178,49 @@ async def resolve_annas_download(source_id: str, cookie: Optional[str] = None) -
     Resolve an Anna's Archive source_id ("/md5/{hash}") to a direct download URL.
 
     Resolution order:
+      0. Resolved-URL cache (filled by earlier downloads and search prefetches);
+         known-unresolvable md5s fail fast from the cache too
       1. Libgen (libgen.li ads.php -> get.php) -- works without any auth from VPS
       2. Anna's slow_download -- only attempted if ANNA_ARCHIVE_COOKIE is set in .env;
          DDoS-Guard protected, requires a valid browser session cookie to bypass
       3. RuntimeError -> 503 with manual download URL
 
+    Concurrent calls for the same md5 share one resolution.
+
     Raises:
         RuntimeError: if all resolution paths fail.
     """
-    mirror = _active_mirror or MIRRORS[0]
-    # Safely extract just the hex md5 hash from "/md5/{hash}" or "md5/{hash}"
-    md5 = re.sub(r"^/?md5/", "", source_id).strip("/")
+    md5 = _md5_of(source_id)
+    cached = _cached_resolution(md5)
+    if cached is not None:
+        url, error = cached
+        if url:
+            return url
+        raise RuntimeError(error)
+
+    task = _inflight.get(md5)
+    if task is None:
+        task = asyncio.create_task(_resolve_uncached(md5, cookie))
+        _inflight[md5] = task
+        task.add_done_callback(functools.partial(_resolution_done, md5))
+    # Shielded: a cancelled request must not abort a resolution others are awaiting.
+    return await asyncio.shield(task)
+
+
+def _resolution_done(md5: str, task: asyncio.Task) -> None:
+    _inflight.pop(md5, None)
+    if not task.cancelled():
+        task.exception()  # mark retrieved; callers that are still waiting get it re-raised
+
+
+async def _resolve_uncached(md5: str, cookie: Optional[str]) -> str:
+    mirror = mirror_pool.best()
 
     # --- Primary path: Libgen ---
-    libgen_url = await _resolve_via_libgen(md5)
+    libgen_url, libgen_answered = await _resolve_via_libgen(md5)
     if libgen_url:
         logger.info("Anna's Archive resolved via Libgen for md5 %s", md5)
+        _remember(md5, libgen_url, None, LIBGEN_URL_TTL_SECS)
         return libgen_url
 
     # --- Fallback path: Anna's slow_download with cookie ---
@@ -273,27 +229,48 @@ async def resolve_annas_download(source_id: str, cookie: Optional[str] = None) -
     if cookie:
         headers["Cookie"] = cookie
 
+    def unresolvable(message: str, definitive: bool = True) -> RuntimeError:
+        # Only a definitive answer from both paths is worth remembering —
+        # never a transient one (5xx, 429, ...) from Anna's.
+        if libgen_answered and definitive:
+            _remember(md5, None, message, UNRESOLVABLE_TTL_SECS)
+        return RuntimeError(message)
+
     try:
         async with httpx.AsyncClient(timeout=60, headers=headers, follow_redirects=True) as client:
-            resp = await client.get(download_url)
-
-        if _is_ddos_guard(resp.text):
-            raise RuntimeError(
+            # Stream so only headers (and an HTML body, if any) are read — never the file.
+            async with client.stream("GET", download_url) as resp:
+                ct = resp.headers.get("content-type", "")
+                if resp.status_code == 200 and any(
+                    t in ct for t in ("epub", "pdf", "octet-stream", "application/")
+                ):
+                    final_url = str(resp.url)
+                    _remember(md5, final_url, None, SLOW_DOWNLOAD_URL_TTL_SECS)
+                    return final_url
+                body = (await resp.aread()).decode(errors="replace")
+
+        if _is_ddos_guard(body):
+            # A challenge page says nothing about the file — cool the mirror
+            # down so the next attempt goes elsewhere, and don't cache it.
+            blocked = MirrorBlocked("DDoS-Guard challenge on slow_download")
+            mirror_pool.record_failure(mirror, str(blocked), blocked=True)
+            raise unresolvable(
                 "Anna's Archive slow_download is protected by DDoS-Guard and Libgen "
                 "could not resolve the file. "
                 "A browser session cookie (ANNA_ARCHIVE_COOKIE in .env) may help bypass "
                 "the DDoS-Guard check. Download manually from: "
-                f"{mirror}/md5/{md5}"
+                f"{mirror}/md5/{md5}",
+                definitive=False,
             )
 
-        ct = resp.headers.get("content-type", "")
-        if resp.status_code == 200 and any(t in ct for t in ("epub", "pdf", "octet-stream", "application/")):
-            return str(resp.url)
-
-        raise RuntimeError(
+        not_found = resp.status_code == 404 or (
+            resp.status_code == 200 and "text/html" in ct and "not found" in body.lower()
+        )
+        raise unresolvable(
             f"Anna's Archive returned unexpected response (HTTP {resp.status_code}, "
             f"Content-Type: {ct}). "
-            f"Download manually from: {mirror}/md5/{md5}"
+            f"Download manually from: {mirror}/md5/{md5}",
+            definitive=not_found,
         )
 
     except RuntimeError:
@@ -303,3 +280,46 @@ async def resolve_annas_download(source_id: str, cookie: Optional[str] = None) -
             f"Anna's Archive download request failed: [{type(exc).__name__}] {exc}. "
             f"Download manually from: {mirror}/md5/{md5}"
         ) from exc
+
+
+def prefetch_annas_downloads(
+    source_ids: Iterable[str],
+    cookie: Optional[str] = None,
+    libgen_only: bool = True,
+) -> int:
+    """
+    Resolve download URLs for search hits in the background so that picking
+    one downloads immediately. Skips md5s already cached or being resolved.
+    With libgen_only (the default) only Libgen is asked, so prefetching never
+    spends slow_download quota. Returns how many resolutions were started.
+    """
+    started = 0
+    seen: set[str] = set()
+    for source_id in source_ids:
+        md5 = _md5_of(source_id)
+        if md5 in seen or md5 in _inflight or _cached_resolution(md5) is not None:
+            continue
+        seen.add(md5)
+        task = asyncio.create_task(_prefetch_libgen(md5) if libgen_only else _prefetch(md5, cookie))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        started += 1
+    return started
+
+
+async def _prefetch(md5: str, cookie: Optional[str]) -> None:
+    async with _prefetch_sem:
+        try:
+            await resolve_annas_download(f"/md5/{md5}", cookie=cookie)
+        except RuntimeError as exc:
+            logger.debug("Anna's Archive prefetch failed for md5 %s: %s", md5, exc)
+
+
+async def _prefetch_libgen(md5: str) -> None:
+    # Not registered in _inflight: a download joining it would never reach slow_download.
+    async with _prefetch_sem:
+        if _cached_resolution(md5) is not None:
+            return
+        url, _answered = await _resolve_via_libgen(md5)
+        if url:
+            _remember(md5, url, None, LIBGEN_URL_TTL_SECS)
@@ -0,0 +1,241 @@
+"""
+Anna's Archive search-page extractor.
+
+Search pages are several hundred KB. The primary extractor feeds the HTML to
+lxml's incremental HTMLPullParser in chunks, handles each result block as soon
+as its closing tag is seen (precompiled XPath, then the block is freed), and
+stops feeding once `limit` results are collected — the rest of the page is
+never parsed. If lxml is not installed, the original BeautifulSoup/html.parser
+walk is used. Both produce identical results (scripts/bench_annas_parse.py
+checks this and compares speed and memory).
+
+Block structure (see annas_archive module docstring):
+  - result block: div with classes "flex pt-3 pb-3 border-b"
+  - MD5 path: first <a href="/md5/{hash}">
+  - title/author: data-content attrs on divs with violet/amber classes,
+    title falling back to the font-semibold /md5/ link text
+  - metadata: div.text-gray-800.font-semibold ("English [en] · EPUB · 1.4MB · 2019 · …")
+"""
+import re
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree as _etree
+except ImportError:  # pragma: no cover - lxml is in requirements.txt
+    _etree = None
+
+HAVE_LXML = _etree is not None
+
+_FEED_CHUNK = 32 * 1024
+_BLOCK_CLASSES = ("flex", "pt-3", "pb-3", "border-b")
+
+
+def _parse_metadata_block(text: str) -> dict:
+    """
+    Parse the metadata string like:
+      "English [en] · EPUB · 1.4MB · 2019 · Book (non-fiction) · ..."
+    Returns dict with format, size_mb, year keys.
+    """
+    parts = [p.strip() for p in text.split("\u00b7")]
+    fmt = None
+    size_mb = None
+    year = None
+
+    for part in parts:
+        part_clean = part.strip()
+        # Format: "EPUB", "PDF", "MOBI", "AZW3", "CBZ", etc.
+        if re.match(r'^(epub|pdf|mobi|azw3|cbz|cbr|fb2|djvu)$', part_clean, re.IGNORECASE):
+            fmt = part_clean.lower()
+        # Size: "1.4MB", "850KB", "1.1 MB"
+        elif re.match(r'^[\d.]+\s*(MB|KB|GB)$', part_clean, re.IGNORECASE):
+            m = re.match(r'^([\d.]+)\s*(MB|KB|GB)$', part_clean, re.IGNORECASE)
+            if m:
+                num, unit = float(m.group(1)), m.group(2).upper()
+                if unit == "KB":
+                    size_mb = round(num / 1024, 3)
+                elif unit == "GB":
+                    size_mb = round(num * 1024, 1)
+                else:
+                    size_mb = round(num, 2)
+        # Year: 4-digit number between 1000-2099
+        elif re.match(r'^(1[0-9]{3}|20[0-9]{2})$', part_clean):
+            year = int(part_clean)
+
+    return {"format": fmt, "size_mb": size_mb, "year": year}
+
+
+class _ResultCollector:
+    """Normalisation, format filter and per-title dedup shared by both extractors."""
+
+    def __init__(self, limit: int, mirror: str):
+        self.limit = limit
+        self.mirror = mirror
+        self.results: list[dict] = []
+        self._seen_titles: set[str] = set()
+
+    @property
+    def full(self) -> bool:
+        return len(self.results) >= self.limit
+
+    def add(self, source_id: str, title: Optional[str], author: Optional[str], meta_text: Optional[str]) -> None:
+        if not title:
+            return
+
+        # Normalise: strip trailing commas, clean author list separators
+        title = title.strip().rstrip(",")
+        if author:
+            # Anna's Archive may list "Author1; Author2" or "Author1, Author2"
+            author = re.split(r'[;,]', author)[0].strip()
+
+        meta = _parse_metadata_block(meta_text) if meta_text is not None else {}
+        fmt = meta.get("format")
+        if not fmt:
+            return  # skip results with no recognisable format
+
+        # Deduplicate: skip if we already have a result with this title
+        title_key = title.lower().strip()
+        if title_key in self._seen_titles:
+            return
+        self._seen_titles.add(title_key)
+
+        self.results.append({
+            "title": title,
+            "author": author or "Unknown",
+            "year": meta.get("year"),
+            "format": fmt,
+            "download_url": f"{self.mirror}{source_id}",  # Clickable detail page for manual-mode downloads
+            "source_id": source_id,     # "/md5/{hash}"
+            "cover_url": None,
+            "source": "AnnasArchive",
+            "size_mb": meta.get("size_mb"),
+        })
+
+
+# ---------------------------------------------------------------------------
+# lxml: incremental parse with precompiled XPath, early stop
+# ---------------------------------------------------------------------------
+
+if HAVE_LXML:
+    _X_COVER_HREF = _etree.XPath(
+        'string(.//a[starts-with(@href, "/md5/")][1]/@href)', smart_strings=False
+    )
+    _X_DATA_CONTENT = _etree.XPath(".//div[@data-content]")
+    _X_TITLE_LINK = _etree.XPath(
+        './/a[starts-with(@href, "/md5/") and contains(@class, "font-semibold")][1]'
+    )
+    _X_META = _etree.XPath(
+        './/div[contains(@class, "text-gray-800") and contains(@class, "font-semibold")][1]'
+    )
+    _X_TEXT = _etree.XPath("string(.)", smart_strings=False)
+
+
+def _is_result_block(cls: str) -> bool:
+    return all(token in cls for token in _BLOCK_CLASSES)
+
+
+def _extract_block_lxml(block, collector: _ResultCollector) -> None:
+    source_id = _X_COVER_HREF(block)
+    if not source_id:
+        return
+
+    title = None
+    author = None
+    for div in _X_DATA_CONTENT(block):
+        cls = " ".join((div.get("class") or "").split())
+        if "violet" in cls and not title:
+            title = div.get("data-content", "").strip()
+        elif "amber" in cls and not author:
+            author = div.get("data-content", "").strip()
+
+    if not title:
+        links = _X_TITLE_LINK(block)
+        if links:
+            title = "".join(s.strip() for s in links[0].xpath(".//text()", smart_strings=False))
+
+    meta = _X_META(block)
+    collector.add(source_id, title, author, _X_TEXT(meta[0]) if meta else None)
+
+
+def parse_search_results_lxml(html: str, limit: int, mirror: str) -> list[dict]:
+    collector = _ResultCollector(limit, mirror)
+    if limit <= 0:
+        return collector.results
+    parser = _etree.HTMLPullParser(events=("end",), tag="div")
+    for offset in range(0, len(html), _FEED_CHUNK):
+        parser.feed(html[offset:offset + _FEED_CHUNK])
+        for _event, elem in parser.read_events():
+            cls = elem.get("class")
+            if not cls or not _is_result_block(cls):
+                continue
+            _extract_block_lxml(elem, collector)
+            # Free the finished block (and anything before it) as we go.
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+            if collector.full:
+                return collector.results
+    try:
+        parser.close()
+    except _etree.XMLSyntaxError:
+        pass  # empty or truncated page — whatever was parsed is kept
+    return collector.results
+
+
+# ---------------------------------------------------------------------------
+# BeautifulSoup fallback (original implementation)
+# ---------------------------------------------------------------------------
+
+def parse_search_results_bs4(html: str, limit: int, mirror: str) -> list[dict]:
+    soup = BeautifulSoup(html, "html.parser")
+    collector = _ResultCollector(limit, mirror)
+
+    # Find all result blocks: div elements with classes "flex pt-3 pb-3 border-b"
+    blocks = soup.find_all("div", class_=lambda c: c and "flex" in c and "pt-3" in c and "pb-3" in c and "border-b" in c)
+
+    for block in blocks:
+        if collector.full:
+            break
+
+        # Extract MD5 path from cover <a>
+        cover_a = block.find("a", href=lambda h: h and h.startswith("/md5/"))
+        if not cover_a:
+            continue
+        source_id = cover_a["href"]  # e.g. "/md5/890a91b4f0cf047b5276c9f7d522adc6"
+
+        # Extract title and author from data-content attributes (most reliable)
+        title = None
+        author = None
+        fallback_divs = block.find_all("div", attrs={"data-content": True})
+        for div in fallback_divs:
+            cls = " ".join(div.get("class", []))
+            if "violet" in cls and not title:
+                title = div.get("data-content", "").strip()
+            elif "amber" in cls and not author:
+                author = div.get("data-content", "").strip()
+
+        # Fallback: extract title from the bold anchor link text
+        if not title:
+            title_a = block.find("a", href=lambda h: h and h.startswith("/md5/"),
+                                  class_=lambda c: c and "font-semibold" in c)
+            if title_a:
+                title = title_a.get_text(strip=True)
+
+        # Extract format/size/year from the metadata block
+        meta_div = block.find("div", class_=lambda c: c and "text-gray-800" in c and "font-semibold" in c)
+        collector.add(source_id, title, author, meta_div.get_text() if meta_div else None)
+
+    return collector.results
+
+
+def parse_search_results(html: str, limit: int, mirror: str) -> list[dict]:
+    """
+    Parse Anna's Archive search results HTML into a list of normalised result dicts.
+    Deduplicates by title, preferring EPUB over PDF within AA results.
+    """
+    if HAVE_LXML:
+        return parse_search_results_lxml(html, limit, mirror)
+    return parse_search_results_bs4(html, limit, mirror)
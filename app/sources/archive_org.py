@@ -1,15 +1,45 @@
 """
 Archive.org search client — searches Internet Archive for ebooks.
 Largest collection, good for obscure titles. No API key needed.
+
+Candidates come from the scrape API (cursor-paged, up to 10k rows per page),
+then each one's /metadata/{id} file manifest is fetched concurrently (bounded,
+cached) so results carry the real file name, URL and size instead of a guessed
+/download/{id}/{id}.{ext} that often 404s. Items with no downloadable ebook
+file (lending-library/restricted, dark, or no matching format) are dropped.
 """
+import asyncio
+import logging
 import re
 from typing import Optional
+from urllib.parse import quote
 
 import httpx
 
-ARCHIVE_SEARCH_URL = "https://archive.org/advancedsearch.php"
+from app.ttl_cache import TTLCache
+
+logger = logging.getLogger("uvicorn.error")
+
+ARCHIVE_SCRAPE_URL = "https://archive.org/services/search/v1/scrape"
+ARCHIVE_METADATA_URL = "https://archive.org/metadata"
 ARCHIVE_DOWNLOAD_URL = "https://archive.org/download"
 
+# The scrape API's minimum page size; more than enough candidates for one search.
+SCRAPE_PAGE_SIZE = 100
+SCRAPE_MAX_PAGES = 3
+METADATA_CONCURRENCY = 6
+METADATA_TIMEOUT_SECS = 10
+# Item manifests rarely change; "no usable file" answers are cached too.
+MANIFEST_TTL_SECS = 24 * 3600
+
+_EXT_PREFERENCE = ("epub", "pdf", "cbz", "cbr")
+# DRM'd lending copies sit next to the real files with these suffixes.
+_PROTECTED_SUFFIX_RE = re.compile(r"_(encrypted|lcp)\.\w+$", re.IGNORECASE)
+
+# identifier -> picked file, or None for items with nothing downloadable
+_manifests = TTLCache("archive_org_manifests", max_entries=2048, ttl_secs=MANIFEST_TTL_SECS)
+_NOT_CACHED = object()
+
 
 async def search_archive_org(query: str, limit: int = 5) -> list[dict]:
     """
@@ -18,45 +48,24 @@ async def search_archive_org(query: str, limit: int = 5) -> list[dict]:
     """
     try:
         async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(
-                ARCHIVE_SEARCH_URL,
-                params={
-                    "q": f"{query} AND mediatype:texts",
-                    "fl[]": "identifier,title,creator,date,format",
-                    "sort[]": "downloads desc",
-                    "rows": limit * 3,  # over-fetch to filter for epub/pdf
-                    "page": 1,
-                    "output": "json",
-                },
+            docs = await _scrape_candidates(client, query, want=limit * 3)
+            sem = asyncio.Semaphore(METADATA_CONCURRENCY)
+            # Over-fetch manifests: some candidates turn out to be lending-only
+            picked = await asyncio.gather(
+                *(_item_file(client, doc["identifier"], sem) for doc in docs[: limit * 2])
             )
-            resp.raise_for_status()
-            data = resp.json()
-    except Exception:
+    except Exception as exc:
+        logger.warning("Archive.org search failed: %s", exc)
         return []
 
-    docs = data.get("response", {}).get("docs", [])
     results = []
-
-    for doc in docs:
+    for doc, file in zip(docs, picked):
         if len(results) >= limit:
             break
-
-        identifier = doc.get("identifier", "")
-        if not identifier:
+        if file is None:
             continue
 
-        doc_formats = doc.get("format", [])
-        if isinstance(doc_formats, str):
-            doc_formats = [doc_formats]
-
-        # Determine best available format
-        fmt, file_ext = _pick_format(doc_formats)
-        if not fmt:
-            continue
-
-        # Build download URL — Archive.org serves files at /download/{id}/{id}.{ext}
-        download_url = f"{ARCHIVE_DOWNLOAD_URL}/{identifier}/{identifier}.{file_ext}"
-
+        identifier = doc["identifier"]
         # Clean author name (Archive.org often gives "Last, First, YYYY-YYYY")
         raw_author = doc.get("creator", "Unknown")
         if isinstance(raw_author, list):
@@ -70,27 +79,114 @@ async def search_archive_org(query: str, limit: int = 5) -> list[dict]:
             "title": doc.get("title", "Unknown"),
             "author": author,
             "year": year,
-            "format": fmt,
-            "download_url": download_url,
+            "format": file["format"],
+            "download_url": f"{ARCHIVE_DOWNLOAD_URL}/{identifier}/{quote(file['name'])}",
             "cover_url": f"https://archive.org/services/img/{identifier}",
             "source": "Archive.org",
             "source_id": identifier,
-            "size_mb": None,
+            "size_mb": file["size_mb"],
+            "filename": file["name"].rsplit("/", 1)[-1],
         })
 
     return results
 
 
+async def _scrape_candidates(client: httpx.AsyncClient, query: str, want: int) -> list[dict]:
+    """Most-downloaded text items whose indexed formats include an ebook, following the cursor."""
+    docs: list[dict] = []
+    cursor = None
+    for _ in range(SCRAPE_MAX_PAGES):
+        params = {
+            "q": f"({query}) AND mediatype:texts",
+            "fields": "identifier,title,creator,date,format",
+            "sorts": "downloads desc",
+            "count": SCRAPE_PAGE_SIZE,
+        }
+        if cursor:
+            params["cursor"] = cursor
+        resp = await client.get(ARCHIVE_SCRAPE_URL, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+        for doc in data.get("items", []):
+            doc_formats = doc.get("format", [])
+            if isinstance(doc_formats, str):
+                doc_formats = [doc_formats]
+            if doc.get("identifier") and _pick_format(doc_formats)[0]:
+                docs.append(doc)
+        cursor = data.get("cursor")
+        if len(docs) >= want or not cursor:
+            break
+    return docs
+
+
+async def _item_file(client: httpx.AsyncClient, identifier: str, sem: asyncio.Semaphore) -> Optional[dict]:
+    """The item's best downloadable ebook file from its manifest (cached), or None."""
+    cached = _manifests.get(identifier, _NOT_CACHED)
+    if cached is not _NOT_CACHED:
+        return cached
+    async with sem:
+        try:
+            resp = await client.get(f"{ARCHIVE_METADATA_URL}/{identifier}", timeout=METADATA_TIMEOUT_SECS)
+            resp.raise_for_status()
+            manifest = resp.json()
+        except Exception as exc:
+            # Not cached: a timeout says nothing about the item
+            logger.debug("Archive.org metadata for %s failed: %s", identifier, exc)
+            return None
+    file = _pick_file(identifier, manifest)
+    _manifests.set(identifier, file)
+    return file
+
+
+def _pick_file(identifier: str, manifest: dict) -> Optional[dict]:
+    """
+    Choose {name, format, size_mb} from a /metadata manifest: EPUB > PDF > CBZ > CBR,
+    public files only, preferring the one named after the item, then the largest.
+    """
+    if manifest.get("is_dark") or not manifest.get("files"):
+        return None
+    if str(manifest.get("metadata", {}).get("access-restricted-item", "")).lower() == "true":
+        return None
+    by_ext: dict[str, list[dict]] = {}
+    for f in manifest["files"]:
+        name = f.get("name", "")
+        ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+        if ext not in _EXT_PREFERENCE or str(f.get("private", "")).lower() == "true":
+            continue
+        if _PROTECTED_SUFFIX_RE.search(name):
+            continue
+        by_ext.setdefault(ext, []).append(f)
+    for ext in _EXT_PREFERENCE:
+        files = by_ext.get(ext)
+        if not files:
+            continue
+        best = max(files, key=lambda f: (f["name"] == f"{identifier}.{ext}", _size(f)))
+        size = _size(best)
+        return {
+            "name": best["name"],
+            "format": ext,
+            "size_mb": round(size / (1024 * 1024), 2) if size else None,
+        }
+    return None
+
+
+def _size(file: dict) -> int:
+    try:
+        return int(file.get("size") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
 def _pick_format(formats: list[str]) -> tuple[str, str]:
     """Return (format_name, file_extension) preferring EPUB > PDF > CBZ > CBR."""
     fmt_lower = [f.lower() for f in formats]
-    if "epub" in fmt_lower:
+    if any("epub" in f for f in fmt_lower):
         return "epub", "epub"
-    if "pdf" in fmt_lower:
+    if any("pdf" in f for f in fmt_lower):
         return "pdf", "pdf"
-    if "cbz" in fmt_lower:
+    if any("cbz" in f or f == "comic book zip" for f in fmt_lower):
         return "cbz", "cbz"
-    if "cbr" in fmt_lower:
+    if any("cbr" in f or f == "comic book rar" for f in fmt_lower):
         return "cbr", "cbr"
     return "", ""
 
@@ -1,28 +1,50 @@
 """
-Gutendex search client — queries the Gutenberg REST API (gutendex.com).
-Free, no API key required. Returns up to `limit` EPUB-preferred results.
+Gutenberg search — answered from the local catalog index (gutenberg_catalog,
+built from Project Gutenberg's offline dump) while it is fresh; otherwise
+queries the Gutenberg REST API (gutendex.com), which is slow and often times
+out. Free, no API key required. Returns up to `limit` EPUB-preferred results.
 """
+import asyncio
+import logging
+import os
 import re
 from typing import Optional
 
 import httpx
 
+from app.config import settings
+from app.sources.gutenberg_catalog import GutenbergCatalog
+
+logger = logging.getLogger("uvicorn.error")
+
 GUTENDEX_URL = "https://gutendex.com/books"
 
+catalog = GutenbergCatalog(
+    os.path.join(settings.DATA_DIR, "gutenberg_catalog.db"),
+    preferred_language=settings.GUTENBERG_PREFERRED_LANGUAGE,
+)
+
 
 async def search_gutendex(query: str, limit: int = 5) -> list[dict]:
     """
-    Search Project Gutenberg via the Gutendex API.
+    Search Project Gutenberg — local catalog index if fresh, else the Gutendex API
+    (a stale local index still answers if the API fails).
     Returns a list of result dicts with standardised fields.
     NOTE: No language filter — classic works often lack language tags.
     """
+    if catalog.is_fresh(settings.GUTENBERG_CATALOG_MAX_AGE_SECS):
+        return await asyncio.to_thread(catalog.search, query, limit)
+
     try:
         async with httpx.AsyncClient(timeout=20) as client:
             resp = await client.get(GUTENDEX_URL, params={"search": query})
             resp.raise_for_status()
             data = resp.json()
-    except Exception:
-        return []
+    except Exception as exc:
+        if catalog.age_secs() is None:
+            return []
+        logger.info("Gutendex unavailable (%s) — answering from the stale local catalog", exc)
+        return await asyncio.to_thread(catalog.search, query, limit)
 
     results = []
     for book in data.get("results", [])[:limit]:
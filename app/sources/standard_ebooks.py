@@ -1,23 +1,51 @@
 """
-Standard Ebooks search client — scrapes standardebooks.org search results.
+Standard Ebooks search client.
 Best source: professional EPUB formatting, DRM-free, public domain.
+
+Searches are answered from the local OPDS-synced catalog
+(standard_ebooks_catalog) once it holds the complete feed and is fresh. Until
+then — the full feed needs a Patrons Circle login — the website search page is
+scraped, and hits the catalog already knows get their real metadata.
 HTML structure: articles with typeof="schema:Book" about="/ebooks/author/title[/translator]"
 EPUB download URL pattern: https://standardebooks.org{about}/downloads/{slug}.epub
 """
+import asyncio
+import logging
+import os
 import re
 from typing import Optional
 
 import httpx
 
+from app.config import settings
+from app.sources.standard_ebooks_catalog import (
+    OPDS_ALL_URL,
+    OPDS_NEW_RELEASES_URL,
+    StandardEbooksCatalog,
+)
+
+logger = logging.getLogger("uvicorn.error")
+
 SE_BASE = "https://standardebooks.org"
 SE_SEARCH_URL = f"{SE_BASE}/ebooks"
 
+catalog = StandardEbooksCatalog(os.path.join(settings.DATA_DIR, "standard_ebooks_catalog.db"))
+
+
+def catalog_feed() -> tuple[str, Optional[tuple[str, str]]]:
+    """(feed URL, basic auth) — the full catalog with Patrons Circle credentials, else new releases."""
+    if settings.STANDARD_EBOOKS_FEED_EMAIL:
+        return OPDS_ALL_URL, (settings.STANDARD_EBOOKS_FEED_EMAIL, "")
+    return OPDS_NEW_RELEASES_URL, None
+
 
 async def search_standard_ebooks(query: str, limit: int = 5) -> list[dict]:
     """
-    Search Standard Ebooks. Parses the HTML search results page.
-    Returns a list of result dicts with standardised fields.
+    Search Standard Ebooks — local catalog if complete and fresh, else the
+    HTML search results page. Returns a list of result dicts with standardised fields.
     """
+    if catalog.complete and catalog.is_fresh(settings.STANDARD_EBOOKS_CATALOG_MAX_AGE_SECS):
+        return await asyncio.to_thread(catalog.search, query, limit)
     try:
         async with httpx.AsyncClient(timeout=20) as client:
             resp = await client.get(
@@ -28,8 +56,11 @@ async def search_standard_ebooks(query: str, limit: int = 5) -> list[dict]:
             )
             resp.raise_for_status()
             html = resp.text
-    except Exception:
-        return []
+    except Exception as exc:
+        if catalog.age_secs() is None:
+            return []
+        logger.info("Standard Ebooks search unavailable (%s) — answering from the local catalog", exc)
+        return await asyncio.to_thread(catalog.search, query, limit)
 
     # Find all book entries: typeof="schema:Book" about="/ebooks/..."
     # Pattern: about="/ebooks/author-name/book-title[/translator]"
@@ -55,6 +86,11 @@ async def search_standard_ebooks(query: str, limit: int = 5) -> list[dict]:
         if len(results) >= limit:
             break
 
+        known = catalog.get(path)
+        if known:
+            results.append(known)
+            continue
+
         title, author = _parse_se_path(path)
         if not title:
             continue
@@ -0,0 +1,304 @@
+"""
+Local Standard Ebooks catalog (SQLite FTS5) synced from their OPDS feed.
+
+The feed is Atom: one <entry> per ebook with the real title, authors, subjects,
+summary and acquisition links, plus an <updated> timestamp. Sync is
+incremental on two levels:
+  - conditional GET (ETag / Last-Modified) — an unchanged feed costs one 304;
+  - per-entry <updated> — only entries newer than the stored copy are rewritten.
+
+The complete catalog feed (/feeds/opds/all) is only served to Patrons Circle
+members (HTTP Basic, e-mail as user name). Without it the public new-releases
+feed still keeps recent additions indexed; the catalog is then "partial" and
+search_standard_ebooks keeps scraping the website (see standard_ebooks.py).
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as _ET
+from io import BytesIO
+from typing import Optional
+from urllib.parse import urljoin
+
+import httpx
+
+logger = logging.getLogger("uvicorn.error")
+
+SE_BASE = "https://standardebooks.org"
+OPDS_ALL_URL = f"{SE_BASE}/feeds/opds/all"
+OPDS_NEW_RELEASES_URL = f"{SE_BASE}/feeds/opds/new-releases"
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_SE_SUBJECTS = "https://standardebooks.org/vocab/subjects"
+_FTS_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ebooks (
+    path        TEXT PRIMARY KEY,
+    title       TEXT NOT NULL,
+    authors     TEXT NOT NULL,
+    subjects    TEXT NOT NULL,
+    summary     TEXT,
+    language    TEXT,
+    epub_url    TEXT NOT NULL,
+    cover_url   TEXT,
+    updated     TEXT NOT NULL,
+    synced_at   REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS ebooks_fts USING fts5(
+    title, authors, subjects, content='ebooks', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS ebooks_ai AFTER INSERT ON ebooks BEGIN
+    INSERT INTO ebooks_fts(rowid, title, authors, subjects)
+    VALUES (new.rowid, new.title, new.authors, new.subjects);
+END;
+CREATE TRIGGER IF NOT EXISTS ebooks_ad AFTER DELETE ON ebooks BEGIN
+    INSERT INTO ebooks_fts(ebooks_fts, rowid, title, authors, subjects)
+    VALUES ('delete', old.rowid, old.title, old.authors, old.subjects);
+END;
+CREATE TRIGGER IF NOT EXISTS ebooks_au AFTER UPDATE ON ebooks BEGIN
+    INSERT INTO ebooks_fts(ebooks_fts, rowid, title, authors, subjects)
+    VALUES ('delete', old.rowid, old.title, old.authors, old.subjects);
+    INSERT INTO ebooks_fts(rowid, title, authors, subjects)
+    VALUES (new.rowid, new.title, new.authors, new.subjects);
+END;
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key     TEXT PRIMARY KEY,
+    value   TEXT NOT NULL
+);
+"""
+
+
+def _pick_epub(links: list[tuple[str, str, str]]) -> Optional[str]:
+    """The compatible EPUB (not the _advanced/kepub builds) among (href, rel, type) links."""
+    epubs = [href for href, rel, typ in links if typ == "application/epub+zip" and "acquisition" in rel]
+    for href in epubs:
+        if not href.endswith(("_advanced.epub", ".kepub.epub")):
+            return href
+    return epubs[0] if epubs else None
+
+
+def parse_opds(data: bytes) -> tuple[Optional[str], list[dict]]:
+    """(feed <updated>, entries) from an OPDS/Atom acquisition feed."""
+    feed_updated = None
+    entries: list[dict] = []
+    for _event, elem in _ET.iterparse(BytesIO(data), events=("end",)):
+        if elem.tag == f"{_ATOM}updated" and feed_updated is None and not entries:
+            feed_updated = (elem.text or "").strip() or None  # feed-level <updated> precedes entries
+        if elem.tag != f"{_ATOM}entry":
+            continue
+        entry_id = (elem.findtext(f"{_ATOM}id") or "").strip()
+        path = entry_id[len(SE_BASE):] if entry_id.startswith(SE_BASE) else entry_id
+        links = [
+            (urljoin(SE_BASE, link.get("href", "")), link.get("rel", ""), link.get("type", ""))
+            for link in elem.findall(f"{_ATOM}link")
+        ]
+        epub_url = _pick_epub(links)
+        title = " ".join((elem.findtext(f"{_ATOM}title") or "").split())
+        if path.startswith("/ebooks/") and title and epub_url:
+            cover = next((href for href, rel, _t in links if rel == "http://opds-spec.org/image"), None)
+            entries.append({
+                "path": path,
+                "title": title,
+                "authors": [
+                    (a.findtext(f"{_ATOM}name") or "").strip()
+                    for a in elem.findall(f"{_ATOM}author") if a.findtext(f"{_ATOM}name")
+                ],
+                "subjects": [
+                    c.get("label") or c.get("term", "")
+                    for c in elem.findall(f"{_ATOM}category") if c.get("scheme") == _SE_SUBJECTS
+                ],
+                "summary": (elem.findtext(f"{_ATOM}summary") or "").strip() or None,
+                "language": elem.findtext("{http://purl.org/dc/terms/}language"),
+                "epub_url": epub_url,
+                "cover_url": cover,
+                "updated": (elem.findtext(f"{_ATOM}updated") or "").strip(),
+            })
+        elem.clear()
+    return feed_updated, entries
+
+
+class StandardEbooksCatalog:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, conn: sqlite3.Connection, **values: Optional[str]) -> None:
+        for key, value in values.items():
+            if value is not None:
+                conn.execute(
+                    "INSERT INTO catalog_meta (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, value),
+                )
+
+    @property
+    def complete(self) -> bool:
+        """True once the full catalog feed (not just new releases) has been synced."""
+        return self._meta("complete") == "1"
+
+    def age_secs(self) -> Optional[float]:
+        synced = self._meta("synced_at")
+        return time.time() - float(synced) if synced else None
+
+    def is_fresh(self, max_age_secs: float) -> bool:
+        age = self.age_secs()
+        return age is not None and age < max_age_secs
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM ebooks").fetchone()[0]
+        age = self.age_secs()
+        return {"ebooks": count, "complete": self.complete, "age_secs": round(age) if age is not None else None}
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def apply(self, entries: list[dict], *, full: bool, validators: dict) -> dict:
+        """Upsert entries newer than the stored copy; a full feed also drops vanished ebooks."""
+        now = time.time()
+        with self._lock, self._conn:
+            stored = {
+                r["path"]: r["updated"] for r in self._conn.execute("SELECT path, updated FROM ebooks")
+            }
+            changed = [e for e in entries if stored.get(e["path"]) != e["updated"]]
+            self._conn.executemany(
+                """
+                INSERT INTO ebooks (path, title, authors, subjects, summary, language, epub_url, cover_url,
+                                    updated, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    title = excluded.title,
+                    authors = excluded.authors,
+                    subjects = excluded.subjects,
+                    summary = excluded.summary,
+                    language = excluded.language,
+                    epub_url = excluded.epub_url,
+                    cover_url = excluded.cover_url,
+                    updated = excluded.updated,
+                    synced_at = excluded.synced_at
+                """,
+                [
+                    (
+                        e["path"], e["title"], json.dumps(e["authors"]), json.dumps(e["subjects"]),
+                        e["summary"], e["language"], e["epub_url"], e["cover_url"], e["updated"], now,
+                    )
+                    for e in changed
+                ],
+            )
+            removed: list[str] = []
+            if full and entries:
+                present = {e["path"] for e in entries}
+                removed = [p for p in stored if p not in present]
+                self._conn.executemany("DELETE FROM ebooks WHERE path = ?", [(p,) for p in removed])
+            self._set_meta(
+                self._conn,
+                synced_at=str(now),
+                complete="1" if full else None,
+                **validators,
+            )
+        return {"entries": len(entries), "updated": len(changed), "removed": len(removed)}
+
+    def touch(self, validators: Optional[dict[str, Optional[str]]] = None) -> None:
+        """Record a sync that found nothing new, keeping any fresh cache validators."""
+        with self._lock, self._conn:
+            self._set_meta(self._conn, synced_at=str(time.time()), **(validators or {}))
+
+    async def sync(self, feed_url: str, auth: Optional[tuple[str, str]] = None) -> dict:
+        started = time.monotonic()
+        full = feed_url.rstrip("/").endswith("/all")
+        headers = {"User-Agent": "Mozilla/5.0 (compatible; SamAssist/2.0)"}
+        etag, modified = self._meta(f"etag:{feed_url}"), self._meta(f"modified:{feed_url}")
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+        async with httpx.AsyncClient(timeout=120, follow_redirects=True, auth=auth) as client:
+            resp = await client.get(feed_url, headers=headers)
+        if resp.status_code == 304:
+            self.touch()
+            return {"feed": feed_url, "not_modified": True}
+        resp.raise_for_status()
+
+        feed_updated, entries = parse_opds(resp.content)
+        validators = {
+            f"etag:{feed_url}": resp.headers.get("etag"),
+            f"modified:{feed_url}": resp.headers.get("last-modified"),
+            f"feed_updated:{feed_url}": feed_updated,
+        }
+        if feed_updated and feed_updated == self._meta(f"feed_updated:{feed_url}"):
+            # Same feed under new validators: store them so the next sync can 304.
+            self.touch(validators)
+            return {"feed": feed_url, "not_modified": True}
+        result = self.apply(entries, full=full, validators=validators)
+        result.update(feed=feed_url, secs=round(time.monotonic() - started, 2))
+        logger.info("Standard Ebooks catalog synced: %s", result)
+        return result
+
+    async def sync_forever(self, feed_url: str, interval_secs: float, auth: Optional[tuple[str, str]] = None) -> None:
+        while True:
+            try:
+                await self.sync(feed_url, auth)
+            except Exception as exc:
+                logger.warning("Standard Ebooks catalog sync failed: %s", exc)
+            await asyncio.sleep(interval_secs)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def get(self, path: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ebooks WHERE path = ?", (path,)).fetchone()
+        return self._to_result(row) if row else None
+
+    def search(self, query: str, limit: int = 5) -> list[dict]:
+        """Full-text search (all words) over title, authors and subjects; same shape as the scraper's results."""
+        words = _FTS_TOKEN_RE.findall(query)
+        if not words:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT e.* FROM ebooks_fts JOIN ebooks e ON e.rowid = ebooks_fts.rowid
+                WHERE ebooks_fts MATCH ?
+                ORDER BY bm25(ebooks_fts, 10.0, 4.0, 1.0)
+                LIMIT ?
+                """,
+                (" ".join(f'"{w}"' for w in words), limit),
+            ).fetchall()
+        return [self._to_result(r) for r in rows]
+
+    @staticmethod
+    def _to_result(row: sqlite3.Row) -> dict:
+        authors = json.loads(row["authors"])
+        return {
+            "title": row["title"],
+            "author": authors[0] if authors else "Unknown",
+            "year": None,
+            "format": "epub",
+            "download_url": row["epub_url"],
+            "cover_url": row["cover_url"],
+            "source": "Standard Ebooks",
+            "source_id": row["path"],
+            "size_mb": None,
+            "subjects": json.loads(row["subjects"]),
+        }
@@ -1,6 +1,11 @@
+import shutil
+import tempfile
 import urllib.error
 import urllib.parse
 import urllib.request
+from typing import BinaryIO
+
+from app.fsutil import STREAM_CHUNK_SIZE
 
 
 class SubDLClient:
@@ -23,6 +28,9 @@ class SubDLClient:
         media_type: str = "movie",
         languages: str | None = None,
         limit: int = 10,
+        season_number: int | None = None,
+        episode_number: int | None = None,
+        full_season: bool = False,
     ) -> dict:
         if not self.api_key:
             raise RuntimeError("SUBDL_API_KEY is not configured")
@@ -45,6 +53,12 @@ class SubDLClient:
 
         if year:
             params["year"] = year
+        if season_number is not None:
+            params["season_number"] = season_number
+        if episode_number is not None:
+            params["episode_number"] = episode_number
+        if full_season:
+            params["full_season"] = 1
 
         payload = self._request_json(params)
         subtitles = payload.get("subtitles", []) or []
@@ -108,22 +122,29 @@ class SubDLClient:
             "download_url": download_url,
         }
 
-    def download_archive(self, download_url: str) -> bytes:
+    def spool_archive(self, download_url: str) -> BinaryIO:
+        """Stream the ZIP into an anonymous temp file and return it rewound. Caller closes it."""
         if not download_url:
             raise RuntimeError("SubDL download URL is missing")
 
         req = urllib.request.Request(download_url, method="GET")
         req.add_header("User-Agent", self.user_agent)
 
+        spool = tempfile.TemporaryFile()
         try:
             with urllib.request.urlopen(req, timeout=60) as resp:
-                return resp.read()
+                shutil.copyfileobj(resp, spool, STREAM_CHUNK_SIZE)
         except urllib.error.HTTPError as exc:
+            spool.close()
             body = exc.read().decode("utf-8", errors="replace")
             raise RuntimeError(f"SubDL download HTTP {exc.code}: {body[:300]}") from exc
         except Exception as exc:
+            spool.close()
             raise RuntimeError(f"SubDL download failed: [{type(exc).__name__}] {exc}") from exc
 
+        spool.seek(0)
+        return spool
+
     def _clean_text(self, text: str) -> str:
         import re
 
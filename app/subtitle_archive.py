@@ -0,0 +1,106 @@
+"""
+Subtitle archive extraction — works on a spooled temp file, never on in-memory bytes.
+
+SubDL serves every subtitle as a ZIP. Season packs can be tens of MB with
+hundreds of members, so members are ranked in a single pass (no sort) and
+copied straight from the archive into the sidecar path in chunks.
+
+Episode matching:
+  episode_token("Show.S01E02.1080p.srt") -> (1, 2)
+  extract_episode_subtitles() picks the best member per (season, episode)
+  in one pass over the central directory and writes each to its target.
+"""
+import re
+import shutil
+import zipfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, Optional
+
+from app.fsutil import STREAM_CHUNK_SIZE, atomic_writer
+
+SUBTITLE_EXT_PRIORITY: dict[str, int] = {".srt": 0, ".ass": 1, ".ssa": 2, ".sub": 3}
+
+_UNRANKED = 99
+
+# S01E02 / s1e2 / S01.E02, then 1x02
+_EPISODE_RES = (
+    re.compile(r"(?<![a-z0-9])s(\d{1,2})[ ._-]?e(\d{1,3})(?!\d)", re.IGNORECASE),
+    re.compile(r"(?<![a-z0-9])(\d{1,2})x(\d{2,3})(?!\d)", re.IGNORECASE),
+)
+
+
+def episode_token(name: str) -> Optional[tuple[int, int]]:
+    """Return (season, episode) parsed from a release or file name, or None."""
+    base = PurePosixPath(name.replace("\\", "/")).name
+    for pattern in _EPISODE_RES:
+        m = pattern.search(base)
+        if m:
+            return int(m.group(1)), int(m.group(2))
+    return None
+
+
+def _member_rank(info: zipfile.ZipInfo) -> tuple[int, int]:
+    """Lower is better: preferred subtitle extension first, then longest name."""
+    ext = PurePosixPath(info.filename).suffix.lower()
+    return (SUBTITLE_EXT_PRIORITY.get(ext, _UNRANKED), -len(info.filename))
+
+
+def pick_subtitle_member(archive: BinaryIO) -> zipfile.ZipInfo:
+    """Return the best subtitle member of a ZIP archive without sorting the listing."""
+    archive.seek(0)
+    with zipfile.ZipFile(archive) as zf:
+        best: Optional[zipfile.ZipInfo] = None
+        best_rank: tuple[int, int] = (_UNRANKED + 1, 0)
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            rank = _member_rank(info)
+            if rank < best_rank:
+                best, best_rank = info, rank
+    if best is None:
+        raise RuntimeError("Subtitle archive is empty")
+    return best
+
+
+def extract_member(archive: BinaryIO, member: zipfile.ZipInfo, dest_path: str) -> None:
+    """Stream one archive member into dest_path (temp file + atomic rename)."""
+    archive.seek(0)
+    with zipfile.ZipFile(archive) as zf, zf.open(member) as src:
+        with atomic_writer(dest_path) as dst:
+            shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+
+
+def extract_episode_subtitles(
+    archive: BinaryIO,
+    targets: dict[tuple[int, int], str],
+) -> dict[tuple[int, int], str]:
+    """
+    Extract one subtitle per episode from a season pack.
+
+    targets maps (season, episode) -> destination subtitle path. Members are
+    matched by episode token and ranked in a single pass; only subtitle files
+    are considered. Returns (season, episode) -> chosen member name for every
+    episode that was found and written.
+    """
+    archive.seek(0)
+    with zipfile.ZipFile(archive) as zf:
+        best: dict[tuple[int, int], tuple[tuple[int, int], zipfile.ZipInfo]] = {}
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            rank = _member_rank(info)
+            if rank[0] == _UNRANKED:
+                continue
+            token = episode_token(info.filename)
+            if token is None or token not in targets:
+                continue
+            current = best.get(token)
+            if current is None or rank < current[0]:
+                best[token] = (rank, info)
+
+        written: dict[tuple[int, int], str] = {}
+        for token, (_rank, info) in best.items():
+            with zf.open(info) as src, atomic_writer(targets[token]) as dst:
+                shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+            written[token] = info.filename
+    return written
@@ -0,0 +1,284 @@
+"""
+Local subtitle-state index (SQLite) — keeps subtitle bookkeeping off the FUSE mount.
+
+The Media tree lives on an rclone mount, so every directory listing, stat and
+.subtitle.json read is a network round-trip. This index records, per media file:
+  - known subtitle sidecars (path, language, source release, match score)
+  - the saved Jellyfin offset note
+
+It is updated on every subtitle write/removal and reconciled against the real
+filesystem by a background crawler (crawl_forever). Until a media file has been
+reconciled at least once, callers should treat the index as cold and fall back
+to the filesystem.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+logger = logging.getLogger("uvicorn.error")
+
+SUBTITLE_EXTS = {".srt", ".ass", ".ssa", ".sub"}
+VIDEO_EXTS = {".mkv", ".mp4", ".avi", ".m4v", ".ts", ".wmv", ".mov"}
+NOTE_SUFFIX = ".subtitle.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path            TEXT PRIMARY KEY,
+    dir             TEXT NOT NULL,
+    offset_json     TEXT,
+    touched_at      REAL NOT NULL,
+    reconciled_at   REAL
+);
+CREATE INDEX IF NOT EXISTS media_dir ON media(dir);
+CREATE TABLE IF NOT EXISTS sidecars (
+    path            TEXT PRIMARY KEY,
+    media_path      TEXT NOT NULL,
+    language        TEXT,
+    source_release  TEXT,
+    source_file     TEXT,
+    match_score     INTEGER,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sidecars_media ON sidecars(media_path);
+"""
+
+
+def _sidecar_language(media_path: str, sidecar_path: str) -> Optional[str]:
+    """'Movie (2001).en.srt' next to 'Movie (2001).mkv' -> 'en'."""
+    stem = os.path.splitext(os.path.basename(media_path))[0]
+    name = os.path.splitext(os.path.basename(sidecar_path))[0]
+    rest = name[len(stem):].lstrip(".")
+    if not rest:
+        return None
+    return rest.split(".", 1)[0] or None
+
+
+class SubtitleIndex:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def is_indexed(self, media_path: str) -> bool:
+        """True once media_path has been reconciled against the filesystem."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reconciled_at FROM media WHERE path = ?", (media_path,)
+            ).fetchone()
+        return bool(row and row["reconciled_at"])
+
+    def sidecars(self, media_path: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM sidecars WHERE media_path = ? ORDER BY path", (media_path,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_offset(self, media_path: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset_json FROM media WHERE path = ?", (media_path,)
+            ).fetchone()
+        if not row or not row["offset_json"]:
+            return None
+        return json.loads(row["offset_json"])
+
+    # ------------------------------------------------------------------
+    # Writes (called on every subtitle change)
+    # ------------------------------------------------------------------
+
+    def record_sidecar(
+        self,
+        media_path: str,
+        subtitle_path: str,
+        *,
+        language: Optional[str] = None,
+        source_release: Optional[str] = None,
+        source_file: Optional[str] = None,
+        match_score: Optional[int] = None,
+    ) -> None:
+        with self._lock, self._conn:
+            self._ensure_media(media_path)
+            self._conn.execute(
+                """
+                INSERT INTO sidecars (path, media_path, language, source_release, source_file, match_score, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    media_path = excluded.media_path,
+                    language = excluded.language,
+                    source_release = excluded.source_release,
+                    source_file = excluded.source_file,
+                    match_score = excluded.match_score,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    subtitle_path,
+                    media_path,
+                    language or _sidecar_language(media_path, subtitle_path),
+                    source_release,
+                    source_file,
+                    match_score,
+                    time.time(),
+                ),
+            )
+
+    def remove_sidecars(self, paths: Iterable[str]) -> None:
+        paths = list(paths)
+        if not paths:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM sidecars WHERE path = ?", [(p,) for p in paths])
+
+    def set_offset(self, media_path: str, payload: dict) -> None:
+        with self._lock, self._conn:
+            self._ensure_media(media_path)
+            self._conn.execute(
+                "UPDATE media SET offset_json = ? WHERE path = ?",
+                (json.dumps(payload), media_path),
+            )
+
+    def reconcile_media(
+        self,
+        media_path: str,
+        sidecar_paths: Iterable[str],
+        offset: Optional[dict] = None,
+        listed_at: Optional[float] = None,
+    ) -> None:
+        """
+        Make the index match what is on disk for one media file.
+        Metadata (release, score) is kept for sidecars that still exist, and
+        rows written after listed_at (i.e. after the directory was listed)
+        are never dropped. A note read from disk only fills the offset if
+        none is stored yet.
+        """
+        on_disk = set(sidecar_paths)
+        now = time.time()
+        cutoff = listed_at if listed_at is not None else now
+        with self._lock, self._conn:
+            self._ensure_media(media_path)
+            known = {
+                r["path"]: r["updated_at"] for r in self._conn.execute(
+                    "SELECT path, updated_at FROM sidecars WHERE media_path = ?", (media_path,)
+                )
+            }
+            gone = [p for p, updated_at in known.items() if p not in on_disk and updated_at < cutoff]
+            if gone:
+                self._conn.executemany("DELETE FROM sidecars WHERE path = ?", [(p,) for p in gone])
+            for path in on_disk.difference(known):
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sidecars (path, media_path, language, updated_at) VALUES (?, ?, ?, ?)",
+                    (path, media_path, _sidecar_language(media_path, path), now),
+                )
+            if offset is not None:
+                self._conn.execute(
+                    "UPDATE media SET offset_json = COALESCE(offset_json, ?) WHERE path = ?",
+                    (json.dumps(offset), media_path),
+                )
+            self._conn.execute(
+                "UPDATE media SET reconciled_at = ? WHERE path = ?", (now, media_path)
+            )
+
+    def forget_missing_media(self, directory: str, present: set[str], listed_at: float) -> None:
+        """Drop media rows (and their sidecars) in directory that no longer exist."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT path FROM media WHERE dir = ? AND touched_at < ?", (directory, listed_at)
+            ).fetchall()
+            missing = [(r["path"],) for r in rows if r["path"] not in present]
+            if missing:
+                self._conn.executemany("DELETE FROM sidecars WHERE media_path = ?", missing)
+                self._conn.executemany("DELETE FROM media WHERE path = ?", missing)
+
+    def forget_media(self, media_path: str) -> None:
+        """Drop one media row and its sidecars once the file is known to be gone."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sidecars WHERE media_path = ?", (media_path,))
+            self._conn.execute("DELETE FROM media WHERE path = ?", (media_path,))
+
+    def _ensure_media(self, media_path: str) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO media (path, dir, touched_at) VALUES (?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET touched_at = excluded.touched_at
+            """,
+            (media_path, os.path.dirname(media_path), time.time()),
+        )
+
+    # ------------------------------------------------------------------
+    # Background crawler
+    # ------------------------------------------------------------------
+
+    def reconcile_directory(self, directory: str, filenames: list[str], listed_at: float) -> int:
+        """Reconcile every video in one already-listed directory. Returns videos seen."""
+        videos: list[str] = []
+        subtitles: list[str] = []
+        notes: set[str] = set()
+        for name in filenames:
+            if name.endswith(NOTE_SUFFIX):
+                notes.add(name)
+                continue
+            ext = os.path.splitext(name)[1].lower()
+            if ext in VIDEO_EXTS:
+                videos.append(name)
+            elif ext in SUBTITLE_EXTS:
+                subtitles.append(name)
+
+        present: set[str] = set()
+        for video in videos:
+            media_path = os.path.join(directory, video)
+            present.add(media_path)
+            stem = os.path.splitext(video)[0]
+            sidecars = [os.path.join(directory, s) for s in subtitles if s.startswith(f"{stem}.")]
+            offset = None
+            note_name = f"{stem}{NOTE_SUFFIX}"
+            if note_name in notes and self.get_offset(media_path) is None:
+                try:
+                    with open(os.path.join(directory, note_name), "r", encoding="utf-8") as fh:
+                        offset = json.load(fh)
+                except Exception as exc:
+                    logger.debug("Subtitle index: unreadable note %s: %s", note_name, exc)
+            self.reconcile_media(media_path, sidecars, offset, listed_at=listed_at)
+        self.forget_missing_media(directory, present, listed_at)
+        return len(videos)
+
+    def crawl(self, roots: Iterable[str]) -> int:
+        """Walk every root once and reconcile each directory. Blocking — run in a thread."""
+        total = 0
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+            # Anything written after the walk started is newer than the listing.
+            listed_at = time.time()
+            for directory, _dirs, files in os.walk(root):
+                try:
+                    total += self.reconcile_directory(directory, files, listed_at)
+                except Exception as exc:
+                    logger.warning("Subtitle index: reconcile failed for %s: %s", directory, exc)
+        return total
+
+    async def crawl_forever(self, roots: list[str], interval_secs: float) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                count = await asyncio.to_thread(self.crawl, roots)
+                logger.info(
+                    "Subtitle index: reconciled %d media files in %.1fs",
+                    count, time.monotonic() - started,
+                )
+            except Exception as exc:
+                logger.warning("Subtitle index crawl failed: %s", exc)
+            await asyncio.sleep(interval_secs)
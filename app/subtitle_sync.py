@@ -0,0 +1,226 @@
+"""
+Automatic subtitle sync — aligns cue timing against voice activity in the audio.
+
+  1. ffmpeg decodes one audio stream to 8 kHz mono s16 (speech band only) and
+     pipes it out. PCM is folded into 10 ms RMS frames as it arrives, so a
+     two-hour film becomes a ~720k-sample float32 envelope (~3 MB); raw
+     samples are never held in memory.
+  2. The envelope becomes a voice-activity signal: log energy, smoothed,
+     thresholded between the noise floor and the loud end of the track, with
+     short pauses bridged so it looks like cue spans rather than syllables.
+  3. Subtitle cues are rasterised onto the same 10 ms grid.
+  4. FFT cross-correlation finds the lag that lines the two up best. The
+     usual frame-rate drift ratios (23.976 <-> 24/25 fps) are tried as well.
+
+The result uses the subtitle_timing convention:
+  new_time = old_time * drift_factor + offset_seconds
+"""
+import subprocess
+import tempfile
+from typing import BinaryIO, Iterable, Optional
+
+import numpy as np
+
+from app.subtitle_timing import read_cue_times
+
+SAMPLE_RATE = 8000
+FRAME_MS = 10
+_FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+_FRAME_BYTES = _FRAME_SAMPLES * 2
+_READ_SIZE = _FRAME_BYTES * 4096          # ~40 s of audio per read, always whole frames
+
+# PAL speed-up (23.976 <-> 25) and 23.976 <-> 24 are the drifts seen in practice.
+DRIFT_CANDIDATES = (1.0, 25 / 23.976, 23.976 / 25, 24 / 23.976, 23.976 / 24)
+
+_SMOOTH_FRAMES = 5                        # 50 ms moving average on log energy
+_BRIDGE_FRAMES = 30                       # close speech gaps shorter than 300 ms
+_PEAK_EXCLUSION_FRAMES = 200              # sidelobe search ignores ±2 s around the peak
+MIN_PEAK_RATIO = 1.15                     # peak must beat the best sidelobe by 15%
+
+
+# ---------------------------------------------------------------------------
+# Audio → envelope → voice activity
+# ---------------------------------------------------------------------------
+
+def envelope_from_pcm(stream: BinaryIO) -> np.ndarray:
+    """Fold a stream of s16le mono PCM at SAMPLE_RATE into per-frame RMS values."""
+    parts: list[np.ndarray] = []
+    carry = b""
+    while True:
+        chunk = stream.read(_READ_SIZE)
+        if not chunk:
+            break
+        buf = carry + chunk if carry else chunk
+        usable = len(buf) - len(buf) % _FRAME_BYTES
+        carry = buf[usable:]
+        if not usable:
+            continue
+        pcm = np.frombuffer(buf, dtype="<i2", count=usable // 2).astype(np.float32)
+        pcm = pcm.reshape(-1, _FRAME_SAMPLES)
+        parts.append(np.sqrt(np.einsum("ij,ij->i", pcm, pcm) / _FRAME_SAMPLES))
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(parts).astype(np.float32, copy=False)
+
+
+def extract_envelope(
+    media_path: str,
+    audio_stream: int = 0,
+    max_seconds: Optional[float] = None,
+) -> np.ndarray:
+    """Decode one audio stream with ffmpeg and return its 10 ms RMS envelope. Blocking."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", media_path,
+        "-map", f"0:a:{audio_stream}", "-vn", "-sn", "-dn",
+        "-af", "highpass=f=200,lowpass=f=3000",
+        "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le",
+    ]
+    if max_seconds:
+        cmd += ["-t", str(max_seconds)]
+    cmd.append("-")
+
+    # stderr goes to a temp file so a chatty decoder can never block the pipe.
+    with tempfile.TemporaryFile() as errlog:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errlog)
+        try:
+            envelope = envelope_from_pcm(proc.stdout)
+            returncode = proc.wait()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+        if returncode != 0:
+            errlog.seek(0)
+            detail = errlog.read().decode(errors="replace").strip().splitlines()
+            raise RuntimeError(f"ffmpeg exited {returncode}: {detail[-1] if detail else 'no output'}")
+    if not envelope.size:
+        raise RuntimeError("ffmpeg produced no audio")
+    return envelope
+
+
+def voice_activity(envelope: np.ndarray) -> np.ndarray:
+    """Boolean per-frame speech mask from an RMS envelope."""
+    log_energy = 20.0 * np.log10(envelope + 1.0)
+    kernel = np.full(_SMOOTH_FRAMES, 1.0 / _SMOOTH_FRAMES, dtype=np.float32)
+    smooth = np.convolve(log_energy, kernel, mode="same")
+    floor, loud = np.percentile(smooth, (20, 95))
+    active = smooth > floor + 0.35 * (loud - floor)
+    # Bridge short pauses with a morphological closing (dilate, then erode) so
+    # gaps vanish but span edges stay where the speech starts and stops.
+    window = np.ones(_BRIDGE_FRAMES + 1, dtype=np.float32)
+    dilated = np.convolve(active.astype(np.float32), window, mode="same") > 0
+    return np.convolve(dilated.astype(np.float32), window, mode="same") > _BRIDGE_FRAMES + 0.5
+
+
+# ---------------------------------------------------------------------------
+# Cues → timeline, correlation
+# ---------------------------------------------------------------------------
+
+def cue_timeline(cues: Iterable[tuple[int, int]], length: int, drift_factor: float = 1.0) -> np.ndarray:
+    """Rasterise (start_ms, end_ms) cues onto the frame grid as a boolean mask."""
+    arr = np.asarray(list(cues), dtype=np.float64).reshape(-1, 2)
+    frames = np.clip((arr * drift_factor / FRAME_MS).astype(np.int64), 0, length)
+    edges = np.zeros(length + 1, dtype=np.int32)
+    np.add.at(edges, frames[:, 0], 1)
+    np.add.at(edges, frames[:, 1], -1)
+    return np.cumsum(edges[:-1]) > 0
+
+
+def _correlate(voice_fft: np.ndarray, timeline: np.ndarray, size: int, max_lag: int) -> np.ndarray:
+    """Correlation of voice against the timeline for lags -max_lag..max_lag (frames)."""
+    centred = timeline.astype(np.float32) - timeline.mean()
+    corr = np.fft.irfft(voice_fft * np.conj(np.fft.rfft(centred, size)), size)
+    return np.concatenate((corr[-max_lag:], corr[: max_lag + 1]))
+
+
+def _peak_ratio(window: np.ndarray, peak_idx: int) -> float:
+    """How far the peak stands above the best lag outside its own neighbourhood."""
+    baseline = float(np.median(window))
+    lo, hi = max(0, peak_idx - _PEAK_EXCLUSION_FRAMES), peak_idx + _PEAK_EXCLUSION_FRAMES + 1
+    rest = np.concatenate((window[:lo], window[hi:]))
+    if not rest.size:
+        return float("inf")
+    sidelobe = float(rest.max()) - baseline
+    peak = float(window[peak_idx]) - baseline
+    if sidelobe <= 0:
+        return float("inf") if peak > 0 else 0.0
+    return peak / sidelobe
+
+
+def align(
+    voice: np.ndarray,
+    cues: list[tuple[int, int]],
+    *,
+    max_offset_seconds: float = 60.0,
+    drift_candidates: Iterable[float] = (1.0,),
+) -> dict:
+    """
+    Find offset_seconds/drift_factor that best align cues with the voice mask.
+    Returns offset_seconds, drift_factor, score (normalised correlation, 0..1)
+    and peak_ratio (peak over best sidelobe; >= MIN_PEAK_RATIO is reliable).
+    """
+    if not cues:
+        raise ValueError("Subtitle file has no cues")
+    drift_candidates = tuple(drift_candidates)
+    max_lag = max(1, int(max_offset_seconds * 1000 / FRAME_MS))
+    last_cue_frame = int(max(end for _start, end in cues) * max(drift_candidates) / FRAME_MS) + 1
+    length = max(len(voice), last_cue_frame)
+    size = 1 << int(np.ceil(np.log2(length + max_lag + 1)))
+
+    voice_f = np.zeros(length, dtype=np.float32)
+    voice_f[: len(voice)] = voice
+    voice_f -= voice_f.mean()
+    voice_norm = float(np.linalg.norm(voice_f))
+    voice_fft = np.fft.rfft(voice_f, size)
+
+    best: Optional[dict] = None
+    for drift in drift_candidates:
+        timeline = cue_timeline(cues, length, drift)
+        norm = voice_norm * float(np.linalg.norm(timeline - timeline.mean()))
+        if norm == 0:
+            continue
+        window = _correlate(voice_fft, timeline, size, max_lag)
+        peak_idx = int(np.argmax(window))
+        score = float(window[peak_idx]) / norm
+        if best is None or score > best["score"]:
+            best = {
+                "offset_seconds": round((peak_idx - max_lag) * FRAME_MS / 1000, 3),
+                "drift_factor": round(drift, 6),
+                "score": round(score, 4),
+                "peak_ratio": round(_peak_ratio(window, peak_idx), 3),
+            }
+    if best is None:
+        raise ValueError("No speech detected in the audio track")
+    best["reliable"] = best["peak_ratio"] >= MIN_PEAK_RATIO
+    return best
+
+
+def sync_subtitle(
+    media_path: str,
+    subtitle_path: str,
+    *,
+    max_offset_seconds: float = 60.0,
+    detect_drift: bool = True,
+    audio_stream: int = 0,
+    max_seconds: Optional[float] = None,
+) -> dict:
+    """Decode, detect speech and align one subtitle file. Blocking — run in a thread."""
+    cues = read_cue_times(subtitle_path)
+    if max_seconds:
+        cues = [c for c in cues if c[0] < max_seconds * 1000]
+    envelope = extract_envelope(media_path, audio_stream, max_seconds)
+    voice = voice_activity(envelope)
+    result = align(
+        voice,
+        cues,
+        max_offset_seconds=max_offset_seconds,
+        drift_candidates=DRIFT_CANDIDATES if detect_drift else (1.0,),
+    )
+    result.update({
+        "cues": len(cues),
+        "audio_seconds": round(len(envelope) * FRAME_MS / 1000, 1),
+        "speech_ratio": round(float(voice.mean()), 3),
+    })
+    return result
@@ -0,0 +1,232 @@
+"""
+Subtitle timing engine — shifts SRT/VTT and ASS/SSA timestamps in one streaming pass.
+
+new_time = old_time * drift_factor + offset_seconds   (clamped at 0)
+
+Files are processed as bytes in ~1 MiB line-aligned blocks with a single
+multiline regex substitution per block, so any ASCII-compatible encoding
+(UTF-8, cp1252, latin-1 …), BOMs and CRLF line endings pass through untouched.
+Only timing lines (SRT) or the Start/End fields of Dialogue/Comment events
+(ASS/SSA, located via the [Events] Format line) are rewritten; everything else,
+including ASS override tags and styling, is copied verbatim. Output goes to a
+sibling temp file and replaces the destination atomically, so the source and
+destination may be the same path.
+"""
+import os
+import re
+from typing import BinaryIO, Iterator, Optional
+
+from app.fsutil import atomic_writer
+
+SRT_EXTS = {".srt", ".vtt"}
+ASS_EXTS = {".ass", ".ssa"}
+
+_CHUNK_SIZE = 1 << 20
+
+_SRT_TIMING_RE = re.compile(
+    rb"^([ \t]*)(\d{1,3}):(\d{2}):(\d{2})([,.])(\d{3})([ \t]*-->[ \t]*)(\d{1,3}):(\d{2}):(\d{2})[,.](\d{3})",
+    re.MULTILINE,
+)
+_ASS_TIME = rb"(\d+):(\d{2}):(\d{2})[.:](\d{1,3})"
+_ASS_EVENT_PREFIXES = (b"Dialogue:", b"Comment:")
+# Default [Events] Format for ASS: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+_ASS_DEFAULT_START_END = (1, 2)
+
+
+def _shifter(offset_seconds: float, drift_factor: float):
+    offset_ms = offset_seconds * 1000.0
+
+    def shift(ms: int) -> int:
+        shifted = int(round(ms * drift_factor + offset_ms))
+        return shifted if shifted > 0 else 0
+
+    return shift
+
+
+def _format_srt(ms: int, sep: bytes) -> bytes:
+    s, ms = divmod(ms, 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return b"%02d:%02d:%02d%s%03d" % (h, m, s, sep, ms)
+
+
+def _format_ass(ms: int) -> bytes:
+    cs = (ms + 5) // 10
+    s, cs = divmod(cs, 100)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return b"%d:%02d:%02d.%02d" % (h, m, s, cs)
+
+
+def _ass_frac_ms(frac: bytes) -> int:
+    return int(frac) * (10 if len(frac) == 2 else 100 if len(frac) == 1 else 1)
+
+
+def _iter_blocks(src: BinaryIO) -> Iterator[bytes]:
+    """Yield ~1 MiB blocks that always end on a line boundary (last block may not)."""
+    tail = b""
+    while True:
+        block = src.read(_CHUNK_SIZE)
+        if not block:
+            if tail:
+                yield tail
+            return
+        block = tail + block
+        cut = block.rfind(b"\n") + 1
+        if cut == 0:
+            tail = block
+            continue
+        tail = block[cut:]
+        yield block[:cut]
+
+
+def _shift_srt(src: BinaryIO, dst: BinaryIO, shift) -> int:
+    changed = 0
+
+    def repl(m: re.Match) -> bytes:
+        nonlocal changed
+        lead, h1, m1, s1, sep, f1, arrow, h2, m2, s2, f2 = m.groups()
+        start = shift(((int(h1) * 60 + int(m1)) * 60 + int(s1)) * 1000 + int(f1))
+        end = shift(((int(h2) * 60 + int(m2)) * 60 + int(s2)) * 1000 + int(f2))
+        changed += 1
+        return lead + _format_srt(start, sep) + arrow + _format_srt(end, sep)
+
+    sub = _SRT_TIMING_RE.sub
+    for block in _iter_blocks(src):
+        dst.write(sub(repl, block))
+    return changed
+
+
+def _ass_event_re(start_idx: int, end_idx: int) -> re.Pattern:
+    """Match the Start/End fields of Dialogue/Comment lines for a given Format field order."""
+    first, second = sorted((start_idx, end_idx))
+    head = rb"(?:Dialogue|Comment):"
+    if first:
+        head += rb"[^,\n]*" + rb"(?:,[^,\n]*)" * (first - 1) + rb","
+    return re.compile(
+        rb"^(" + head + rb"[ \t]*)" + _ASS_TIME
+        + rb"((?:,[^,\n]*){%d},[ \t]*)" % (second - first - 1) + _ASS_TIME,
+        re.MULTILINE,
+    )
+
+
+def _scan_ass_header(src: BinaryIO, dst: Optional[BinaryIO] = None) -> tuple[re.Pattern, bytes]:
+    """
+    Read (and copy to dst) everything before the first event, picking up the
+    [Events] Format field order. Returns the event regex and the first event
+    line (b"" if the file has no events).
+    """
+    start_idx, end_idx = _ASS_DEFAULT_START_END
+    in_events = False
+    while True:
+        line = src.readline()
+        if not line:
+            return _ass_event_re(start_idx, end_idx), b""
+        stripped = line.lstrip()
+        if stripped.startswith(b"["):
+            in_events = stripped[:8].lower() == b"[events]"
+        elif in_events and stripped.startswith(b"Format:"):
+            fields = [f.strip().lower() for f in stripped[7:].split(b",")]
+            if b"start" in fields and b"end" in fields:
+                start_idx, end_idx = fields.index(b"start"), fields.index(b"end")
+        elif in_events and stripped.startswith(_ASS_EVENT_PREFIXES):
+            return _ass_event_re(start_idx, end_idx), line
+        if dst is not None:
+            dst.write(line)
+
+
+def _iter_ass_blocks(src: BinaryIO, pending: bytes) -> Iterator[bytes]:
+    if not pending:
+        return
+    first = True
+    for block in _iter_blocks(src):
+        yield pending + block if first else block
+        first = False
+    if first:
+        yield pending
+
+
+def _ass_ms(h: bytes, m: bytes, s: bytes, frac: bytes) -> int:
+    return ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + _ass_frac_ms(frac)
+
+
+def _shift_ass(src: BinaryIO, dst: BinaryIO, shift) -> int:
+    changed = 0
+    event_re, pending = _scan_ass_header(src, dst)
+
+    def repl(m: re.Match) -> bytes:
+        nonlocal changed
+        head, h1, m1, s1, f1, mid, h2, m2, s2, f2 = m.groups()
+        t1 = shift(_ass_ms(h1, m1, s1, f1))
+        t2 = shift(_ass_ms(h2, m2, s2, f2))
+        changed += 1
+        return head + _format_ass(t1) + mid + _format_ass(t2)
+
+    sub = event_re.sub
+    for block in _iter_ass_blocks(src, pending):
+        dst.write(sub(repl, block))
+    return changed
+
+
+def shift_subtitle_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    fmt: str,
+    offset_seconds: float,
+    drift_factor: float = 1.0,
+) -> int:
+    """Copy src to dst with shifted timestamps. fmt is a file extension. Returns events shifted."""
+    shift = _shifter(offset_seconds, drift_factor)
+    fmt = fmt.lower() if fmt.startswith(".") else f".{fmt.lower()}"
+    if fmt in SRT_EXTS:
+        return _shift_srt(src, dst, shift)
+    if fmt in ASS_EXTS:
+        return _shift_ass(src, dst, shift)
+    raise ValueError(f"Unsupported subtitle format for timing shift: {fmt}")
+
+
+def shift_subtitle_file(
+    src_path: str,
+    dest_path: str,
+    offset_seconds: float,
+    drift_factor: float = 1.0,
+) -> int:
+    """
+    Shift every cue in src_path and write the result to dest_path atomically.
+    src_path and dest_path may be the same file. Returns the number of cues shifted.
+    """
+    fmt = os.path.splitext(src_path)[1]
+    if fmt.lower() not in SRT_EXTS | ASS_EXTS:
+        raise ValueError(f"Unsupported subtitle format for timing shift: {fmt}")
+    with open(src_path, "rb") as src, atomic_writer(dest_path) as dst:
+        return shift_subtitle_stream(src, dst, fmt, offset_seconds, drift_factor)
+
+
+def read_cue_times(path: str) -> list[tuple[int, int]]:
+    """
+    Return (start_ms, end_ms) for every cue in an SRT/VTT or ASS/SSA file, in
+    file order. ASS Comment lines are skipped — they are never displayed.
+    """
+    fmt = os.path.splitext(path)[1].lower()
+    cues: list[tuple[int, int]] = []
+    with open(path, "rb") as src:
+        if fmt in SRT_EXTS:
+            for block in _iter_blocks(src):
+                for m in _SRT_TIMING_RE.finditer(block):
+                    _lead, h1, m1, s1, _sep, f1, _arrow, h2, m2, s2, f2 = m.groups()
+                    cues.append((
+                        ((int(h1) * 60 + int(m1)) * 60 + int(s1)) * 1000 + int(f1),
+                        ((int(h2) * 60 + int(m2)) * 60 + int(s2)) * 1000 + int(f2),
+                    ))
+        elif fmt in ASS_EXTS:
+            event_re, pending = _scan_ass_header(src)
+            for block in _iter_ass_blocks(src, pending):
+                for m in event_re.finditer(block):
+                    head, h1, m1, s1, f1, _mid, h2, m2, s2, f2 = m.groups()
+                    if head.startswith(b"Comment"):
+                        continue
+                    t1, t2 = _ass_ms(h1, m1, s1, f1), _ass_ms(h2, m2, s2, f2)
+                    cues.append((min(t1, t2), max(t1, t2)))
+        else:
+            raise ValueError(f"Unsupported subtitle format: {fmt}")
+    return cues
@@ -0,0 +1,159 @@
+"""
+Shared login-token cache for the services we authenticate against (slskd JWT,
+Kavita JWT, qBittorrent SID cookie, OpenSubtitles JWT).
+
+Each client used to keep its token in a plain attribute and log in whenever it
+looked stale, so a burst of concurrent requests (pollers, batch downloads)
+fired one login each. A TokenManager instead:
+
+  - single-flights logins — concurrent callers that need a token while one
+    login is in flight await that login instead of starting their own;
+  - refreshes ahead — a caller that finds the token within
+    refresh_ahead_secs (at most half its lifetime) of expiry gets the
+    current token immediately and starts one background login, so requests
+    rarely wait on a login;
+  - forgets a token the server rejected (invalidate), once per token — the
+    other requests that failed with the same token reuse the new one.
+
+TokenAuth plugs a manager into httpx: it attaches the token to every request
+and, on a 401 (or whatever status the service uses), refreshes once and
+resends. Logins, joined logins, background refreshes and retries are
+counted and served by GET /metrics.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Iterable, Optional
+
+import httpx
+
+from app.ttl_cache import register_stats
+
+logger = logging.getLogger("uvicorn.error")
+
+FAILED_REFRESH_BACKOFF_SECS = 30.0
+
+
+class TokenManager:
+    def __init__(
+        self,
+        name: str,
+        login: Callable[[], Awaitable[tuple[Any, float]]],
+        refresh_ahead_secs: float = 60.0,
+    ):
+        """login() performs one login and returns (token, lifetime in seconds)."""
+        self.name = name
+        self._login = login
+        self.refresh_ahead_secs = refresh_ahead_secs
+        self._token: Any = None
+        self._expires = 0.0                    # monotonic
+        self._refresh_at = 0.0                 # monotonic; background refresh from here on
+        self._inflight: Optional[asyncio.Task] = None
+        self._background_after = 0.0           # no background refresh before this (after a failure)
+        self.logins = self.login_failures = self.joined = 0
+        self.background_refreshes = self.invalidations = self.retries = 0
+        register_stats(f"auth.{name}", self.stats)
+
+    async def get(self) -> Any:
+        """A valid token — cached, or from a (shared) login if there is none."""
+        now = time.monotonic()
+        if self._token is not None and now < self._expires:
+            if (
+                now >= self._refresh_at
+                and self._inflight is None
+                and now >= self._background_after
+            ):
+                self.background_refreshes += 1
+                self._start_login()
+            return self._token
+        return await self.refresh()
+
+    async def refresh(self) -> Any:
+        """Log in now, or join the login already in flight, and return its token."""
+        task = self._inflight
+        if task is None:
+            task = self._start_login()
+        else:
+            self.joined += 1
+        # shield: a cancelled caller must not cancel the login other callers await
+        return await asyncio.shield(task)
+
+    def invalidate(self, token: Any) -> None:
+        """Drop token after the server rejected it (no-op if it was already replaced)."""
+        if token is not None and token == self._token:
+            self._token = None
+            self._expires = 0.0
+            self.invalidations += 1
+
+    def record_retry(self, token: Any) -> None:
+        """Count a request that is resent after the server rejected token, and drop that token."""
+        self.retries += 1
+        self.invalidate(token)
+
+    def _start_login(self) -> asyncio.Task:
+        task = asyncio.create_task(self._do_login())
+        self._inflight = task
+        task.add_done_callback(self._login_done)
+        return task
+
+    async def _do_login(self) -> Any:
+        token, lifetime_secs = await self._login()
+        lifetime_secs = max(0.0, lifetime_secs)
+        self._token = token
+        self._expires = time.monotonic() + lifetime_secs
+        # never refresh ahead for more than half the lifetime (short-lived tokens)
+        self._refresh_at = self._expires - min(self.refresh_ahead_secs, lifetime_secs / 2)
+        self.logins += 1
+        return token
+
+    def _login_done(self, task: asyncio.Task) -> None:
+        if self._inflight is task:
+            self._inflight = None
+        if task.cancelled():
+            return
+        exc = task.exception()  # also marks it retrieved for background refreshes
+        if exc is not None:
+            self.login_failures += 1
+            self._background_after = time.monotonic() + FAILED_REFRESH_BACKOFF_SECS
+            logger.warning("%s login failed: %s", self.name, exc)
+
+    def stats(self) -> dict:
+        return {
+            "has_token": self._token is not None,
+            "expires_in_secs": round(max(0.0, self._expires - time.monotonic())) if self._token is not None else None,
+            "logins": self.logins,
+            "login_failures": self.login_failures,
+            "joined_logins": self.joined,
+            "background_refreshes": self.background_refreshes,
+            "invalidations": self.invalidations,
+            "retries": self.retries,
+        }
+
+
+def bearer(request: httpx.Request, token: Any) -> None:
+    request.headers["Authorization"] = f"Bearer {token}"
+
+
+class TokenAuth(httpx.Auth):
+    """httpx auth: attach the manager's token; on an auth failure refresh once and resend."""
+
+    requires_request_body = True  # the body may have to be sent twice
+
+    def __init__(
+        self,
+        manager: TokenManager,
+        apply: Callable[[httpx.Request, Any], None] = bearer,
+        unauthorized: Iterable[int] = (401,),
+    ):
+        self.manager = manager
+        self.apply = apply
+        self.unauthorized = frozenset(unauthorized)
+
+    async def async_auth_flow(self, request: httpx.Request) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        token = await self.manager.get()
+        self.apply(request, token)
+        response = yield request
+        if response.status_code in self.unauthorized:
+            self.manager.record_retry(token)
+            self.apply(request, await self.manager.get())
+            yield request
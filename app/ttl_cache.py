@@ -0,0 +1,131 @@
+"""
+Bounded in-process cache: LRU order, per-entry TTL, entry-count and byte budgets.
+
+Every map-shaped cache the app keeps in memory (job-store read-through, Anna's
+Archive resolved URLs, Archive.org manifests) is a TTLCache, so none of them
+can grow without limit over weeks of uptime. Each one counts hits, misses,
+LRU evictions and expirations; stats for all of them (plus any other
+registered source, e.g. functools.lru_cache info) are served by GET /metrics.
+
+Entry sizes are estimates: callers that already have a serialized form pass
+its length as size=; otherwise the value is JSON-encoded once on set().
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# name -> zero-argument callable returning a stats dict
+_registry: dict[str, Callable[[], dict]] = {}
+
+
+def register_stats(name: str, stats_fn: Callable[[], dict]) -> None:
+    """Expose a cache's stats under name in all_stats() (later registrations replace earlier ones)."""
+    _registry[name] = stats_fn
+
+
+def all_stats() -> dict[str, dict]:
+    return {name: fn() for name, fn in sorted(_registry.items())}
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 64
+
+
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: Optional[int] = None,
+        ttl_secs: Optional[float] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_secs = ttl_secs
+        self._lock = threading.Lock()
+        # key -> (value, expires_at monotonic or None, size)
+        self._data: OrderedDict[Hashable, tuple[Any, Optional[float], int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        register_stats(name, self.stats)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl_secs: Optional[float] = None, size: Optional[int] = None) -> None:
+        """Store value; ttl_secs overrides the cache default (None on both = no expiry)."""
+        ttl = ttl_secs if ttl_secs is not None else self.ttl_secs
+        size = size if size is not None else (_estimate_size(value) if self.max_bytes is not None else 0)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.evictions += 1  # would evict everything else and still not fit
+                return
+            self._data[key] = (value, time.monotonic() + ttl if ttl is not None else None, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._drop(key)
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, exp, _) in self._data.items() if exp is not None and exp <= now]
+            for key in expired:
+                self._drop(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -5,6 +5,9 @@ Endpoints:
   POST /youtube/search   — search YouTube (+ optional playlist check)
   POST /youtube/download — trigger background download
   GET  /youtube/status/{id} — poll download status
+
+Searches, downloads and playlist contents live in the job store (data/jobs.db);
+downloads interrupted by a restart are started again on startup.
 """
 import asyncio
 import json
@@ -21,6 +24,7 @@ from pydantic import BaseModel
 
 from app import navidrome
 from app.config import settings
+from app.job_store import JobStore
 from app.youtube_enrichment import enrich_youtube_opus
 
 logger = logging.getLogger("uvicorn.error")
@@ -39,12 +43,15 @@ async def _require_api_key(key: str = Security(_api_key_header)) -> str:
 
 
 # ---------------------------------------------------------------------------
-# In-memory state
+# Persistent state (data/jobs.db)
 # ---------------------------------------------------------------------------
-_yt_search_cache: dict[str, dict] = {}   # search_id → {results: [...]}
-_yt_downloads: dict[str, dict] = {}       # download_id → {status, title, language, error}
-_playlist_cache: dict[str, dict] = {}     # url → {items: [...], expires: float}
+_jobs = JobStore(os.path.join(settings.DATA_DIR, "jobs.db"), name="youtube_jobs")
+_SEARCH = "yt_search"        # search_id → {results: [...]}
+_DOWNLOAD = "yt_download"    # download_id → {status, title, language, error, url, uploader, ...}
+_PLAYLIST = "yt_playlist"    # url → {items: [...]}
 
+_SEARCH_TTL_SECS = 24 * 3600
+_DOWNLOAD_TTL_SECS = 7 * 24 * 3600
 _PLAYLIST_TTL = 3600  # cache playlist contents for 1 hour
 _YT_URL_RE = re.compile(r"^(https?://)?(www\.)?(youtube\.com|youtu\.be)/", re.IGNORECASE)
 
@@ -55,6 +62,16 @@ _DEST: dict[str, str] = {
     "punjabi":  "/mnt/cloud/gdrive/Media/Music/Punjabi/YouTube_Music",
 }
 
+# Download tasks — referenced here so they can't be garbage-collected mid-run
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 
 def _validate_cookies_file(path: str) -> tuple[bool, str]:
     import os
@@ -169,18 +186,18 @@ async def _load_playlists() -> list[dict]:
         return []
 
     urls = [u.strip() for u in raw.split(",") if u.strip()]
-    now = time.time()
+    cached = {u: _jobs.get(_PLAYLIST, u) for u in urls}
 
     # Fetch stale/missing playlists in parallel
-    stale = [u for u in urls if u not in _playlist_cache or _playlist_cache[u]["expires"] < now]
+    stale = [u for u in urls if cached[u] is None]
     if stale:
         results = await asyncio.gather(*[_fetch_playlist(u) for u in stale])
         for url, items in zip(stale, results):
-            _playlist_cache[url] = {"items": items, "expires": now + _PLAYLIST_TTL}
+            cached[url] = _jobs.put(_PLAYLIST, url, {"items": items}, _PLAYLIST_TTL)
 
     all_items: list[dict] = []
     for u in urls:
-        all_items.extend(_playlist_cache.get(u, {}).get("items", []))
+        all_items.extend(cached[u]["items"])
     return all_items
 
 
@@ -368,19 +385,20 @@ async def _probe_audio_file(path: str) -> dict:
 
 async def _yt_download_task(download_id: str, url: str, title: str, uploader: str, language: str) -> None:
     dest = _DEST.get(language, _DEST["english"])
-    state = _yt_downloads[download_id]
-    state["status"] = "downloading"
+    def _set(**fields) -> None:
+        _jobs.update(_DOWNLOAD, download_id, **fields)
+
+    _set(status="downloading")
     started_at = time.time()
 
     cookies = settings.YOUTUBE_COOKIES_FILE
     valid, reason = _validate_cookies_file(cookies)
     if not valid:
-        state["status"] = "failed"
-        state["error"] = (
+        _set(status="failed", error=(
             "YouTube cookies not configured. "
             "Export youtube_cookies.txt from Chrome (YouTube Premium) and upload to the VPS. "
             "See setup instructions."
-        )
+        ))
         logger.error("yt-dlp blocked: cookies file invalid at %s (%s)", cookies, reason)
         return
 
@@ -408,19 +426,21 @@ async def _yt_download_task(download_id: str, url: str, title: str, uploader: st
         stdout_text = stdout.decode(errors="replace")
         if proc.returncode == 0:
             parsed = _parse_printed_download_info(stdout_text)
-            state["source_format_id"] = parsed.get("format")
-            state["source_abr_kbps"] = round(float(parsed["abr"]), 1) if parsed.get("abr") not in (None, "NA") else None
-            state["source_acodec"] = parsed.get("acodec")
+            _set(
+                source_format_id=parsed.get("format"),
+                source_abr_kbps=round(float(parsed["abr"]), 1) if parsed.get("abr") not in (None, "NA") else None,
+                source_acodec=parsed.get("acodec"),
+            )
             saved_to = parsed.get("saved_to")
             if not saved_to or saved_to == "NA":
                 saved_to = await _predict_output_path(url, dest, cookies)
             if saved_to and not os.path.isfile(saved_to):
                 saved_to = _find_recent_output_file(dest, started_at)
-            state["saved_to"] = saved_to
-            if state.get("saved_to"):
-                state.update(await _probe_audio_file(state["saved_to"]))
-                state.update(await enrich_youtube_opus(state["saved_to"], title, uploader, url))
-            state["status"] = "done"
+            _set(saved_to=saved_to)
+            if saved_to:
+                _set(**(await _probe_audio_file(saved_to)))
+                _set(**(await enrich_youtube_opus(saved_to, title, uploader, url)))
+            _set(status="done")
             logger.info("yt-dlp done: %s", title)
             try:
                 await navidrome.trigger_scan()
@@ -428,16 +448,27 @@ async def _yt_download_task(download_id: str, url: str, title: str, uploader: st
                 logger.warning("Navidrome scan failed after yt-dlp download: %s", e)
         else:
             err = stderr.decode(errors="replace")[-500:]
-            state["status"] = "failed"
-            state["error"] = err
+            _set(status="failed", error=err)
             logger.error("yt-dlp failed (rc=%d): %s", proc.returncode, err)
 
     except Exception as e:
-        state["status"] = "failed"
-        state["error"] = str(e)
+        _set(status="failed", error=str(e))
         logger.error("yt-dlp exception: %s", e)
 
 
+@router.on_event("startup")
+async def _resume_unfinished_downloads() -> None:
+    """Restart downloads a restart interrupted (yt-dlp runs with --force-overwrites)."""
+    for download_id, state in _jobs.by_status(_DOWNLOAD, ("starting", "downloading")):
+        if not state.get("url"):
+            _jobs.update(_DOWNLOAD, download_id, status="failed", error="Interrupted by a restart")
+            continue
+        logger.info("Resuming YouTube download %s: %s", download_id, state.get("title"))
+        _spawn(
+            _yt_download_task(download_id, state["url"], state["title"], state.get("uploader", ""), state["language"])
+        )
+
+
 # ---------------------------------------------------------------------------
 # Request / response models
 # ---------------------------------------------------------------------------
@@ -476,7 +507,7 @@ async def youtube_search(req: SearchRequest, _: str = Depends(_require_api_key))
                 "in_playlist": False,
                 "playlist_name": None,
             }
-            _yt_search_cache[search_id] = {"results": [entry]}
+            _jobs.put(_SEARCH, search_id, {"results": [entry]}, _SEARCH_TTL_SECS)
             return {"search_id": search_id, "results": [entry]}
 
     # 1. Playlist matches (if configured and requested)
@@ -513,14 +544,18 @@ async def youtube_search(req: SearchRequest, _: str = Depends(_require_api_key))
         indexed.append(entry)
 
     # Cache full list (with URL) for download lookup
-    _yt_search_cache[search_id] = {"results": [{"url": r["url"], **ir} for r, ir in zip(results, indexed)]}
+    _jobs.put(
+        _SEARCH, search_id,
+        {"results": [{"url": r["url"], **ir} for r, ir in zip(results, indexed)]},
+        _SEARCH_TTL_SECS,
+    )
 
     return {"search_id": search_id, "results": indexed}
 
 
 @router.post("/download")
 async def youtube_download(req: DownloadRequest, _: str = Depends(_require_api_key)):
-    cached = _yt_search_cache.get(req.search_id)
+    cached = _jobs.get(_SEARCH, req.search_id)
     if not cached:
         raise HTTPException(status_code=404, detail="search_id not found or expired")
 
@@ -538,11 +573,13 @@ async def youtube_download(req: DownloadRequest, _: str = Depends(_require_api_k
     uploader = entry.get("uploader", "")
 
     download_id = str(uuid.uuid4())
-    _yt_downloads[download_id] = {
+    _jobs.put(_DOWNLOAD, download_id, {
         "status":   "starting",
         "title":    title,
         "language": lang,
         "error":    None,
+        "url":      url,
+        "uploader": uploader,
         "source_format_id": None,
         "source_abr_kbps": None,
         "source_acodec": None,
@@ -557,9 +594,9 @@ async def youtube_download(req: DownloadRequest, _: str = Depends(_require_api_k
         "enriched_album": None,
         "cover_art_applied": False,
         "cover_art_source": None,
-    }
+    }, _DOWNLOAD_TTL_SECS)
 
-    asyncio.create_task(_yt_download_task(download_id, url, title, uploader, lang))
+    _spawn(_yt_download_task(download_id, url, title, uploader, lang))
 
     return {
         "success":     True,
@@ -571,7 +608,7 @@ async def youtube_download(req: DownloadRequest, _: str = Depends(_require_api_k
 
 @router.get("/status/{download_id}")
 async def youtube_status(download_id: str, _: str = Depends(_require_api_key)):
-    state = _yt_downloads.get(download_id)
+    state = _jobs.get(_DOWNLOAD, download_id)
     if not state:
         raise HTTPException(status_code=404, detail="download_id not found")
     return {"download_id": download_id, **state}
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark the librarian's result ranking / fuzzy de-duplication
+(app/book_ranking.py) against the old exact-lowercase-title dedup.
+
+Usage:
+  python scripts/bench_book_ranking.py                  # 300 synthetic candidates
+  python scripts/bench_book_ranking.py --candidates 800 --rounds 500
+
+The fixture mimics a merged /librarian/search response: four sources, each
+repeating a shared pool of titles with the variations seen in practice —
+"Count of Monte Cristo, The", title-cased slugs, subtitles, diacritics,
+"Last, First, 1802-1870" authors, the odd typo — plus unrelated filler.
+"cold" clears the normalization caches before every round; "warm" is the
+steady state when titles repeat across searches.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.book_ranking import clear_caches, rank_results  # noqa: E402
+
+SOURCES = ["Standard Ebooks", "Gutenberg", "Archive.org", "AnnasArchive"]
+
+_BOOKS = [
+    ("The Count of Monte Cristo", "Alexandre Dumas"),
+    ("Pride and Prejudice", "Jane Austen"),
+    ("A Tale of Two Cities", "Charles Dickens"),
+    ("Les Misérables", "Victor Hugo"),
+    ("The Brothers Karamazov", "Fyodor Dostoyevsky"),
+    ("Alice's Adventures in Wonderland", "Lewis Carroll"),
+    ("War and Peace", "Leo Tolstoy"),
+    ("The Picture of Dorian Gray", "Oscar Wilde"),
+    ("Dune", "Frank Herbert"),
+    ("Dune Messiah", "Frank Herbert"),
+    ("Foundation and Empire", "Isaac Asimov"),
+    ("Twenty Thousand Leagues Under the Sea", "Jules Verne"),
+]
+_WORDS = "night river empire garden letters history voyage island shadow winter city storm".split()
+
+
+def _variant(title: str, author: str, rng: random.Random) -> tuple[str, str]:
+    first, _, last = author.rpartition(" ")
+    pick = rng.randrange(7)
+    if pick == 1 and title.lower().startswith(("the ", "a ")):
+        article, rest = title.split(" ", 1)
+        title = f"{rest}, {article}"
+    elif pick == 2:
+        title = title.title()
+    elif pick == 3:
+        title = f"{title}: {rng.choice(['A Novel', 'Illustrated Edition', 'Annotated'])}"
+    elif pick == 4:
+        title = title.replace(" ", "-", 1)
+    elif pick == 5 and len(title) > 8:
+        i = rng.randrange(2, len(title) - 2)
+        title = title[:i] + title[i + 1:]  # typo
+    if rng.random() < 0.4:
+        author = f"{last}, {first}, {rng.randrange(1700, 1900)}-{rng.randrange(1750, 1990)}"
+    return title, author
+
+
+def make_candidates(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        if rng.random() < 0.6:
+            title, author = _variant(*rng.choice(_BOOKS), rng)
+        else:
+            title = " ".join(rng.sample(_WORDS, rng.randrange(2, 5))).title() + f" {i}"
+            author = f"{rng.choice(_WORDS).title()} {rng.choice(_WORDS).title()}"
+        rows.append({
+            "title": title,
+            "author": author,
+            "source": rng.choice(SOURCES),
+            "format": rng.choice(["epub", "epub", "pdf", "cbz"]),
+            "size_mb": round(rng.uniform(0.2, 40), 2) if rng.random() < 0.7 else None,
+        })
+    return rows
+
+
+def legacy_dedup(results: list[dict]) -> list[dict]:
+    seen: set[str] = set()
+    out = []
+    for r in results:
+        key = r.get("title", "").lower().strip()
+        if key and key not in seen:
+            seen.add(key)
+            out.append(dict(r))
+    return out
+
+
+def _time(fn, rounds: int, before=None) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        if before:
+            before()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    rows = make_candidates(args.candidates)
+    # Sources report in priority order, as /librarian/search concatenates them
+    rows.sort(key=lambda r: SOURCES.index(r["source"]))
+
+    legacy = legacy_dedup(rows)
+    ranked = rank_results(rows, SOURCES)
+    print(f"{len(rows)} candidates -> legacy dedup {len(legacy)} rows, ranked {len(ranked)} clusters")
+    for r in ranked[:8]:
+        print(f"  {r['editions']:>3} x  {r['title'][:45]:<45} {r['source']:<15} {r['format']}")
+
+    for label, fn, before in (
+        ("legacy dedup", lambda: legacy_dedup(rows), None),
+        ("rank (cold)", lambda: rank_results(rows, SOURCES), clear_caches),
+        ("rank (warm)", lambda: rank_results(rows, SOURCES), None),
+    ):
+        samples = _time(fn, args.rounds, before)
+        p95 = sorted(samples)[int(len(samples) * 0.95) - 1]
+        print(f"{label:<14} median {statistics.median(samples):.3f} ms   p95 {p95:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
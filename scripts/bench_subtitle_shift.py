@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming subtitle shifter on large generated ASS (and SRT) files.
+
+Usage:
+  python scripts/bench_subtitle_shift.py                 # 200k events
+  python scripts/bench_subtitle_shift.py --events 1000000 --keep
+
+The ASS fixture mimics fansub-style files: several styles, karaoke and
+positioning override tags, commas in the text and a handful of Comment lines.
+Peak RSS is reported to show memory stays flat regardless of file size.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.subtitle_timing import shift_subtitle_file  # noqa: E402
+
+_ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 1920
+PlayResY: 1080
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,54,&H00FFFFFF,&H000000FF,&H00000000,&H64000000,0,0,0,0,100,100,0,0,1,2.5,1,2,60,60,40,1
+Style: Sign,Arial,48,&H00E0E0E0,&H000000FF,&H00202020,&H00000000,1,0,0,0,100,100,0,0,1,2,0,8,10,10,10,1
+Style: Karaoke,Arial,50,&H0000FFFF,&H00FF0000,&H00000000,&H00000000,1,0,0,0,100,100,0,0,1,2,0,8,10,10,25,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+_TEXTS = (
+    "{\\an8\\pos(960,80)\\fad(200,200)\\c&H00E0E0E0&}Platform 9, going north, do not board",
+    "{\\k25}Ka{\\k30}ze {\\k20}ni {\\k40}no{\\k35}tte{\\k50}, {\\k30}to{\\k45}on{\\k60}ku",
+    "I told you, didn't I? {\\i1}Never{\\i0} open that door.",
+    "{\\blur2\\bord3\\3c&H202020&\\move(100,900,1800,900)}Scrolling sign text, with commas, everywhere",
+    "Plain dialogue line for the default style.",
+)
+
+
+def _ass_time(ms: int) -> str:
+    cs = ms // 10
+    s, cs = divmod(cs, 100)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _srt_time(ms: int) -> str:
+    s, ms = divmod(ms, 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def write_ass_fixture(path: str, events: int, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    styles = ("Default", "Sign", "Karaoke")
+    with open(path, "w", encoding="utf-8", newline="\r\n") as fh:
+        fh.write(_ASS_HEADER)
+        t = 0
+        for i in range(events):
+            t += rnd.randint(50, 900)
+            kind = "Comment" if i % 97 == 0 else "Dialogue"
+            style = styles[i % 3]
+            text = _TEXTS[rnd.randrange(len(_TEXTS))]
+            fh.write(
+                f"{kind}: {i % 4},{_ass_time(t)},{_ass_time(t + rnd.randint(400, 6000))},"
+                f"{style},,0,0,0,,{text}\n"
+            )
+
+
+def write_srt_fixture(path: str, events: int, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="\r\n") as fh:
+        t = 0
+        for i in range(events):
+            t += rnd.randint(50, 900)
+            fh.write(f"{i + 1}\n{_srt_time(t)} --> {_srt_time(t + rnd.randint(400, 6000))}\n")
+            fh.write("<i>I told you, didn't I?</i>\nNever open that door.\n\n")
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _bench(label: str, path: str, offset: float, drift: float) -> None:
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    out = f"{path}.shifted"
+    started = time.perf_counter()
+    cues = shift_subtitle_file(path, out, offset, drift)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<4} {size_mb:8.1f} MB  {cues:>9,d} cues  {elapsed:7.2f} s  "
+        f"{size_mb / elapsed:7.1f} MB/s  {cues / elapsed:>11,.0f} cues/s  peak RSS {_peak_rss_mb():.0f} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--offset", type=float, default=-2.35)
+    parser.add_argument("--drift", type=float, default=1.001)
+    parser.add_argument("--keep", action="store_true", help="keep the generated files")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="subshift-bench-")
+    ass_path = os.path.join(workdir, "bench.ass")
+    srt_path = os.path.join(workdir, "bench.srt")
+    write_ass_fixture(ass_path, args.events)
+    write_srt_fixture(srt_path, args.events)
+    print(f"fixtures in {workdir} (offset={args.offset}s drift={args.drift})")
+
+    _bench("ASS", ass_path, args.offset, args.drift)
+    _bench("SRT", srt_path, args.offset, args.drift)
+
+    if not args.keep:
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Regression cases for the Kavita catalog's owned-check scorer
+(app/kavita_catalog.py, _Entry.score).
+
+Usage:
+  python scripts/check_owned_scoring.py
+
+Each case is a query, a series as the catalog stores it, and whether the
+query should count as owned (confidence >= OWNED_CONFIDENCE). Exits non-zero
+if any case disagrees.
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.kavita_catalog import OWNED_CONFIDENCE, _Entry  # noqa: E402
+from app.search_cache import normalize_query  # noqa: E402
+
+# (query, series name, writers, volumes, owned?)
+CASES = [
+    # Differing numbers are different books
+    ("Dune 2", "Dune", ["Frank Herbert"], [], False),
+    ("Harry Potter 2", "Harry Potter 1", ["J. K. Rowling"], [], False),
+    ("Saga vol 3", "Saga", ["Brian K. Vaughan"], ["1", "2", "3"], True),
+    # A stripped subtitle is not the whole name
+    ("The Hunger Games", "The Hunger Games: Catching Fire", ["Suzanne Collins"], [], False),
+    ("Atomic Habits James Clear", "Atomic Habits: An Easy & Proven Way to Build Good Habits", ["James Clear"], [], True),
+    # Title words must be covered
+    ("Dune", "Dune Messiah", ["Frank Herbert"], [], False),
+    ("Dune Messiah", "Dune Messiah", ["Frank Herbert"], [], True),
+    # Typos still match
+    ("Hary Potter", "Harry Potter", ["J. K. Rowling"], [], True),
+    ("Dune Frank Herbert", "Dune", ["Frank Herbert"], [], True),
+]
+
+
+def _entry(name: str, writers: list[str], volumes: list[str]) -> _Entry:
+    return _Entry({
+        "name": name,
+        "localized_name": None,
+        "original_name": None,
+        "authors_json": json.dumps(writers),
+        "volumes_json": json.dumps(volumes),
+    })
+
+
+def main() -> int:
+    failures = 0
+    for query, name, writers, volumes, owned in CASES:
+        query_norm = normalize_query(query)
+        score = _entry(name, writers, volumes).score(query_norm, set(query_norm.split()))
+        ok = (score >= OWNED_CONFIDENCE) == owned
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {score:.3f}  {query!r} vs {name!r} (expect {'owned' if owned else 'not owned'})")
+    print(f"{len(CASES) - failures}/{len(CASES)} cases pass")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Load Project Gutenberg's catalog dump into the local search index used by
+the librarian (data/gutenberg_catalog.db), then optionally time some queries.
+
+Usage:
+  python scripts/load_gutenberg_catalog.py pg_catalog.csv.gz
+  python scripts/load_gutenberg_catalog.py rdf-files.tar.bz2 --db /app/data/gutenberg_catalog.db
+  python scripts/load_gutenberg_catalog.py --url https://www.gutenberg.org/cache/epub/feeds/pg_catalog.csv.gz
+  python scripts/load_gutenberg_catalog.py --query "monte cristo" --query "carroll alice"   # search only
+
+Dumps: https://www.gutenberg.org/ebooks/offline_catalogs.html
+(pg_catalog.csv.gz is ~5 MB; rdf-files.tar.bz2 adds real file URLs and
+download counts). The running API re-downloads GUTENBERG_CATALOG_URL weekly
+on its own; this script is for seeding, air-gapped hosts and testing.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.sources.gutenberg_catalog import GutenbergCatalog  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dump", nargs="?", help="local pg_catalog.csv[.gz] or rdf-files.tar[.bz2]")
+    parser.add_argument("--url", help="download the dump from this URL instead")
+    parser.add_argument(
+        "--db",
+        default=os.path.join(os.environ.get("DATA_DIR", "data"), "gutenberg_catalog.db"),
+        help="index path (default: $DATA_DIR/gutenberg_catalog.db)",
+    )
+    parser.add_argument("--query", action="append", default=[], help="search after loading (repeatable)")
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    catalog = GutenbergCatalog(args.db)
+    started = time.perf_counter()
+    if args.url:
+        count = asyncio.run(catalog.download_and_ingest(args.url))
+    elif args.dump:
+        count = catalog.ingest(args.dump)
+    else:
+        count = None
+    if count is not None:
+        print(f"loaded {count} books into {args.db} in {time.perf_counter() - started:.1f}s")
+    print(catalog.stats())
+
+    for query in args.query:
+        started = time.perf_counter()
+        results = catalog.search(query, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\n{query!r}: {len(results)} results in {elapsed:.1f} ms")
+        for r in results:
+            print(f"  #{r['source_id']:>6}  {r['title'][:60]} — {r['author']}")
+
+
+if __name__ == "__main__":
+    main()
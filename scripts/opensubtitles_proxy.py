@@ -3,6 +3,7 @@ import asyncio
 import base64
 import json
 import re
+import shutil
 import time
 import urllib.error
 import urllib.parse
@@ -26,6 +27,7 @@ ENV = _load_env()
 PROXY_KEY = ENV.get("API_KEY", "")
 LISTEN_HOST = ENV.get("OPENSUBTITLES_PROXY_HOST", "0.0.0.0")
 LISTEN_PORT = int(ENV.get("OPENSUBTITLES_PROXY_PORT", "8876"))
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class OpenSubtitlesBackend:
@@ -116,6 +118,24 @@ class OpenSubtitlesBackend:
         return combined
 
     def download_subtitle(self, file_id: int, sub_format: str = "srt") -> tuple[bytes, str]:
+        link, filename = self._download_link(file_id, sub_format)
+        content = self._request_bytes(link)
+        return content, filename
+
+    def open_subtitle_stream(self, file_id: int, sub_format: str = "srt"):
+        """Return (open upstream response, filename) so callers can relay the body in chunks."""
+        link, filename = self._download_link(file_id, sub_format)
+        req = urllib.request.Request(link, method="GET")
+        req.add_header("User-Agent", self._headers["User-Agent"])
+        try:
+            resp = urllib.request.urlopen(req, timeout=60)
+        except urllib.error.HTTPError as exc:
+            raise RuntimeError(f"OpenSubtitles file HTTP {exc.code}") from exc
+        except Exception as exc:
+            raise RuntimeError(f"OpenSubtitles file request failed: [{type(exc).__name__}] {exc}") from exc
+        return resp, filename
+
+    def _download_link(self, file_id: int, sub_format: str) -> tuple[str, str]:
         self.ensure_auth()
         payload = self._request_json(
             f"{self._base_url}/api/v1/download",
@@ -126,10 +146,8 @@ class OpenSubtitlesBackend:
         link = payload.get("link")
         if not link:
             raise RuntimeError(f"OpenSubtitles download response missing link: {payload}")
-
-        content = self._request_bytes(link)
         filename = payload.get("file_name") or f"{file_id}.{sub_format}"
-        return content, filename
+        return link, filename
 
     def _request_json(
         self,
@@ -316,6 +334,13 @@ class Handler(BaseHTTPRequestHandler):
                         "content_b64": base64.b64encode(content).decode("ascii"),
                     },
                 )
+
+            if self.path == "/download/raw":
+                file_id = int(payload.get("file_id") or 0)
+                sub_format = str(payload.get("sub_format") or "srt")
+                upstream, filename = BACKEND.open_subtitle_stream(file_id, sub_format=sub_format)
+                with upstream:
+                    return self._send_stream(upstream, filename)
         except Exception as exc:
             return self._send_json(502, {"error": str(exc)})
 
@@ -335,6 +360,43 @@ class Handler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(body)
 
+    def _send_stream(self, upstream, filename: str) -> None:
+        # Headers go out only once the upstream file is open, so failures before
+        # this point still surface as a JSON 502. The body is relayed in chunks
+        # without buffering or base64 encoding the subtitle. The client must be
+        # able to tell a complete body from a cut-off one: with a known length it
+        # checks the byte count; otherwise the body is sent chunked and the
+        # terminating chunk is written only after upstream was read to the end.
+        ascii_name = filename.encode("ascii", "ignore").decode("ascii").replace('"', "") or "subtitle.srt"
+        length = upstream.headers.get("Content-Length")
+        chunked = not length
+        if chunked:
+            self.protocol_version = "HTTP/1.1"  # chunked encoding needs 1.1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header(
+            "Content-Disposition",
+            f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{urllib.parse.quote(filename)}",
+        )
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Connection", "close")
+        else:
+            self.send_header("Content-Length", length)
+        self.end_headers()
+        try:
+            if not chunked:
+                shutil.copyfileobj(upstream, self.wfile, STREAM_CHUNK_SIZE)
+                return
+            while chunk := upstream.read(STREAM_CHUNK_SIZE):
+                self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception:
+            # Too late for a JSON error; drop the connection so the client sees a short read.
+            pass
+        finally:
+            self.close_connection = True
+
 
 def main() -> None:
     server = ThreadingHTTPServer((LISTEN_HOST, LISTEN_PORT), Handler)